@@ -0,0 +1,86 @@
+# MovieZoneBot/bench_category_pages.py
+
+"""
+Benchmark of category paging: the presorted category index against the old
+scan-filter-sort over every movie.
+
+Usage:
+    python bench_category_pages.py [titles ...]
+
+Defaults to 1,000, 10,000, 100,000 and 500,000 synthetic titles in 8
+categories, 2 per movie. For each size it fetches the 31 ids of the first,
+50th and last page of one category. Touches no data files.
+"""
+
+import random
+import string
+import sys
+import time
+from typing import Callable, Dict, List
+
+from catalog_index import TitleOrderIndex, normalize_title
+
+CATEGORIES = ["Action", "Comedy", "Drama", "Horror", "Romance", "Thriller", "Sci-Fi", "Animation"]
+CATEGORIES_PER_MOVIE = 2
+PAGE_SIZE = 31
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 500_000]
+
+
+def make_movies(count: int, seed: int = 8) -> Dict[int, Dict]:
+    rng = random.Random(seed)
+    movies = {}
+    for movie_id in range(1, count + 1):
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 4))]
+        movies[movie_id] = {
+            "movie_id": movie_id,
+            "title": " ".join(words).title(),
+            "categories": rng.sample(CATEGORIES, CATEGORIES_PER_MOVIE),
+        }
+    return movies
+
+def old_page(movies: Dict[int, Dict], category: str, offset: int, limit: int) -> List[int]:
+    """What get_movies_by_category did before the index: filter everything, sort, slice."""
+    matches = [movie for movie in movies.values() if category in movie.get("categories", [])]
+    matches.sort(key=lambda movie: normalize_title(movie["title"]))
+    return [movie["movie_id"] for movie in matches[offset:offset + limit]]
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    """Fastest of `repeat` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run(count: int):
+    movies = make_movies(count)
+
+    started = time.perf_counter()
+    index = TitleOrderIndex.build(
+        (movie_id, movie["title"], [None, *movie["categories"]]) for movie_id, movie in movies.items()
+    )
+    build = time.perf_counter() - started
+
+    category = CATEGORIES[0]
+    pages = (index.count(category) - 1) // PAGE_SIZE
+    offsets = [0, min(49, pages) * PAGE_SIZE, pages * PAGE_SIZE]
+    assert index.page(category, offsets[1], PAGE_SIZE) == old_page(movies, category, offsets[1], PAGE_SIZE)
+
+    index_times = [best_of(lambda: index.page(category, offset, PAGE_SIZE), 200) for offset in offsets]
+    old_time = best_of(lambda: old_page(movies, category, offsets[1], PAGE_SIZE), 3 if count <= 100_000 else 1)
+    print(
+        f"{count:>9,}  {' / '.join(f'{t * 1e6:.1f}' for t in index_times):>25} us"
+        f"  {old_time * 1e3:>11.2f} ms  {build:>9.2f} s"
+    )
+
+def main() -> int:
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'titles':>9}  {'index page (p1 / p50 / last)':>21}  {'old scan+sort':>14}  {'index build':>11}")
+    for count in sizes:
+        run(count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
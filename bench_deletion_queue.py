@@ -0,0 +1,123 @@
+# MovieZoneBot/bench_deletion_queue.py
+
+"""
+Benchmark of scheduling message deletions: the durable DeletionQueue against
+one PTB run_once job per message (what schedule_message_deletion used to do).
+
+Usage:
+    python bench_deletion_queue.py [pending deletions]
+
+Defaults to 1,000,000 deletions: messages sent evenly over 24 hours, each
+to be deleted 24 hours later (the auto-cleanup default). For each approach it
+reports the time per schedule and the growth of the process' resident
+memory; for the queue also the flush cost, the bucket files on disk and
+how long a restart (load) and one drain batch take. The queue is written to
+a temporary directory; no data files are touched.
+"""
+
+import asyncio
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from deletion_queue import DeletionQueue
+
+DEFAULT_COUNT = 1_000_000
+SPREAD_SECONDS = 24 * 3600
+DELETE_AFTER = 24 * 3600
+# As in database.py: the queue is flushed by the drain job this often
+DRAIN_INTERVAL = 10
+DRAIN_BATCH = 2000
+
+
+def rss_mb() -> float:
+    """Current resident memory in MB (peak memory where /proc is missing)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def directory_size_mb(directory: str) -> float:
+    return sum(entry.stat().st_size for entry in os.scandir(directory)) / 1e6
+
+def bench_queue(count: int, sent_at):
+    directory = tempfile.mkdtemp(prefix="bench_deletions_")
+    try:
+        queue = DeletionQueue(directory)
+        queue.load()
+        now = time.time()
+        memory = rss_mb()
+        schedule_time = flush_time = 0.0
+        flushes = 0
+        i = 0
+        for drain_at in range(DRAIN_INTERVAL, SPREAD_SECONDS + DRAIN_INTERVAL, DRAIN_INTERVAL):
+            started = time.perf_counter()
+            while i < count and sent_at[i] < drain_at:
+                queue.schedule(-1000000000000 - i % 50, i, DELETE_AFTER, when=now + sent_at[i])
+                i += 1
+            schedule_time += time.perf_counter() - started
+            started = time.perf_counter()
+            queue.flush()
+            flush_time += time.perf_counter() - started
+            flushes += 1
+        grown = rss_mb() - memory
+
+        restarted = DeletionQueue(directory)
+        started = time.perf_counter()
+        restarted.load()
+        load_time = time.perf_counter() - started
+        started = time.perf_counter()
+        _, entries = restarted.due(DRAIN_BATCH, when=now + DELETE_AFTER + 3600)
+        due_time = time.perf_counter() - started
+
+        print("DeletionQueue (new)")
+        print(f"  {schedule_time / count * 1e6:.1f} us per schedule, {flush_time / flushes * 1e3:.2f} ms per flush "
+              f"({flushes} flushes)")
+        print(f"  +{grown:.1f} MB RSS, {restarted.buckets} bucket files, {directory_size_mb(directory):.1f} MB on disk")
+        print(f"  restart (load) {load_time * 1e3:.1f} ms, reading a {len(entries)}-message batch {due_time * 1e3:.1f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+async def bench_run_once(count: int, sent_at):
+    from telegram.ext import Application
+
+    async def delete_message(context):
+        pass
+
+    application = Application.builder().token("123456:benchmark").build()
+    job_queue = application.job_queue
+    await job_queue.start()
+    try:
+        memory = rss_mb()
+        started = time.perf_counter()
+        for i in range(count):
+            job_queue.run_once(delete_message, when=DELETE_AFTER + sent_at[i], data=(-1000000000000 - i % 50, i))
+        elapsed = time.perf_counter() - started
+        grown = rss_mb() - memory
+        print("PTB run_once (old)")
+        print(f"  {elapsed / count * 1e6:.1f} us per schedule, {elapsed:.1f} s in total")
+        print(f"  +{grown:.1f} MB RSS, {len(job_queue.jobs())} scheduler jobs")
+    finally:
+        await job_queue.stop(wait=False)
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    rng = random.Random(24)
+    # Seconds into the day at which each message was sent, in order
+    sent_at = sorted(rng.uniform(0, SPREAD_SECONDS) for _ in range(count))
+    print(f"{count:,} pending deletions spread over {SPREAD_SECONDS // 3600}h\n")
+    bench_queue(count, sent_at)
+    asyncio.run(bench_run_once(count, sent_at))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
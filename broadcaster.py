@@ -0,0 +1,205 @@
+# MovieZoneBot/broadcaster.py
+
+import asyncio
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+import database as db
+from send_queue import PRIORITY_HIGH, PRIORITY_LOW, send_priority
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+# Users read from storage (and checkpointed) at a time
+BROADCAST_CHUNK_SIZE = 500
+# Sends in flight at once; the send queue paces them to the global rate limit
+BROADCAST_CONCURRENCY = 30
+
+# Errors after which a user can no longer be reached
+UNREACHABLE_ERRORS = ("chat not found", "user is deactivated", "peer_id_invalid")
+
+# The broadcast being sent, and its task
+_state: Optional[Dict] = None
+_task: Optional[asyncio.Task] = None
+
+
+async def _save_checkpoint(state: Dict) -> bool:
+    """Write the checkpoint off the event loop."""
+    save = asyncio.ensure_future(db.asave_json(db.BROADCAST_FILE, dict(state)))
+    try:
+        return await asyncio.shield(save)
+    except asyncio.CancelledError:
+        # Let the write land before the task ends, so it can never overwrite a later checkpoint
+        await save
+        raise
+
+def _load_checkpoint() -> Optional[Dict]:
+    state = db.load_json(db.BROADCAST_FILE) if os.path.exists(db.BROADCAST_FILE) else {}
+    return dict(state) if state else None
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+def get_status() -> Optional[Dict]:
+    """Progress of the running broadcast, else of the last one."""
+    return dict(_state) if _state else _load_checkpoint()
+
+def format_status(state: Dict) -> str:
+    headline = {
+        "running": "📣 Broadcasting...",
+        "done": "✅ Broadcast finished",
+        "cancelled": "⏹ Broadcast cancelled",
+    }.get(state["status"], "📣 Broadcast")
+    reached = state["sent"] + state["blocked"] + state["failed"]
+    return (
+        f"{headline}\n\n"
+        f"👥 Reached {reached:,} of ~{state['total']:,} users\n"
+        f"✅ Delivered: {state['sent']:,}\n"
+        f"🚫 Blocked the bot: {state['blocked']:,}\n"
+        f"❌ Failed: {state['failed']:,}"
+    )
+
+async def _deliver(bot, user_id: int, message: Dict) -> str:
+    """Send the broadcast to one user: 'sent', 'blocked' or 'failed'."""
+    try:
+        if "text" in message:
+            await bot.send_message(chat_id=user_id, text=message["text"], rate_limit_args=PRIORITY_LOW)
+        else:
+            # Explicitly low: copies would otherwise go first, like file deliveries
+            await bot.copy_message(chat_id=user_id, from_chat_id=message["from_chat_id"],
+                                   message_id=message["message_id"], rate_limit_args=PRIORITY_LOW)
+        return "sent"
+    except Forbidden:
+        return "blocked"
+    except BadRequest as e:
+        if any(reason in str(e).lower() for reason in UNREACHABLE_ERRORS):
+            return "blocked"
+        logger.warning(f"Broadcast to {user_id} failed: {e}")
+        return "failed"
+    except RetryAfter as e:
+        # The send queue already waited and retried; leave this user out
+        logger.warning(f"Broadcast to {user_id} still flood limited: {e}")
+        return "failed"
+    except TelegramError as e:
+        logger.warning(f"Broadcast to {user_id} failed: {e}")
+        return "failed"
+
+async def _show_progress(bot, state: Dict):
+    if not state.get("status_message_id"):
+        return
+    try:
+        await bot.edit_message_text(chat_id=state["owner_chat_id"], message_id=state["status_message_id"],
+                                    text=format_status(state), rate_limit_args=PRIORITY_HIGH)
+    except TelegramError as e:
+        # "Message is not modified" and a deleted status message are both fine
+        logger.debug(f"Could not update broadcast status: {e}")
+
+async def _run(bot, state: Dict):
+    """
+    Send the broadcast chunk by chunk, from the checkpointed cursor on. The
+    cursor is saved after each chunk, so a restart resends at most one chunk.
+    """
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+    async def deliver(user_id: int) -> str:
+        async with semaphore:
+            return await _deliver(bot, user_id, state["message"])
+
+    logger.info(f"Broadcast {state['id']} running from user id {state['cursor']}")
+    # Chunks are read from storage; write out recent registrations once, up front
+    await db.aflush_users()
+    with send_priority(PRIORITY_LOW):
+        while state["status"] == "running":
+            cursor, user_ids = await db.aget_active_user_chunk(state["cursor"], BROADCAST_CHUNK_SIZE)
+            if cursor is None:
+                state["status"] = "done"
+                state["finished_at"] = datetime.now().isoformat()
+                break
+
+            results = await asyncio.gather(*(deliver(user_id) for user_id in user_ids))
+            blocked: List[int] = [user_id for user_id, result in zip(user_ids, results) if result == "blocked"]
+            if blocked:
+                await db.adeactivate_users(blocked)
+            state["sent"] += results.count("sent")
+            state["blocked"] += len(blocked)
+            state["failed"] += results.count("failed")
+            state["cursor"] = cursor
+            if not await _save_checkpoint(state):
+                logger.error(f"Could not checkpoint broadcast {state['id']}")
+            await _show_progress(bot, state)
+
+    await _save_checkpoint(state)
+    await _show_progress(bot, state)
+    logger.info(
+        f"Broadcast {state['id']} {state['status']}: {state['sent']} sent, "
+        f"{state['blocked']} blocked, {state['failed']} failed"
+    )
+
+def _launch(bot, state: Dict):
+    global _state, _task
+    _state = state
+    # Not Application.create_task: stopping the bot must not wait for a broadcast
+    _task = asyncio.create_task(_run(bot, state), name=f"broadcast:{state['id']}")
+    _task.add_done_callback(_report_crash)
+
+def _report_crash(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Broadcast stopped with an error; it resumes on the next start", exc_info=task.exception())
+
+async def start_broadcast(bot, message: Dict, owner_chat_id: int, status_message_id: Optional[int]) -> bool:
+    """
+    Start sending `message` ({"text": ...} or {"from_chat_id": ..., "message_id": ...})
+    to every active user. Returns False if a broadcast is already running.
+    """
+    if is_running():
+        return False
+    now = datetime.now()
+    state = {
+        "id": now.strftime("%Y%m%d%H%M%S"),
+        "status": "running",
+        "message": message,
+        "owner_chat_id": owner_chat_id,
+        "status_message_id": status_message_id,
+        "cursor": 0,
+        "total": await db.acount_users(),
+        "sent": 0,
+        "blocked": 0,
+        "failed": 0,
+        "started_at": now.isoformat(),
+    }
+    await _save_checkpoint(state)
+    _launch(bot, state)
+    return True
+
+def resume_broadcast(bot) -> bool:
+    """Continue a broadcast that was interrupted by a restart. Returns True if one was resumed."""
+    state = _load_checkpoint()
+    if not state or state.get("status") != "running" or is_running():
+        return False
+    logger.info(f"Resuming broadcast {state['id']} after user id {state['cursor']}")
+    _launch(bot, state)
+    return True
+
+async def cancel_broadcast() -> bool:
+    """Stop the running broadcast for good. Returns False if none is running."""
+    if not is_running():
+        return False
+    _state["status"] = "cancelled"
+    _state["finished_at"] = datetime.now().isoformat()
+    state = _state
+    await stop_broadcast()
+    await _save_checkpoint(state)
+    return True
+
+async def stop_broadcast():
+    """Pause the running broadcast on shutdown; the checkpoint lets the next start resume it."""
+    if is_running():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,503 @@
+# MovieZoneBot/catalog_index.py
+
+import json
+import math
+import os
+import heapq
+import bisect
+import hashlib
+import logging
+import tempfile
+import threading
+import unicodedata
+from collections import Counter
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes; older files are then rebuilt
+INDEX_VERSION = 1
+GRAM_SIZE = 3
+
+def normalize_title(title: str) -> str:
+    """The form titles and queries are compared in (same as the old `.lower()` scan)."""
+    return (title or "").lower()
+
+def trigrams(text: str) -> Set[str]:
+    """All overlapping GRAM_SIZE-character slices of `text`."""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+# Search relevance: how the query matches the title, plus a popularity bonus
+# of POPULARITY_WEIGHT per e-fold of downloads. A very popular title can
+# outrank a better match of an unknown one (40k downloads is worth ~53), but
+# never an exact title match.
+EXACT_MATCH = 100.0
+PREFIX_MATCH = 60.0
+WORD_MATCH = 40.0
+SUBSTRING_MATCH = 10.0
+POPULARITY_WEIGHT = 5.0
+
+# "Did you mean" suggestions: the least trigram Jaccard similarity between a
+# query and a title for the title to be suggested ("iron mn" / "iron man" is 0.57)
+FUZZY_MIN_SIMILARITY = 0.4
+# Weight of "share of the query found in the title" against plain Jaccard
+CONTAINMENT_WEIGHT = 0.8
+# Trigrams in more than this share of all titles (and at least
+# FUZZY_MIN_POSTING of them) are not used to look up candidates
+FUZZY_COMMON_SHARE = 0.01
+FUZZY_MIN_POSTING = 200
+# Number of candidates whose similarity is computed exactly
+FUZZY_SHORTLIST = 50
+
+def match_score(title: str, needle: str) -> float:
+    """Relevance tier of a normalized title for a query it contains."""
+    if title == needle:
+        return EXACT_MATCH
+    if title.startswith(needle):
+        return PREFIX_MATCH
+    position = title.find(needle, 1)
+    while position != -1:
+        if not title[position - 1].isalnum():
+            return WORD_MATCH
+        position = title.find(needle, position + 1)
+    return SUBSTRING_MATCH
+
+def catalog_fingerprint(titles: Dict[int, str]) -> str:
+    """Hash of every (movie_id, normalized title) pair, used to detect a stale index file."""
+    digest = hashlib.sha1()
+    for movie_id in sorted(titles):
+        digest.update(f"{movie_id}\x1f{normalize_title(titles[movie_id])}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TitleIndex:
+    """
+    Trigram inverted index over normalized movie titles.
+
+    Each trigram maps to the set of movie ids whose title contains it. A
+    substring query is answered by intersecting the posting sets of the query's
+    trigrams (smallest first) and verifying the few candidates left, instead of
+    scanning every title. Queries shorter than one trigram fall back to a scan
+    of the in-memory titles. Matches are ranked by match_score() plus a
+    popularity bonus, and only the best `limit` are selected (a heap, not a
+    full sort).
+
+    The same postings answer similar(), which finds titles sharing enough
+    trigrams with a misspelled query.
+    """
+
+    def __init__(self):
+        self._titles: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        # Number of distinct trigrams of each title, for similar()
+        self._gram_counts: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        # True when the index has changes that are not in the index file yet
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    @classmethod
+    def build(cls, titles: Dict[int, str]) -> "TitleIndex":
+        """Index a whole catalog given as {movie_id: title}."""
+        index = cls()
+        for movie_id in sorted(titles):
+            index._add(movie_id, titles[movie_id])
+        index.dirty = True
+        return index
+
+    # --- Maintenance ---
+
+    def _add(self, movie_id: int, title: str):
+        normalized = normalize_title(title)
+        self._titles[movie_id] = normalized
+        grams = trigrams(normalized)
+        self._gram_counts[movie_id] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(movie_id)
+
+    def _remove(self, movie_id: int):
+        normalized = self._titles.pop(movie_id, None)
+        if normalized is None:
+            return
+        self._gram_counts.pop(movie_id, None)
+        for gram in trigrams(normalized):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(movie_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def add(self, movie_id: int, title: str):
+        """Index a new movie, or re-index one whose title changed."""
+        with self._lock:
+            self._remove(movie_id)
+            self._add(movie_id, title)
+            self.dirty = True
+
+    def remove(self, movie_id: int):
+        """Drop a movie from the index."""
+        with self._lock:
+            if movie_id in self._titles:
+                self._remove(movie_id)
+                self.dirty = True
+
+    # --- Queries ---
+
+    def search(self, query: str, limit: int,
+               downloads: Optional[Callable[[int], int]] = None) -> List[int]:
+        """
+        Ids of up to `limit` movies whose title contains `query`, most
+        relevant first. `downloads` gives a movie's download count for the
+        popularity bonus; ties go to the older movie.
+        """
+        needle = normalize_title(query)
+        if not needle:
+            return []
+        with self._lock:
+            if len(needle) < GRAM_SIZE:
+                candidates = self._titles.keys()
+            else:
+                postings = []
+                for gram in trigrams(needle):
+                    posting = self._postings.get(gram)
+                    if not posting:
+                        return []
+                    postings.append(posting)
+                postings.sort(key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+
+            # Every trigram matching does not mean the query matches as a whole
+            scored = []
+            for movie_id in candidates:
+                title = self._titles[movie_id]
+                if needle in title:
+                    score = match_score(title, needle)
+                    if downloads is not None:
+                        score += POPULARITY_WEIGHT * math.log1p(downloads(movie_id))
+                    scored.append((score, -movie_id))
+        return [-negated_id for _, negated_id in heapq.nlargest(limit, scored)]
+
+    def similar(self, query: str, limit: int,
+                min_similarity: float = FUZZY_MIN_SIMILARITY) -> List[Tuple[int, float]]:
+        """
+        (movie_id, similarity) of up to `limit` titles closest to `query`,
+        most similar first. Catches misspellings that the substring search
+        misses.
+
+        Similarity is the trigram Jaccard similarity, or CONTAINMENT_WEIGHT
+        times the share of the query's trigrams found in the title if that is
+        higher, so a query for part of a long title ("spiderman" for
+        "spider-man: no way home") can still match.
+        """
+        grams = list(trigrams(normalize_title(query)))
+        if not grams:
+            return []
+        with self._lock:
+            # Candidates are the titles sharing the most trigrams with the
+            # query, counted over the less common trigrams only: one found in
+            # a large share of all titles ("the", "man") would add thousands
+            # of candidates while saying little about the match. Only the
+            # FUZZY_SHORTLIST best candidates are scored exactly.
+            postings = [self._postings.get(gram, set()) for gram in grams]
+            common = max(FUZZY_MIN_POSTING, len(self._titles) * FUZZY_COMMON_SHARE)
+            rare = [posting for posting in postings if len(posting) <= common]
+            if not rare:
+                rare = [min(postings, key=len)]
+            shortlist = Counter(chain.from_iterable(rare)).most_common(FUZZY_SHORTLIST)
+
+            needed = min_similarity * len(grams)
+            scored = []
+            for movie_id, _ in shortlist:
+                shared = sum(1 for posting in postings if movie_id in posting)
+                if shared < needed:
+                    continue
+                similarity = max(
+                    shared / (len(grams) + self._gram_counts[movie_id] - shared),
+                    CONTAINMENT_WEIGHT * shared / len(grams),
+                )
+                if similarity >= min_similarity:
+                    scored.append((similarity, -movie_id))
+        return [(-negated_id, similarity) for similarity, negated_id in heapq.nlargest(limit, scored)]
+
+    # --- Persistence ---
+
+    def save(self, file_path: str) -> bool:
+        """Write the index next to the data files (temp file + os.replace)."""
+        with self._lock:
+            data = {
+                "version": INDEX_VERSION,
+                "fingerprint": catalog_fingerprint(self._titles),
+                "postings": {gram: sorted(ids) for gram, ids in self._postings.items()},
+            }
+            self.dirty = False
+
+        directory = os.path.dirname(file_path) or "."
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            logger.error(f"Error saving title index to {file_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                self.dirty = True
+            return False
+        return True
+
+    @classmethod
+    def load(cls, file_path: str, titles: Dict[int, str]) -> Optional["TitleIndex"]:
+        """
+        Load a saved index for the catalog `titles`.
+
+        Returns None if there is no usable file or it was written for a
+        different catalog; the caller then rebuilds the index.
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable title index {file_path}: {e}")
+            return None
+
+        if data.get("version") != INDEX_VERSION or data.get("fingerprint") != catalog_fingerprint(titles):
+            logger.info("Title index is out of date, it will be rebuilt")
+            return None
+
+        index = cls()
+        for movie_id in sorted(titles):
+            normalized = index._titles[movie_id] = normalize_title(titles[movie_id])
+            index._gram_counts[movie_id] = len(trigrams(normalized))
+        index._postings = {gram: set(ids) for gram, ids in data.get("postings", {}).items()}
+        return index
+
+
+# --- Browse Indexes ---
+
+# Alphabet buckets besides A-Z. Keys are short ASCII so they fit in callback data.
+DIGIT_BUCKET = "09"
+BENGALI_BUCKET = "BN"
+DEVANAGARI_BUCKET = "DV"
+OTHER_BUCKET = "XX"
+
+BUCKET_LABELS = {
+    DIGIT_BUCKET: "0-9",
+    BENGALI_BUCKET: "বাংলা",
+    DEVANAGARI_BUCKET: "देवनागरी",
+    OTHER_BUCKET: "Other",
+}
+
+def initial_bucket(text: str) -> str:
+    """
+    Alphabet bucket of a title (or of a single letter typed by a user).
+
+    Leading punctuation is skipped and accents are dropped, so "(500) Days" files
+    under 0-9 and "Élite" under E. Bengali and Devanagari titles each share one
+    bucket per script.
+    """
+    for char in normalize_title(text):
+        if char.isalnum():
+            break
+    else:
+        return OTHER_BUCKET
+
+    base = unicodedata.normalize("NFKD", char)[0]
+    if "a" <= base <= "z":
+        return base.upper()
+    if char.isdigit():
+        return DIGIT_BUCKET
+    if "\u0980" <= char <= "\u09ff":
+        return BENGALI_BUCKET
+    if "\u0900" <= char <= "\u097f":
+        return DEVANAGARI_BUCKET
+    return OTHER_BUCKET
+
+def letter_bucket(letter: str) -> str:
+    """Bucket for a browse key: a bucket id (as used in callback data) or a letter typed by a user."""
+    if letter in BUCKET_LABELS:
+        return letter
+    return initial_bucket(letter)
+
+def bucket_label(bucket: str) -> str:
+    """Human readable name of an alphabet bucket."""
+    return BUCKET_LABELS.get(bucket, bucket)
+
+
+class TitleOrderIndex:
+    """
+    Movie ids grouped under keys (an alphabet bucket, a category, ...), each
+    group kept sorted by normalized title.
+
+    A page is a slice of one group, so it costs O(page size) no matter how big
+    the catalog is. Adding or removing a movie is a bisect per key it is in.
+    """
+
+    def __init__(self):
+        # key -> sorted [(normalized title, movie_id)]
+        self._groups: Dict[str, List[Tuple[str, int]]] = {}
+        # movie_id -> (normalized title, keys), to find a movie's entries on removal
+        self._entries: Dict[int, Tuple[str, Tuple[str, ...]]] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[int, str, Iterable[str]]]) -> "TitleOrderIndex":
+        """Index (movie_id, title, keys) triples, sorting each group once."""
+        index = cls()
+        for movie_id, title, keys in entries:
+            normalized = normalize_title(title)
+            keys = tuple(dict.fromkeys(keys))
+            index._entries[movie_id] = (normalized, keys)
+            for key in keys:
+                index._groups.setdefault(key, []).append((normalized, movie_id))
+        for group in index._groups.values():
+            group.sort()
+        return index
+
+    def add(self, movie_id: int, title: str, keys: Iterable[str]):
+        """Index a movie under `keys`, replacing any previous entry for it."""
+        with self._lock:
+            self._remove(movie_id)
+            normalized = normalize_title(title)
+            keys = tuple(dict.fromkeys(keys))
+            self._entries[movie_id] = (normalized, keys)
+            for key in keys:
+                bisect.insort(self._groups.setdefault(key, []), (normalized, movie_id))
+
+    def remove(self, movie_id: int):
+        with self._lock:
+            self._remove(movie_id)
+
+    def _remove(self, movie_id: int):
+        entry = self._entries.pop(movie_id, None)
+        if entry is None:
+            return
+        normalized, keys = entry
+        for key in keys:
+            group = self._groups.get(key)
+            if not group:
+                continue
+            position = bisect.bisect_left(group, (normalized, movie_id))
+            if position < len(group) and group[position] == (normalized, movie_id):
+                del group[position]
+            if not group:
+                del self._groups[key]
+
+    def page(self, key: str, offset: int, limit: int) -> List[int]:
+        """Movie ids of one group in title order, from `offset` on."""
+        with self._lock:
+            return [movie_id for _, movie_id in self._groups.get(key, [])[offset:offset + limit]]
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._groups.get(key, ()))
+
+    def keys(self) -> List[str]:
+        """Every key that currently has at least one movie."""
+        with self._lock:
+            return list(self._groups)
+
+
+class UploaderIndex:
+    """
+    Movies per uploader ordered by upload time, plus running totals.
+
+    Pages are read newest first with a cursor (the position of the last movie
+    shown), so every page is a bisect plus a slice. The per-uploader movie and
+    download totals are adjusted on every add, delete and download instead of
+    being summed over the catalog.
+    """
+
+    def __init__(self):
+        # added_by -> [(added_at, movie_id)] in ascending order; read from the end
+        self._groups: Dict[int, List[Tuple[str, int]]] = {}
+        # movie_id -> (added_by, added_at, downloads)
+        self._entries: Dict[int, Tuple[int, str, int]] = {}
+        # added_by -> total downloads of their movies
+        self._downloads: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[int, int, str, int]]) -> "UploaderIndex":
+        """Index (movie_id, added_by, added_at, downloads) tuples."""
+        index = cls()
+        for movie_id, added_by, added_at, downloads in entries:
+            added_at = added_at or ""
+            index._entries[movie_id] = (added_by, added_at, downloads)
+            index._groups.setdefault(added_by, []).append((added_at, movie_id))
+            index._downloads[added_by] = index._downloads.get(added_by, 0) + downloads
+        for group in index._groups.values():
+            group.sort()
+        return index
+
+    def add(self, movie_id: int, added_by: int, added_at: str, downloads: int = 0):
+        with self._lock:
+            self._remove(movie_id)
+            added_at = added_at or ""
+            self._entries[movie_id] = (added_by, added_at, downloads)
+            bisect.insort(self._groups.setdefault(added_by, []), (added_at, movie_id))
+            self._downloads[added_by] = self._downloads.get(added_by, 0) + downloads
+
+    def remove(self, movie_id: int):
+        with self._lock:
+            self._remove(movie_id)
+
+    def _remove(self, movie_id: int):
+        entry = self._entries.pop(movie_id, None)
+        if entry is None:
+            return
+        added_by, added_at, downloads = entry
+        group = self._groups.get(added_by, [])
+        position = bisect.bisect_left(group, (added_at, movie_id))
+        if position < len(group) and group[position] == (added_at, movie_id):
+            del group[position]
+        if not group:
+            self._groups.pop(added_by, None)
+        self._downloads[added_by] = self._downloads.get(added_by, 0) - downloads
+        if not self._downloads[added_by] and added_by not in self._groups:
+            del self._downloads[added_by]
+
+    def record_download(self, movie_id: int, count: int = 1):
+        """Add `count` downloads to a movie's uploader."""
+        with self._lock:
+            entry = self._entries.get(movie_id)
+            if entry is None:
+                return
+            added_by, added_at, downloads = entry
+            self._entries[movie_id] = (added_by, added_at, downloads + count)
+            self._downloads[added_by] = self._downloads.get(added_by, 0) + count
+
+    def page(self, added_by: int, limit: int, cursor: Optional[str] = None) -> List[int]:
+        """
+        Ids of up to `limit` movies by `added_by`, newest first.
+
+        `cursor` is the value of make_cursor() for the last movie of the previous
+        page; the page then continues with the next older movie.
+        """
+        with self._lock:
+            group = self._groups.get(added_by, [])
+            end = len(group) if cursor is None else bisect.bisect_left(group, parse_cursor(cursor))
+            return [movie_id for _, movie_id in reversed(group[max(0, end - limit):end])]
+
+    def totals(self, added_by: int) -> Dict[str, int]:
+        """Number of movies uploaded by `added_by` and their total downloads."""
+        with self._lock:
+            return {
+                "movies": len(self._groups.get(added_by, ())),
+                "downloads": self._downloads.get(added_by, 0),
+            }
+
+def make_cursor(added_at: str, movie_id: int) -> str:
+    """Cursor for UploaderIndex.page; short enough for callback data."""
+    return f"{added_at or ''}/{movie_id}"
+
+def parse_cursor(cursor: str) -> Tuple[str, int]:
+    added_at, _, movie_id = cursor.rpartition("/")
+    return (added_at, int(movie_id))
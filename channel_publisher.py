@@ -0,0 +1,106 @@
+# MovieZoneBot/channel_publisher.py
+
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Iterable, List, NamedTuple, Optional
+
+import httpx
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+# How many channels are posted to at the same time
+PUBLISH_CONCURRENCY = 5
+# Attempts per channel for connection errors that happened before the post was sent
+PUBLISH_MAX_ATTEMPTS = 3
+# First backoff after a transient error; doubled on every further attempt
+PUBLISH_RETRY_DELAY = 1.0
+# Flood waits are honoured this many times per channel, up to this long each
+PUBLISH_MAX_FLOOD_WAITS = 3
+PUBLISH_MAX_FLOOD_WAIT = 60
+
+
+class PublishResult(NamedTuple):
+    chat_id: str
+    ok: bool
+    attempts: int
+    error: Optional[str] = None
+
+
+# httpx errors raised before a request reaches Telegram; anything else (a read
+# timeout, a dropped response) may come after the post was made
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def _was_not_sent(error: NetworkError) -> bool:
+    """True if the request certainly never reached Telegram, so sending it again cannot post twice."""
+    return isinstance(error.__cause__, _NOT_SENT_ERRORS)
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+async def _post(bot, chat_id: str, text: str, photo: Optional[str]):
+    if photo:
+        await bot.send_photo(chat_id=chat_id, photo=photo, caption=text, parse_mode=ParseMode.HTML)
+    else:
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode=ParseMode.HTML)
+
+async def _post_with_retry(bot, chat_id: str, text: str, photo: Optional[str]) -> PublishResult:
+    """Post to one channel, waiting out flood limits and retrying connection errors."""
+    attempts = 0
+    flood_waits = 0
+    while True:
+        attempts += 1
+        try:
+            await _post(bot, chat_id, text, photo)
+            logger.info(f"Posted to channel {chat_id} (attempt {attempts})")
+            return PublishResult(chat_id, True, attempts)
+        except RetryAfter as e:
+            delay = _retry_after_seconds(e)
+            flood_waits += 1
+            if flood_waits > PUBLISH_MAX_FLOOD_WAITS or delay > PUBLISH_MAX_FLOOD_WAIT:
+                logger.error(f"Giving up on channel {chat_id}: flood wait of {delay:.0f}s")
+                return PublishResult(chat_id, False, attempts, f"flood limit, retry in {delay:.0f}s")
+            logger.warning(f"Flood limit on channel {chat_id}, waiting {delay:.0f}s")
+            # A flood wait is not a failed attempt
+            attempts -= 1
+            await asyncio.sleep(delay)
+        except (BadRequest, Forbidden) as e:
+            # Wrong chat, missing rights, bad markup: retrying will not help
+            logger.error(f"Failed to post to channel {chat_id}: {e}")
+            return PublishResult(chat_id, False, attempts, str(e))
+        except NetworkError as e:
+            if not _was_not_sent(e):
+                # Timed out waiting for the reply, or similar: Telegram may have
+                # posted it already, and a second post would duplicate it
+                logger.error(f"Post to channel {chat_id} may or may not have gone through: {e}")
+                return PublishResult(chat_id, False, attempts, f"unknown, check the channel ({e})")
+            if attempts >= PUBLISH_MAX_ATTEMPTS:
+                logger.error(f"Failed to post to channel {chat_id} after {attempts} attempts: {e}")
+                return PublishResult(chat_id, False, attempts, str(e))
+            delay = PUBLISH_RETRY_DELAY * 2 ** (attempts - 1)
+            logger.warning(f"Could not connect to post to channel {chat_id} ({e}), retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+        except TelegramError as e:
+            logger.error(f"Failed to post to channel {chat_id}: {e}")
+            return PublishResult(chat_id, False, attempts, str(e))
+
+async def publish_to_channels(bot, channel_ids: Iterable[str], text: str, photo: Optional[str] = None,
+                              concurrency: int = PUBLISH_CONCURRENCY) -> List[PublishResult]:
+    """
+    Post one rendered message (with an optional photo) to several channels,
+    at most `concurrency` at a time. Returns one result per channel, in the
+    order given; failures are reported, not raised.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(chat_id: str) -> PublishResult:
+        async with semaphore:
+            return await _post_with_retry(bot, chat_id, text, photo)
+
+    return list(await asyncio.gather(*(post(chat_id) for chat_id in channel_ids)))
@@ -17,6 +17,27 @@ OWNER_ID = 5379553841
 # আপনার GitHub Pages-এ থাকা অ্যাড পেজের URL
 AD_PAGE_URL = "https://sudip1844.github.io/moviezone-redirect-page-"
 
+# "signed": download tokens carry user, movie, quality and expiry themselves,
+# protected by an HMAC, so creating one needs no disk write.
+# "stored": every token is a random id saved in the token table (the old way).
+# Tokens of either kind are accepted in both modes.
+AD_TOKEN_MODE = "signed"
+# Key for signing tokens. Leave empty to derive it from BOT_TOKEN.
+AD_TOKEN_SECRET = os.environ.get("AD_TOKEN_SECRET", "")
+
+# --- Storage Configuration ---
+# "json" keeps everything in the data/*.json files (the original format).
+# "sqlite" stores the same data in one SQLite database with indexed tables.
+# On the first start with "sqlite", existing JSON data is migrated automatically;
+# it can also be migrated by hand with `python migrate_to_sqlite.py`.
+STORAGE_BACKEND = "json"
+SQLITE_DB_FILE = "data/moviezone.db"
+
+# --- Concurrency Configuration ---
+# How many updates the bot may handle at the same time. Updates from the same
+# chat are still handled one after another, so conversations stay in order.
+CONCURRENT_UPDATES = 16
+
 # --- Bot Settings ---
 # মুভি যোগ করার সময় যে ক্যাটাগরিগুলো দেখানো হবে (আপনার ছবি অনুযায়ী)
 # Categories for movie addition (includes Hentai for admin/owner only)
@@ -2,11 +2,31 @@
 
 import json
 import os
+import bisect
 import logging
-import hashlib
+import secrets
 import time
+import threading
+import tempfile
+import asyncio
+import functools
+import contextlib
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+
+from config import STORAGE_BACKEND, SQLITE_DB_FILE, OWNER_ID, AD_TOKEN_MODE
+import ad_tokens
+from token_store import TokenStore
+from download_counters import DownloadCounters
+from download_analytics import DownloadAnalytics
+from trending import TrendingScores
+from deletion_queue import DeletionQueue
+from request_index import PendingRequestIndex
+from catalog_index import TitleIndex, TitleOrderIndex, UploaderIndex, initial_bucket, letter_bucket, make_cursor
 
 # লগিং সেটআপ
 logger = logging.getLogger(__name__)
@@ -20,395 +40,1223 @@ ADMINS_FILE = os.path.join(DATA_DIR, "admins.json")
 MOVIES_FILE = os.path.join(DATA_DIR, "movies.json")
 CHANNELS_FILE = os.path.join(DATA_DIR, "channels.json")
 REQUESTS_FILE = os.path.join(DATA_DIR, "requests.json")
+REQUEST_ARCHIVE_FILE = os.path.join(DATA_DIR, "request_archive.json")
 TOKENS_FILE = os.path.join(DATA_DIR, "tokens.json")
+SPENT_TOKENS_FILE = os.path.join(DATA_DIR, "spent_tokens.json")
+# Derived data, rebuilt automatically when missing or out of date
+TITLE_INDEX_FILE = os.path.join(DATA_DIR, "title_index.json")
+# Download counts, sharded by movie id (see download_counters.py)
+COUNTERS_DIR = os.path.join(DATA_DIR, "counters")
+# Hourly and daily download buckets (see download_analytics.py)
+ANALYTICS_FILE = os.path.join(DATA_DIR, "analytics.json")
+# Decayed popularity scores (see trending.py)
+TRENDING_FILE = os.path.join(DATA_DIR, "trending.json")
+# Progress of the current or last broadcast (see broadcaster.py)
+BROADCAST_FILE = os.path.join(DATA_DIR, "broadcast.json")
+# Messages waiting to be auto-deleted, one file per minute (see deletion_queue.py)
+DELETIONS_DIR = os.path.join(DATA_DIR, "deletions")
+
+# Table names shared by both storage backends
+USERS = "users"
+ADMINS = "admins"
+MOVIES = "movies"
+CHANNELS = "channels"
+REQUESTS = "requests"
+REQUEST_ARCHIVE = "request_archive"
+TOKENS = "tokens"
+SPENT_TOKENS = "spent_tokens"
 
 def initialize_database():
     """Initialize the database by creating necessary directories and files."""
+    global _analytics, _trending
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
-    
-    # Initialize files if they don't exist
-    files_to_init = {
-        USERS_FILE: {},
-        ADMINS_FILE: {},
-        MOVIES_FILE: {"next_id": 1, "movies": {}},
-        CHANNELS_FILE: {},
-        REQUESTS_FILE: {"next_id": 1, "requests": {}},
-        TOKENS_FILE: {}
-    }
-    
-    for file_path, default_data in files_to_init.items():
-        if not os.path.exists(file_path):
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(default_data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Initialized {file_path}")
+
+    _store.initialize()
+
+    # First start on SQLite: bring over whatever the JSON files hold
+    if _store.name == "sqlite" and _store.is_empty() and os.path.exists(MOVIES_FILE):
+        from sqlite_store import migrate_from_json
+        source = JsonStore()
+        source.initialize()
+        copied = migrate_from_json(source, _store)
+        logger.info(f"Migrated JSON data into SQLite: {copied}")
+
+    _archive_handled_requests()
+    _load_request_index()
+    refresh_role_cache()
+    _tokens.load()
+    _downloads.load({movie_id: downloads for movie_id, (_, _, downloads) in _store.movie_uploads().items()})
+    _analytics = DownloadAnalytics.load(ANALYTICS_FILE)
+    _trending = TrendingScores.load(TRENDING_FILE, TRENDING_HALF_LIFE, TRENDING_SIZE)
+    _deletions.load()
+
+    # Build (or load) the catalog indexes now rather than on the first search
+    _load_catalog_indexes()
+
+def flush_storage():
+    """Push buffered writes to disk. Called periodically from main."""
+    _store.flush()
+
+def close_database():
+    """Flush everything and release the storage backend. Called on shutdown."""
+    _executor.shutdown(wait=True)
+    flush_users()
+    flush_download_counts()
+    save_download_analytics()
+    save_title_index()
+    _deletions.flush()
+    _store.close()
+
+# --- In-Process File Cache ---
+# Every read path goes through load_json, so a single button press used to parse
+# the same file several times. We keep one parsed copy per data file and reuse it
+# for as long as the file's (st_mtime_ns, st_size) signature is unchanged.
+# save_json refreshes the entry after a local write, so only external edits cause
+# a re-parse.
+_json_cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+_json_cache_lock = threading.Lock()
+_json_cache_stats = {"hits": 0, "misses": 0}
+# Files whose last read failed to parse; JsonStore refuses to overwrite them
+_unreadable_files = set()
+
+def _file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    """Return the (mtime_ns, size) pair used to detect file changes."""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 def load_json(file_path: str) -> Dict:
-    """Load data from a JSON file."""
+    """
+    Load data from a JSON file.
+
+    The parsed data is cached and shared between callers. Treat it as read-only
+    unless you write it back with save_json.
+    """
+    signature = _file_signature(file_path)
+    if signature is None:
+        logger.warning(f"File {file_path} not found, returning empty dict")
+        invalidate_json_cache(file_path)
+        return {}
+
+    with _json_cache_lock:
+        cached = _json_cache.get(file_path)
+        if cached and cached[0] == signature:
+            _json_cache_stats["hits"] += 1
+            return cached[1]
+        _json_cache_stats["misses"] += 1
+
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            data = json.load(f)
     except FileNotFoundError:
         logger.warning(f"File {file_path} not found, returning empty dict")
         return {}
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in {file_path}: {e}")
+        _unreadable_files.add(file_path)
         return {}
 
-def save_json(file_path: str, data: Dict):
-    """Save data to a JSON file."""
+    _unreadable_files.discard(file_path)
+    with _json_cache_lock:
+        _json_cache[file_path] = (signature, data)
+    return data
+
+def save_json(file_path: str, data: Dict) -> bool:
+    """
+    Save data to a JSON file and refresh its cache entry.
+
+    The data is written to a temporary file which then replaces the target, so a
+    crash mid-write leaves the previous version intact instead of a truncated file.
+    """
+    directory = os.path.dirname(file_path) or "."
+    tmp_path = None
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        _fsync_directory(directory)
     except Exception as e:
         logger.error(f"Error saving to {file_path}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # The caller may already have modified the shared copy; drop it so the
+        # next read reflects what is actually on disk.
+        invalidate_json_cache(file_path)
+        return False
+
+    _unreadable_files.discard(file_path)
+    signature = _file_signature(file_path)
+    with _json_cache_lock:
+        if signature is None:
+            _json_cache.pop(file_path, None)
+        else:
+            _json_cache[file_path] = (signature, data)
+    return True
+
+def _fsync_directory(directory: str):
+    """Make a rename inside `directory` durable (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def invalidate_json_cache(file_path: Optional[str] = None):
+    """Drop the cached copy of one data file, or of all files if no path is given."""
+    with _json_cache_lock:
+        if file_path is None:
+            _json_cache.clear()
+        else:
+            _json_cache.pop(file_path, None)
+
+def get_json_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters and the number of cached files."""
+    with _json_cache_lock:
+        return {
+            "hits": _json_cache_stats["hits"],
+            "misses": _json_cache_stats["misses"],
+            "cached_files": len(_json_cache)
+        }
+
+# --- JSON Storage Backend ---
+
+# Append-only log of mutations not yet folded into the JSON snapshots
+JOURNAL_FILE = os.path.join(DATA_DIR, "journal.log")
+# fsync the journal after this many records, or when the oldest unsynced
+# record is older than JOURNAL_FSYNC_INTERVAL seconds
+JOURNAL_FSYNC_BATCH = 32
+JOURNAL_FSYNC_INTERVAL = 1.0
+# Rewrite the snapshots and truncate the journal after this many records
+JOURNAL_COMPACT_RECORDS = 5000
+
+class JsonStore:
+    """
+    The original storage format: one JSON document per table in DATA_DIR.
+
+    Mutations are applied in memory and appended to JOURNAL_FILE as one small
+    JSON line each, so a write costs O(record) instead of O(file). The journal is
+    fsync'd in batches and periodically compacted: dirty tables are written as
+    fresh snapshots (temp file + os.replace) and the journal is truncated.
+    On startup the journal is replayed on top of the snapshots.
+    """
+
+    name = "json"
+
+    # table -> (file path, key of the nested records dict or None for flat files)
+    TABLES = {
+        USERS: (USERS_FILE, None),
+        ADMINS: (ADMINS_FILE, None),
+        MOVIES: (MOVIES_FILE, "movies"),
+        CHANNELS: (CHANNELS_FILE, None),
+        REQUESTS: (REQUESTS_FILE, "requests"),
+        REQUEST_ARCHIVE: (REQUEST_ARCHIVE_FILE, None),
+        TOKENS: (TOKENS_FILE, None),
+        SPENT_TOKENS: (SPENT_TOKENS_FILE, None),
+    }
+
+    def __init__(self, journal_file: str = JOURNAL_FILE):
+        self.journal_file = journal_file
+        self._lock = threading.RLock()
+        self._journal = None
+        self._journal_records = 0
+        self._unsynced = 0
+        self._oldest_unsynced = 0.0
+        # Documents as last seen through load_json, per table
+        self._docs: Dict[str, Dict] = {}
+        # Operations logged since the last compaction, per table
+        self._pending: Dict[str, List[Dict]] = {}
+        # Sorted integer keys of the tables scan() has been used on, with the
+        # records dict they belong to; kept current by put() and delete()
+        self._sorted_keys: Dict[str, Tuple[Dict, List[int]]] = {}
+
+    def initialize(self):
+        """Create missing data files and replay the journal on top of them."""
+        for file_path, nested in self.TABLES.values():
+            if not os.path.exists(file_path):
+                default_data = {"next_id": 1, nested: {}} if nested else {}
+                save_json(file_path, default_data)
+                logger.info(f"Initialized {file_path}")
+
+        with self._lock:
+            replayed = self._replay_journal()
+            if replayed:
+                logger.info(f"Replayed {replayed} journal records")
+                self.compact()
+
+    # --- Documents and journal ---
+
+    def _records(self, data: Dict, table: str) -> Dict[str, Dict]:
+        nested = self.TABLES[table][1]
+        return data[nested] if nested else data
+
+    def _doc(self, table: str) -> Dict:
+        """Current document for a table: the snapshot plus journaled changes."""
+        file_path, nested = self.TABLES[table]
+        data = load_json(file_path)
+        if file_path in _unreadable_files or (nested and nested not in data):
+            # Never build on top of a damaged snapshot - compaction would
+            # overwrite the real data with an almost empty document.
+            raise RuntimeError(f"{file_path} could not be read; refusing to modify it")
+        if data is not self._docs.get(table):
+            # First access, or the snapshot was changed on disk: re-apply
+            # whatever the journal holds for this table.
+            for op in self._pending.get(table, []):
+                self._apply(data, op)
+            self._docs[table] = data
+        return data
+
+    def _apply(self, data: Dict, op: Dict):
+        if "n" in op:
+            data["next_id"] = op["n"]
+            return
+        records = self._records(data, op["t"])
+        if op.get("d"):
+            records.pop(op["k"], None)
+        else:
+            records[op["k"]] = op["v"]
+
+    def _log(self, op: Dict):
+        """Append one operation to the journal."""
+        if self._journal is None:
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        self._journal.write(json.dumps(op, ensure_ascii=False) + "\n")
+        # Hand the record to the OS right away so it survives a process crash;
+        # only the (much slower) fsync is batched.
+        self._journal.flush()
+        self._pending.setdefault(op["t"], []).append(op)
+        self._journal_records += 1
+
+        if self._unsynced == 0:
+            self._oldest_unsynced = time.monotonic()
+        self._unsynced += 1
+        if (self._unsynced >= JOURNAL_FSYNC_BATCH or
+                time.monotonic() - self._oldest_unsynced >= JOURNAL_FSYNC_INTERVAL):
+            self._sync()
+        if self._journal_records >= JOURNAL_COMPACT_RECORDS:
+            self.compact()
+
+    def _sync(self):
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+
+    def _replay_journal(self) -> int:
+        if not os.path.exists(self.journal_file):
+            return 0
+        replayed = 0
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-append; nothing after it was acknowledged
+                    logger.warning(f"Ignoring damaged journal record at line {line_number}")
+                    break
+                if op.get("t") not in self.TABLES:
+                    continue
+                self._apply(self._doc(op["t"]), op)
+                self._pending.setdefault(op["t"], []).append(op)
+                replayed += 1
+        self._journal_records = replayed
+        return replayed
+
+    def flush(self):
+        """fsync journal records that are still only in the OS buffers."""
+        with self._lock:
+            self._sync()
+
+    def compact(self):
+        """Write every dirty table as a new snapshot and truncate the journal."""
+        with self._lock:
+            self._sync()
+            for table in list(self._pending):
+                if not save_json(self.TABLES[table][0], self._doc(table)):
+                    # Keep the journal; it still holds the only copy of these changes
+                    logger.error(f"Compaction of '{table}' failed, journal kept")
+                    return
+                # save_json refreshed the cache with this same document
+                self._docs[table] = load_json(self.TABLES[table][0])
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            with open(self.journal_file, 'w', encoding='utf-8') as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.clear()
+            self._journal_records = 0
+            self._unsynced = 0
+
+    def close(self):
+        """Compact and release the journal (called on shutdown)."""
+        with self._lock:
+            if self._pending:
+                self.compact()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    # --- Generic record access ---
+
+    def get(self, table: str, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._records(self._doc(table), table).get(key)
+
+    def all(self, table: str) -> Dict[str, Dict]:
+        # A shallow copy, so callers can iterate while other threads write
+        with self._lock:
+            return dict(self._records(self._doc(table), table))
+
+    def count(self, table: str) -> int:
+        with self._lock:
+            return len(self._records(self._doc(table), table))
+
+    def _key_list(self, table: str, records: Dict[str, Dict]) -> List[int]:
+        """The table's integer keys in order, sorted once and then maintained."""
+        cached = self._sorted_keys.get(table)
+        if cached is None or cached[0] is not records:
+            # First scan, or the document was reloaded from disk
+            cached = self._sorted_keys[table] = (records, sorted(map(int, records)))
+        return cached[1]
+
+    def _track_key(self, table: str, records: Dict[str, Dict], key: str, present: bool):
+        cached = self._sorted_keys.get(table)
+        if cached is None or cached[0] is not records:
+            return
+        keys, int_key = cached[1], int(key)
+        position = bisect.bisect_left(keys, int_key)
+        found = position < len(keys) and keys[position] == int_key
+        if present and not found:
+            keys.insert(position, int_key)
+        elif not present and found:
+            del keys[position]
+
+    def scan(self, table: str, after: int, limit: int) -> List[Tuple[int, Dict]]:
+        """Up to `limit` records with integer keys above `after`, in key order."""
+        with self._lock:
+            records = self._records(self._doc(table), table)
+            keys = self._key_list(table, records)
+            start = bisect.bisect_right(keys, after)
+            return [(key, records[str(key)]) for key in keys[start:start + limit]]
+
+    def put(self, table: str, key: str, record: Dict):
+        with self._lock:
+            records = self._records(self._doc(table), table)
+            if key not in records:
+                self._track_key(table, records, key, True)
+            records[key] = record
+            self._log({"t": table, "k": key, "v": record})
+
+    def put_many(self, table: str, records: Dict[str, Dict]):
+        with self._lock:
+            for key, record in records.items():
+                self.put(table, key, record)
+
+    def delete(self, table: str, key: str) -> bool:
+        with self._lock:
+            records = self._records(self._doc(table), table)
+            if key not in records:
+                return False
+            del records[key]
+            self._track_key(table, records, key, False)
+            self._log({"t": table, "k": key, "d": 1})
+            return True
+
+    def delete_many(self, table: str, keys: List[str]) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self.delete(table, key))
+
+    def next_id(self, table: str) -> int:
+        with self._lock:
+            return self._doc(table)["next_id"]
+
+    def insert(self, table: str, id_field: str, record: Dict) -> int:
+        """Store a record under the next free id, which is also written to record[id_field]."""
+        with self._lock:
+            data = self._doc(table)
+            new_id = data["next_id"]
+            record[id_field] = new_id
+            data["next_id"] = new_id + 1
+            self._log({"t": table, "n": new_id + 1})
+            self.put(table, str(new_id), record)
+            return new_id
+
+    # --- Queries (full scans over the cached documents) ---
+
+    def titles(self) -> Dict[int, str]:
+        return {int(movie_id): movie_data.get("title", "") for movie_id, movie_data in self.all(MOVIES).items()}
+
+    def movie_categories(self) -> Dict[int, List[str]]:
+        return {int(movie_id): movie_data.get("categories", []) for movie_id, movie_data in self.all(MOVIES).items()}
+
+    def movie_uploads(self) -> Dict[int, Tuple[Optional[int], Optional[str], int]]:
+        return {
+            int(movie_id): (movie_data.get("added_by"), movie_data.get("added_at"), movie_data.get("download_count", 0))
+            for movie_id, movie_data in self.all(MOVIES).items()
+        }
+
+
+def _create_store():
+    """Pick the storage backend configured in config.STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "sqlite":
+        from sqlite_store import SqliteStore
+        return SqliteStore(SQLITE_DB_FILE)
+    if STORAGE_BACKEND != "json":
+        logger.error(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}', falling back to JSON files")
+    return JsonStore()
+
+_store = _create_store()
+# Stored ad tokens and the spent set, with expiry tracking
+_tokens = TokenStore(_store, TOKENS, SPENT_TOKENS)
+# Download counts live outside the movie records
+_downloads = DownloadCounters(COUNTERS_DIR)
+# Trending: a download's weight halves every TRENDING_HALF_LIFE seconds, and
+# every category keeps its TRENDING_SIZE best movies ranked
+TRENDING_HALF_LIFE = 24 * 3600
+TRENDING_SIZE = 30
+# Replaced by the saved analytics and scores in initialize_database()
+_analytics = DownloadAnalytics()
+_trending = TrendingScores(TRENDING_HALF_LIFE, TRENDING_SIZE)
+# Messages to auto-delete, kept on disk across restarts
+_deletions = DeletionQueue(DELETIONS_DIR)
+
+# Read-modify-write functions hold the lock of every table they change, so
+# concurrent calls from the async facade's worker threads cannot interleave.
+_table_locks = {table: threading.RLock() for table in JsonStore.TABLES}
+
+def _locked(*tables: str):
+    """Serialize a function against other writers of the given tables."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Always acquire in the same order to rule out deadlocks
+            locks = [_table_locks[table] for table in sorted(tables)]
+            for lock in locks:
+                lock.acquire()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                for lock in reversed(locks):
+                    lock.release()
+        return wrapper
+    return decorator
 
 # --- User Management Functions ---
 
+# /start is by far the most frequent update, so user records are kept in a
+# write-behind registry: upserts only touch memory and mark the user dirty,
+# and flush_users() writes the dirty records in one batch. It runs from a
+# job every USER_FLUSH_INTERVAL seconds, as soon as USER_FLUSH_MAX_PENDING
+# changes have piled up, and on shutdown.
+USER_FLUSH_INTERVAL = 10
+USER_FLUSH_MAX_PENDING = 500
+# Users kept in memory, least recently used dropped first. Only flushed
+# (clean) records are dropped, so memory stays bounded with the user base
+# on disk.
+USER_CACHE_SIZE = 10000
+
+_users: "OrderedDict[str, Dict]" = OrderedDict()
+_dirty_users = set()
+_users_lock = threading.RLock()
+
+def _get_user_record(user_id_str: str) -> Optional[Dict]:
+    """Return the registry's copy of a user, loading it from storage if it is not in memory."""
+    user = _users.get(user_id_str)
+    if user is not None:
+        _users.move_to_end(user_id_str)
+        return user
+    stored = _store.get(USERS, user_id_str)
+    if stored is not None:
+        user = dict(stored)
+        _remember_user(user_id_str, user)
+    return user
+
+def _remember_user(user_id_str: str, user: Dict):
+    """Keep a user in the registry, dropping the least recently used clean ones beyond USER_CACHE_SIZE."""
+    _users[user_id_str] = user
+    _users.move_to_end(user_id_str)
+    _trim_users()
+
+def _trim_users():
+    excess = len(_users) - USER_CACHE_SIZE
+    if excess <= 0:
+        return
+    # Dirty records stay until flushed, so look a little further than `excess`
+    for oldest in list(islice(_users, excess + len(_dirty_users))):
+        if excess <= 0:
+            break
+        if oldest not in _dirty_users:
+            del _users[oldest]
+            excess -= 1
+
+def _mark_user_dirty(user_id_str: str) -> bool:
+    """
+    Queue a user for the next flush. Returns True when enough changes have
+    piled up to flush now; the caller then calls flush_users() after
+    releasing _users_lock, since flush_users takes the USERS table lock
+    before _users_lock.
+    """
+    _dirty_users.add(user_id_str)
+    return len(_dirty_users) >= USER_FLUSH_MAX_PENDING
+
+@_locked(USERS)
+def flush_users() -> int:
+    """Write all pending user changes to storage. Returns the number written."""
+    with _users_lock:
+        if not _dirty_users:
+            return 0
+        batch = {user_id_str: dict(_users[user_id_str]) for user_id_str in _dirty_users}
+        _store.put_many(USERS, batch)
+        _dirty_users.clear()
+        _trim_users()
+    logger.info(f"Flushed {len(batch)} user records")
+    return len(batch)
+
 def user_exists(user_id: int) -> bool:
     """Check if a user exists in the database."""
-    users = load_json(USERS_FILE)
-    return str(user_id) in users
+    with _users_lock:
+        return _get_user_record(str(user_id)) is not None
+
+def get_user(user_id: int) -> Optional[Dict]:
+    """Get a user's record, including changes not flushed yet."""
+    with _users_lock:
+        user = _get_user_record(str(user_id))
+        return dict(user) if user else None
 
 def add_user_if_not_exists(user_id: int, first_name: str, username: Optional[str] = None) -> bool:
-    """Add a user to the database if they don't exist."""
-    users = load_json(USERS_FILE)
+    """Add a user to the database if they don't exist. Returns True for a new user."""
     user_id_str = str(user_id)
-    
-    if user_id_str not in users:
-        users[user_id_str] = {
-            "user_id": user_id,
-            "first_name": first_name,
-            "username": username,
-            "joined_at": datetime.now().isoformat(),
-            "is_active": True
-        }
-        save_json(USERS_FILE, users)
-        logger.info(f"Added new user: {user_id} ({first_name})")
-        return True
-    else:
-        # Update user info if changed
-        user = users[user_id_str]
-        updated = False
-        if user.get("first_name") != first_name:
-            user["first_name"] = first_name
-            updated = True
-        if user.get("username") != username:
-            user["username"] = username
-            updated = True
-        if updated:
-            save_json(USERS_FILE, users)
-        return False
+    flush_due = False
+
+    with _users_lock:
+        user = _get_user_record(user_id_str)
+        is_new = user is None
+
+        if is_new:
+            flush_due = _mark_user_dirty(user_id_str)
+            _remember_user(user_id_str, {
+                "user_id": user_id,
+                "first_name": first_name,
+                "username": username,
+                "joined_at": datetime.now().isoformat(),
+                "is_active": True
+            })
+            logger.info(f"Added new user: {user_id} ({first_name})")
+        else:
+            # Update user info if changed
+            updated = False
+            if user.get("first_name") != first_name:
+                user["first_name"] = first_name
+                updated = True
+            if user.get("username") != username:
+                user["username"] = username
+                updated = True
+            if user.get("is_active") is False:
+                # They blocked the bot once and are back; include them in broadcasts again
+                user["is_active"] = True
+                updated = True
+            if updated:
+                flush_due = _mark_user_dirty(user_id_str)
+
+    if flush_due:
+        flush_users()
+    return is_new
+
+def count_users() -> int:
+    """Number of stored users (active or not), not counting unflushed registrations."""
+    return _store.count(USERS)
+
+def get_active_user_chunk(after: int = 0, limit: int = 500) -> Tuple[Optional[int], List[int]]:
+    """
+    Stream the users table in id order without loading it whole: reads up to
+    `limit` users with ids above `after` and returns (cursor, ids of the
+    active ones). Pass the cursor back in for the next chunk; it is None
+    once every user has been read. Only stored users are read: call
+    flush_users() once before the first chunk.
+    """
+    rows = _store.scan(USERS, after, limit)
+    if not rows:
+        return None, []
+    return rows[-1][0], [user_id for user_id, user in rows if user.get("is_active", True)]
+
+def deactivate_users(user_ids: List[int]) -> int:
+    """Mark users who blocked the bot as inactive. Returns how many changed."""
+    changed = 0
+    flush_due = False
+    with _users_lock:
+        for user_id in user_ids:
+            user_id_str = str(user_id)
+            user = _get_user_record(user_id_str)
+            if user is not None and user.get("is_active", True):
+                user["is_active"] = False
+                flush_due = _mark_user_dirty(user_id_str) or flush_due
+                changed += 1
+    if flush_due:
+        flush_users()
+    if changed:
+        logger.info(f"Marked {changed} users inactive")
+    return changed
+
+# --- Role Cache ---
+# get_user_role runs on nearly every update (restricted, the cancel handlers,
+# auto cleanup, conversation steps), so roles are resolved from an in-memory
+# set of admin ids instead of the admins table. add_admin/remove_admin reload
+# it right away; refresh_role_cache() also runs every
+# ROLE_CACHE_REFRESH_INTERVAL seconds to pick up changes made outside the bot.
+ROLE_CACHE_REFRESH_INTERVAL = 60
+
+_admin_ids: frozenset = frozenset()
+_role_cache_lock = threading.Lock()
+_role_stats = {"lookups": 0, "refreshes": 0, "updates": 0, "max_lookups_per_update": 0}
+# Lookup counter of the update being processed (see count_role_lookups)
+_update_role_lookups: contextvars.ContextVar = contextvars.ContextVar("update_role_lookups", default=None)
+
+def refresh_role_cache() -> bool:
+    """Reload the admin ids from storage. Returns True if the set of admins changed."""
+    global _admin_ids
+    admin_ids = frozenset(int(admin_id) for admin_id in _store.all(ADMINS))
+    with _role_cache_lock:
+        changed = admin_ids != _admin_ids
+        _admin_ids = admin_ids
+        _role_stats["refreshes"] += 1
+    if changed:
+        logger.info(f"Role cache loaded with {len(admin_ids)} admins")
+    return changed
 
 def get_user_role(user_id: int) -> str:
     """Get the role of a user (owner/admin/user)."""
-    from config import OWNER_ID
-    
+    _role_stats["lookups"] += 1
+    counter = _update_role_lookups.get()
+    if counter is not None:
+        counter[0] += 1
+
     if user_id == OWNER_ID:
         return 'owner'
-    
-    admins = load_json(ADMINS_FILE)
-    if str(user_id) in admins:
+
+    if user_id in _admin_ids:
         return 'admin'
-    
+
     return 'user'
 
+@contextlib.contextmanager
+def count_role_lookups():
+    """
+    Count the get_user_role calls made while processing one update.
+
+    Yields a one-element list holding the running count. Lookups are counted
+    per asyncio task, so concurrent updates do not mix.
+    """
+    counter = [0]
+    token = _update_role_lookups.set(counter)
+    try:
+        yield counter
+    finally:
+        _update_role_lookups.reset(token)
+        with _role_cache_lock:
+            _role_stats["updates"] += 1
+            _role_stats["max_lookups_per_update"] = max(_role_stats["max_lookups_per_update"], counter[0])
+
+def get_role_cache_stats() -> Dict[str, int]:
+    """Return role lookup counters and the number of cached admins."""
+    with _role_cache_lock:
+        return {**_role_stats, "admins": len(_admin_ids)}
+
 # --- Admin Management Functions ---
 
+@_locked(ADMINS)
 def add_admin(admin_id: int, short_name: str, first_name: str, username: Optional[str] = None) -> bool:
     """Add a new admin to the database."""
-    admins = load_json(ADMINS_FILE)
     admin_id_str = str(admin_id)
-    
-    if admin_id_str in admins:
+
+    if _store.get(ADMINS, admin_id_str) is not None:
         logger.warning(f"Admin {admin_id} already exists")
         return False
-    
-    admins[admin_id_str] = {
+
+    _store.put(ADMINS, admin_id_str, {
         "user_id": admin_id,
         "short_name": short_name,
         "first_name": first_name,
         "username": username,
         "added_at": datetime.now().isoformat()
-    }
-    save_json(ADMINS_FILE, admins)
+    })
+    refresh_role_cache()
     logger.info(f"Added new admin: {admin_id} ({short_name})")
     return True
 
 def get_admin_info(admin_id: int) -> Optional[Dict]:
     """Get admin information by user ID."""
-    admins = load_json(ADMINS_FILE)
-    return admins.get(str(admin_id))
+    return _store.get(ADMINS, str(admin_id))
 
+@_locked(ADMINS)
 def remove_admin(identifier: str) -> bool:
     """Remove an admin by user ID or short name."""
-    admins = load_json(ADMINS_FILE)
-    
     # Try to find by user ID first
-    if identifier in admins:
-        del admins[identifier]
-        save_json(ADMINS_FILE, admins)
+    if identifier.isdigit() and _store.delete(ADMINS, identifier):
+        refresh_role_cache()
         logger.info(f"Removed admin with ID: {identifier}")
         return True
-    
+
     # Try to find by short name
-    for admin_id, admin_data in admins.items():
+    for admin_id, admin_data in _store.all(ADMINS).items():
         if admin_data.get("short_name") == identifier:
-            del admins[admin_id]
-            save_json(ADMINS_FILE, admins)
+            _store.delete(ADMINS, admin_id)
+            refresh_role_cache()
             logger.info(f"Removed admin with short name: {identifier}")
             return True
-    
+
     logger.warning(f"Admin not found: {identifier}")
     return False
 
 def get_all_admins() -> List[Dict]:
     """Get all admins."""
-    admins = load_json(ADMINS_FILE)
-    return list(admins.values())
+    return list(_store.all(ADMINS).values())
 
 # --- Movie Management Functions ---
 
+# In-memory catalog indexes, built from the stored titles on startup and kept
+# up to date by add_movie/delete_movie:
+# - a trigram index for search_movies, saved to TITLE_INDEX_FILE and loaded
+#   from there when it still matches the catalog
+# - titles grouped by alphabet bucket in title order, for alphabet browsing
+# - titles grouped by category in title order, for category browsing; the
+#   None key holds every movie (the "All 🌐" listing)
+# - movies per uploader, newest first, with per-uploader totals for the stats views
+_title_index: Optional[TitleIndex] = None
+_initial_index: Optional[TitleOrderIndex] = None
+_category_index: Optional[TitleOrderIndex] = None
+_uploader_index: Optional[UploaderIndex] = None
+_catalog_index_lock = threading.Lock()
+
+def _load_catalog_indexes():
+    global _title_index, _initial_index, _category_index, _uploader_index
+    with _catalog_index_lock:
+        if _title_index is not None:
+            return
+        titles = _store.titles()
+        categories = _store.movie_categories()
+
+        _initial_index = TitleOrderIndex.build(
+            (movie_id, title, [initial_bucket(title)]) for movie_id, title in titles.items()
+        )
+        _category_index = TitleOrderIndex.build(
+            (movie_id, title, [None, *categories.get(movie_id, [])]) for movie_id, title in titles.items()
+        )
+        _uploader_index = UploaderIndex.build(
+            (movie_id, added_by, added_at, _downloads.get(movie_id))
+            for movie_id, (added_by, added_at, _) in _store.movie_uploads().items()
+        )
+
+        index = TitleIndex.load(TITLE_INDEX_FILE, titles)
+        if index is None:
+            index = TitleIndex.build(titles)
+            index.save(TITLE_INDEX_FILE)
+            logger.info(f"Built title index for {len(index)} movies")
+        _title_index = index
+
+def _get_title_index() -> TitleIndex:
+    if _title_index is None:
+        _load_catalog_indexes()
+    return _title_index
+
+def _get_initial_index() -> TitleOrderIndex:
+    if _title_index is None:
+        _load_catalog_indexes()
+    return _initial_index
+
+def _get_category_index() -> TitleOrderIndex:
+    if _title_index is None:
+        _load_catalog_indexes()
+    return _category_index
+
+def _get_uploader_index() -> UploaderIndex:
+    if _title_index is None:
+        _load_catalog_indexes()
+    return _uploader_index
+
+def _index_movie(movie_id: int, movie_data: Dict):
+    title = movie_data.get("title", "")
+    _get_title_index().add(movie_id, title)
+    _get_initial_index().add(movie_id, title, [initial_bucket(title)])
+    _get_category_index().add(movie_id, title, [None, *movie_data.get("categories", [])])
+    _get_uploader_index().add(movie_id, movie_data.get("added_by"), movie_data.get("added_at"),
+                              _downloads.get(movie_id))
+
+def _unindex_movie(movie_id: int):
+    _get_title_index().remove(movie_id)
+    _get_initial_index().remove(movie_id)
+    _get_category_index().remove(movie_id)
+    _get_uploader_index().remove(movie_id)
+
+def _movies_by_ids(movie_ids: List[int]) -> List[Dict]:
+    """Fetch movie records in the given order, skipping any that no longer exist."""
+    results = []
+    for movie_id in movie_ids:
+        movie = _store.get(MOVIES, str(movie_id))
+        if movie is not None:
+            results.append(_with_download_count(movie))
+    return results
+
+def _with_download_count(movie: Dict) -> Dict:
+    """A copy of a movie record carrying its current download count."""
+    return {**movie, "download_count": _downloads.get(int(movie["movie_id"]))}
+
+def save_title_index():
+    """Write the title index to disk if it changed since it was last saved."""
+    if _title_index is not None and _title_index.dirty:
+        _title_index.save(TITLE_INDEX_FILE)
+
+@_locked(MOVIES)
 def add_movie(movie_data: Dict) -> int:
     """Add a new movie to the database."""
-    movies = load_json(MOVIES_FILE)
-    movie_id = movies["next_id"]
-    
-    movie_data["movie_id"] = movie_id
     movie_data["added_at"] = datetime.now().isoformat()
-    movie_data["download_count"] = 0
-    
-    movies["movies"][str(movie_id)] = movie_data
-    movies["next_id"] += 1
-    
-    save_json(MOVIES_FILE, movies)
+
+    movie_id = _store.insert(MOVIES, "movie_id", movie_data)
+    _index_movie(movie_id, movie_data)
     logger.info(f"Added new movie: {movie_id} - {movie_data.get('title')}")
     return movie_id
 
 def get_movie_details(movie_id: int) -> Optional[Dict]:
     """Get movie details by ID."""
-    movies = load_json(MOVIES_FILE)
-    return movies["movies"].get(str(movie_id))
+    movie = _store.get(MOVIES, str(movie_id))
+    return _with_download_count(movie) if movie is not None else None
 
 def search_movies(query: str, limit: int = 10) -> List[Dict]:
-    """Search movies by title."""
-    movies = load_json(MOVIES_FILE)
-    results = []
-    
-    query_lower = query.lower()
-    for movie_data in movies["movies"].values():
-        title = movie_data.get("title", "").lower()
-        if query_lower in title:
-            results.append(movie_data)
-            if len(results) >= limit:
-                break
-    
-    return results
+    """Search movies by title, best match first (see catalog_index.match_score), weighted by downloads."""
+    return _movies_by_ids(_get_title_index().search(query, limit, downloads=_downloads.get))
 
-def get_movies_by_first_letter(letter: str, limit: int = 30) -> List[Dict]:
-    """Get movies that start with a specific letter."""
-    movies = load_json(MOVIES_FILE)
-    results = []
-    
-    letter_upper = letter.upper()
-    for movie_data in movies["movies"].values():
-        title = movie_data.get("title", "")
-        if title and title[0].upper() == letter_upper:
-            results.append(movie_data)
-            if len(results) >= limit:
-                break
-    
-    return results
+def suggest_movies(query: str, limit: int = 3) -> List[Dict]:
+    """Movies whose title looks like a misspelling of `query`, closest first ("Did you mean...")."""
+    return _movies_by_ids([movie_id for movie_id, _ in _get_title_index().similar(query, limit)])
+
+def get_movies_by_first_letter(letter: str, limit: int = 30, offset: int = 0) -> List[Dict]:
+    """
+    Get one page of the movies in a letter's alphabet bucket, sorted by title.
+
+    `letter` may also be a digit, a letter of another script or a bucket id;
+    see catalog_index.initial_bucket for how titles are bucketed.
+    """
+    return _movies_by_ids(_get_initial_index().page(letter_bucket(letter), offset, limit))
+
+def count_movies_by_first_letter(letter: str) -> int:
+    """Number of movies in a letter's alphabet bucket."""
+    return _get_initial_index().count(letter_bucket(letter))
 
 def get_movies_by_category(category: str, limit: int = 10, offset: int = 0) -> List[Dict]:
     """Get movies by category with pagination support."""
-    movies = load_json(MOVIES_FILE)
-    
-    if category == "All 🌐":
-        # Return all movies for alphabet filtering
-        all_matching = list(movies["movies"].values())
-    else:
-        # First collect all matching movies - handle exact category match
-        all_matching = []
-        for movie_data in movies["movies"].values():
-            categories = movie_data.get("categories", [])
-            # Check for exact category match
-            for movie_category in categories:
-                if category == movie_category:
-                    all_matching.append(movie_data)
-                    break
-    
-    # Sort by title for consistent ordering
-    all_matching.sort(key=lambda x: x.get('title', '').lower())
-    
-    # Apply offset and limit
-    start_index = offset
-    end_index = offset + limit
-    results = all_matching[start_index:end_index]
-    
-    logger.info(f"Category search for '{category}': found {len(all_matching)} movies, returning {len(results)}")
+    # "All 🌐" returns every movie (used for alphabet filtering)
+    key = None if category == "All 🌐" else category
+    results = _movies_by_ids(_get_category_index().page(key, offset, limit))
+
+    logger.info(f"Category search for '{category}': returning {len(results)} movies from offset {offset}")
     return results
 
+def get_all_categories() -> List[str]:
+    """Get every category that has at least one movie."""
+    return [key for key in _get_category_index().keys() if key is not None]
+
+@_locked(MOVIES)
 def delete_movie(movie_id: int) -> bool:
     """Delete a movie from the database."""
-    movies = load_json(MOVIES_FILE)
-    movie_id_str = str(movie_id)
-    
-    if movie_id_str in movies["movies"]:
-        del movies["movies"][movie_id_str]
-        save_json(MOVIES_FILE, movies)
+    if _store.delete(MOVIES, str(movie_id)):
+        _unindex_movie(int(movie_id))
+        _downloads.remove(int(movie_id))
+        _analytics.forget_movie(int(movie_id))
+        _trending.forget(int(movie_id))
         logger.info(f"Deleted movie: {movie_id}")
         return True
-    
+
     return False
 
-def increment_download_count(movie_id: int):
-    """Increment the download count for a movie."""
-    movies = load_json(MOVIES_FILE)
-    movie_id_str = str(movie_id)
-    
-    if movie_id_str in movies["movies"]:
-        movies["movies"][movie_id_str]["download_count"] = movies["movies"][movie_id_str].get("download_count", 0) + 1
-        save_json(MOVIES_FILE, movies)
+# A download only bumps an in-memory counter; flush_download_counts() writes
+# the changed counter shards every DOWNLOAD_FLUSH_INTERVAL seconds (see
+# main.py), as soon as DOWNLOAD_FLUSH_MAX_PENDING downloads have piled up,
+# and on shutdown. The movie records are only written when admins edit them.
+DOWNLOAD_FLUSH_INTERVAL = 10
+DOWNLOAD_FLUSH_MAX_PENDING = 1000
+
+def increment_download_count(movie_id: int, quality: Optional[str] = None):
+    """Increment the download count for a movie and record it in the analytics."""
+    movie_id = int(movie_id)
+    movie = _store.get(MOVIES, str(movie_id))
+    if movie is None:
+        return
+
+    _downloads.increment(movie_id)
+    _get_uploader_index().record_download(movie_id)
+    _analytics.record(movie_id, quality, movie.get("categories", []), movie.get("added_by"))
+    _trending.record(movie_id, movie.get("categories", []))
+    if _downloads.pending >= DOWNLOAD_FLUSH_MAX_PENDING:
+        flush_download_counts()
+
+def flush_download_counts() -> int:
+    """Write pending download counts to disk. Returns the number of shard files written."""
+    return _downloads.flush()
+
+# --- Download Analytics ---
+
+# The analytics only feed reports, so they are saved less often than the
+# counters; a crash loses at most this many seconds of trend data.
+ANALYTICS_SAVE_INTERVAL = 300
+
+def save_download_analytics():
+    """Write the analytics buckets and trending scores to disk if downloads were recorded since the last save."""
+    if _analytics.dirty:
+        _analytics.save(ANALYTICS_FILE)
+    if _trending.dirty:
+        _trending.save(TRENDING_FILE)
+
+def get_download_windows() -> Dict[str, int]:
+    """All downloads in the last 24h, 7d and 30d."""
+    return _analytics.windows(("all",))
+
+def get_movie_download_windows(movie_id: int) -> Dict[str, Dict[str, int]]:
+    """A movie's downloads in the last 24h, 7d and 30d, in total and per quality."""
+    movie_id = int(movie_id)
+    windows = {"total": _analytics.windows(("movie", movie_id))}
+    for quality in _analytics.qualities(movie_id):
+        windows[quality] = _analytics.windows(("quality", movie_id, quality))
+    return windows
+
+def get_category_download_windows(category: str) -> Dict[str, int]:
+    """Downloads of a category's movies in the last 24h, 7d and 30d."""
+    return _analytics.windows(("category", category))
+
+def get_uploader_download_windows(admin_id: int) -> Dict[str, int]:
+    """Downloads of the movies an admin uploaded, in the last 24h, 7d and 30d."""
+    return _analytics.windows(("uploader", int(admin_id)))
+
+def get_trending_movies(category: Optional[str] = None, limit: int = TRENDING_SIZE) -> List[Dict]:
+    """
+    The most popular movies right now, best first, overall or in one
+    category. Each carries its decayed score as "trending_score".
+    """
+    ranked = _trending.top(category, limit)
+    movies = _movies_by_ids([movie_id for movie_id, _ in ranked])
+    scores = dict(ranked)
+    for movie in movies:
+        movie["trending_score"] = scores[int(movie["movie_id"])]
+    return movies
 
 # --- Channel Management Functions ---
 
+@_locked(CHANNELS)
 def add_channel(channel_id: str, channel_name: str, short_name: str) -> bool:
     """Add a new channel to the database."""
-    channels = load_json(CHANNELS_FILE)
-    
-    if channel_id in channels:
+    if _store.get(CHANNELS, channel_id) is not None:
         logger.warning(f"Channel {channel_id} already exists")
         return False
-    
-    channels[channel_id] = {
+
+    _store.put(CHANNELS, channel_id, {
         "channel_id": channel_id,
         "channel_name": channel_name,
         "short_name": short_name,
         "added_at": datetime.now().isoformat()
-    }
-    save_json(CHANNELS_FILE, channels)
+    })
     logger.info(f"Added new channel: {channel_id} ({short_name})")
     return True
 
+@_locked(CHANNELS)
 def remove_channel(identifier: str) -> bool:
     """Remove a channel by ID or short name."""
-    channels = load_json(CHANNELS_FILE)
-    
     # Try to find by channel ID first
-    if identifier in channels:
-        del channels[identifier]
-        save_json(CHANNELS_FILE, channels)
+    if _store.delete(CHANNELS, identifier):
         logger.info(f"Removed channel with ID: {identifier}")
         return True
-    
+
     # Try to find by short name
-    for channel_id, channel_data in channels.items():
+    for channel_id, channel_data in _store.all(CHANNELS).items():
         if channel_data.get("short_name") == identifier:
-            del channels[channel_id]
-            save_json(CHANNELS_FILE, channels)
+            _store.delete(CHANNELS, channel_id)
             logger.info(f"Removed channel with short name: {identifier}")
             return True
-    
+
     logger.warning(f"Channel not found: {identifier}")
     return False
 
 def get_channel_info(channel_id: str) -> Optional[Dict]:
     """Get channel information by channel ID."""
-    channels = load_json(CHANNELS_FILE)
-    return channels.get(channel_id)
+    return _store.get(CHANNELS, channel_id)
 
 def get_all_channels() -> List[Dict]:
     """Get all channels."""
-    channels = load_json(CHANNELS_FILE)
-    return list(channels.values())
+    return list(_store.all(CHANNELS).values())
 
 # --- Request Management Functions ---
 
+@_locked(REQUESTS)
 def add_movie_request(user_id: int, movie_name: str) -> int:
     """Add a new movie request."""
-    requests = load_json(REQUESTS_FILE)
-    request_id = requests["next_id"]
-    
-    requests["requests"][str(request_id)] = {
-        "request_id": request_id,
+    request_id = _store.insert(REQUESTS, "request_id", {
         "user_id": user_id,
         "movie_name": movie_name,
         "status": "pending",
         "requested_at": datetime.now().isoformat()
-    }
-    requests["next_id"] += 1
-    
-    save_json(REQUESTS_FILE, requests)
+    })
+    _get_request_index().add(request_id, _request_demand_key(movie_name))
     logger.info(f"Added new movie request: {request_id} - {movie_name} by user {user_id}")
     return request_id
 
-def get_pending_requests(limit: int = 10) -> List[Dict]:
-    """Get pending movie requests."""
-    requests = load_json(REQUESTS_FILE)
-    users = load_json(USERS_FILE)
-    
+def _request_demand_key(movie_name: str) -> str:
+    # Requests for the same movie differ in case and spacing more often than in spelling
+    return " ".join(movie_name.lower().split())
+
+# The pending queue in both listing orders, maintained by add_movie_request
+# and update_request_status, so a page of requests is a slice rather than a
+# scan, count and sort of the whole queue.
+_request_index: Optional[PendingRequestIndex] = None
+
+@_locked(REQUESTS)
+def _load_request_index():
+    global _request_index
+    _request_index = PendingRequestIndex.build(
+        (int(request_id), _request_demand_key(request_data["movie_name"]))
+        for request_id, request_data in _store.all(REQUESTS).items()
+    )
+
+def _get_request_index() -> PendingRequestIndex:
+    if _request_index is None:
+        _load_request_index()
+    return _request_index
+
+def get_pending_requests(limit: int = 10, offset: int = 0, order: str = "age") -> List[Dict]:
+    """
+    Get one page of pending movie requests.
+
+    `order` is "age" (oldest first) or "demand" (most requested movie first,
+    then oldest). Each request gets a "demand" field: how many pending
+    requests there are for the same movie. Only the requests and users of
+    the returned page are looked up.
+    """
     pending_requests = []
-    for request_data in requests["requests"].values():
-        if request_data.get("status") == "pending":
-            # Add user info
-            user_id = request_data["user_id"]
-            user_info = users.get(str(user_id), {})
-            request_data["users"] = user_info
-            pending_requests.append(request_data)
-            if len(pending_requests) >= limit:
-                break
-    
+    for request_id, demand in _get_request_index().page(order, offset, limit):
+        request_data = _store.get(REQUESTS, str(request_id))
+        if request_data is None:
+            # Handled since the page was read
+            continue
+        # Add user info (copy so cached request data is not modified)
+        user_info = get_user(request_data["user_id"]) or {}
+        pending_requests.append({
+            **request_data,
+            "users": user_info,
+            "demand": demand
+        })
+
     return pending_requests
 
+def count_pending_requests() -> int:
+    """Number of requests waiting for an admin."""
+    return _store.count(REQUESTS)
+
+@_locked(REQUESTS, REQUEST_ARCHIVE)
 def update_request_status(request_id: int, status: str) -> Optional[Dict]:
-    """Update the status of a movie request."""
-    requests = load_json(REQUESTS_FILE)
+    """
+    Update the status of a movie request.
+
+    Handled requests (any status but "pending") move from the pending queue to
+    the archive, so the queue only ever holds open requests.
+    """
     request_id_str = str(request_id)
-    
-    if request_id_str in requests["requests"]:
-        requests["requests"][request_id_str]["status"] = status
-        requests["requests"][request_id_str]["updated_at"] = datetime.now().isoformat()
-        save_json(REQUESTS_FILE, requests)
+    request_data = _store.get(REQUESTS, request_id_str)
+
+    if request_data is not None:
+        request_data = dict(request_data)
+        request_data["status"] = status
+        request_data["updated_at"] = datetime.now().isoformat()
+        if status == "pending":
+            _store.put(REQUESTS, request_id_str, request_data)
+        else:
+            _store.put(REQUEST_ARCHIVE, request_id_str, request_data)
+            _store.delete(REQUESTS, request_id_str)
+            _get_request_index().remove(int(request_id))
         logger.info(f"Updated request {request_id} status to {status}")
-        return requests["requests"][request_id_str]
-    
+        return request_data
+
     return None
 
+@_locked(REQUESTS, REQUEST_ARCHIVE)
+def _archive_handled_requests():
+    """Move handled requests left in the pending queue (e.g. from older versions) to the archive."""
+    handled = {
+        request_id: request_data for request_id, request_data in _store.all(REQUESTS).items()
+        if request_data.get("status", "pending") != "pending"
+    }
+    if handled:
+        _store.put_many(REQUEST_ARCHIVE, handled)
+        _store.delete_many(REQUESTS, list(handled))
+        logger.info(f"Moved {len(handled)} handled requests to the archive")
+
 # --- Token Management Functions for Ad System ---
 
-def create_ad_token(user_id: int, movie_id: int, quality: str) -> Optional[str]:
-    """Create a token for ad-based download."""
-    tokens = load_json(TOKENS_FILE)
-    
-    # Create a unique token
-    timestamp = str(int(time.time()))
-    token_data = f"{user_id}_{movie_id}_{quality}_{timestamp}"
-    token = hashlib.sha256(token_data.encode()).hexdigest()[:32]
-    
-    # Get file info
-    movie_details = get_movie_details(movie_id)
-    if not movie_details:
-        logger.error(f"Movie not found: {movie_id}")
-        return None
-    
+# How long an ad link stays valid
+AD_TOKEN_TTL = timedelta(hours=24)
+# An unused link is handed out again while it has at least this long to live
+AD_TOKEN_REUSE_MIN_TTL = timedelta(hours=1)
+# How often expired tokens and spent ids are purged (see main.py)
+TOKEN_SWEEP_INTERVAL = 300
+
+def _file_id_for_quality(movie_details: Dict, quality: str) -> Optional[str]:
+    """The Telegram file id stored for one quality of a movie, if there is one."""
     files = movie_details.get("files", {})
     if quality not in files:
-        logger.error(f"Quality {quality} not found for movie {movie_id}")
         return None
-    
+
     file_info = files[quality]
     # Handle different file storage formats
     if isinstance(file_info, list) and len(file_info) > 0:
-        file_id = file_info[0]  # Take first file ID from list
+        return file_info[0]  # Take first file ID from list
     elif isinstance(file_info, tuple):
-        file_id = file_info[0]  # Take first from tuple
+        return file_info[0]  # Take first from tuple
     else:
-        file_id = file_info  # Direct file ID
-    
-    # Store token with expiry (24 hours)
-    expiry_time = datetime.now() + timedelta(hours=24)
-    tokens[token] = {
+        return file_info  # Direct file ID
+
+@_locked(TOKENS)
+def create_ad_token(user_id: int, movie_id: int, quality: str) -> Optional[str]:
+    """Create a token for ad-based download, or reuse the user's unused one."""
+    # Get file info
+    movie_details = get_movie_details(movie_id)
+    if not movie_details:
+        logger.error(f"Movie not found: {movie_id}")
+        return None
+
+    file_id = _file_id_for_quality(movie_details, quality)
+    if file_id is None:
+        logger.error(f"Quality {quality} not found for movie {movie_id}")
+        return None
+
+    token = _tokens.find_live(user_id, movie_id, quality, AD_TOKEN_REUSE_MIN_TTL.total_seconds())
+    if token:
+        logger.info(f"Reusing ad token for user {user_id}, movie {movie_id}, quality {quality}")
+        return token
+
+    expiry_time = datetime.now() + AD_TOKEN_TTL
+
+    if AD_TOKEN_MODE == "signed":
+        expires = int(expiry_time.timestamp())
+        token = ad_tokens.issue_token(user_id, movie_id, quality, expires)
+        if token:
+            _tokens.remember_signed(user_id, movie_id, quality, token, ad_tokens.token_id(token),
+                                    datetime.fromtimestamp(expires).isoformat())
+            logger.info(f"Created signed ad token for user {user_id}, movie {movie_id}, quality {quality}")
+            return token
+        logger.warning(f"Signed token too long for quality '{quality}', storing a token instead")
+
+    # Create a unique token. It is random rather than derived from the user,
+    # movie and time: a token minted again within the same second after the
+    # first was used would otherwise collide with the spent one.
+    token = secrets.token_hex(16)
+
+    # Store token with expiry
+    _tokens.put(token, {
         "user_id": user_id,
         "movie_id": movie_id,
         "quality": quality,
@@ -416,87 +1264,219 @@ def create_ad_token(user_id: int, movie_id: int, quality: str) -> Optional[str]:
         "created_at": datetime.now().isoformat(),
         "expires_at": expiry_time.isoformat(),
         "used": False
-    }
-    
-    save_json(TOKENS_FILE, tokens)
+    })
+
     logger.info(f"Created ad token for user {user_id}, movie {movie_id}, quality {quality}")
     return token
 
 def validate_ad_token(token: str, user_id: int) -> Optional[str]:
-    """Validate a token and return the file ID if valid."""
-    tokens = load_json(TOKENS_FILE)
-    
-    if token not in tokens:
-        logger.warning(f"Token not found: {token}")
-        return None
-    
-    token_data = tokens[token]
-    
-    # Check if token is for the correct user
-    if token_data["user_id"] != user_id:
+    """
+    Validate a token and return the file ID if valid.
+
+    A token delivers its file exactly once, however many updates carrying it
+    are processed at the same time: the check-and-use step is the token
+    store's compare-and-set, which only locks this one token.
+    """
+    claims = ad_tokens.read_token(token)
+    if claims is not None:
+        return _validate_signed_token(token, claims, user_id)
+
+    with _tokens.locked(token):
+        token_data = _tokens.get(token)
+
+        if token_data is None:
+            if _tokens.is_spent(token):
+                logger.warning(f"Token already used: {token}")
+            else:
+                logger.warning(f"Token not found: {token}")
+            return None
+
+        # Check if token is for the correct user
+        if token_data["user_id"] != user_id:
+            logger.warning(f"Token user mismatch: {token}")
+            return None
+
+        # Check if token is expired
+        expiry_time = datetime.fromisoformat(token_data["expires_at"])
+        if datetime.now() > expiry_time:
+            logger.warning(f"Token expired: {token}")
+            _tokens.discard(token)
+            return None
+
+        # Mark token as used: it moves from the live table to the spent set
+        if not _tokens.consume(token, token_data["expires_at"]):
+            logger.warning(f"Token already used: {token}")
+            return None
+
+    # Increment download count
+    increment_download_count(token_data["movie_id"], token_data["quality"])
+
+    logger.info(f"Token validated successfully: {token}")
+    return token_data["file_id"]
+
+def _validate_signed_token(token: str, claims: ad_tokens.TokenClaims, user_id: int) -> Optional[str]:
+    """
+    Check a signed token. Its signature was already verified; only its id is
+    written (to the spent set) once the download goes ahead.
+    """
+    if claims.user_id != user_id:
         logger.warning(f"Token user mismatch: {token}")
         return None
-    
-    # Check if token is expired
-    expiry_time = datetime.fromisoformat(token_data["expires_at"])
+
+    expiry_time = datetime.fromtimestamp(claims.expires)
     if datetime.now() > expiry_time:
         logger.warning(f"Token expired: {token}")
-        del tokens[token]
-        save_json(TOKENS_FILE, tokens)
         return None
-    
-    # Check if token is already used
-    if token_data.get("used", False):
+
+    movie_details = get_movie_details(claims.movie_id)
+    file_id = _file_id_for_quality(movie_details, claims.quality) if movie_details else None
+    if file_id is None:
+        logger.warning(f"Token for a movie or quality that no longer exists: {token}")
+        return None
+
+    # Spent ids only need to be kept until the token would have expired anyway
+    if not _tokens.consume(claims.token_id, expiry_time.isoformat()):
         logger.warning(f"Token already used: {token}")
         return None
-    
-    # Mark token as used
-    tokens[token]["used"] = True
-    tokens[token]["used_at"] = datetime.now().isoformat()
-    save_json(TOKENS_FILE, tokens)
-    
-    # Increment download count
-    increment_download_count(token_data["movie_id"])
-    
+    increment_download_count(claims.movie_id, claims.quality)
+
     logger.info(f"Token validated successfully: {token}")
-    return token_data["file_id"]
+    return file_id
 
-def cleanup_expired_tokens():
-    """Clean up expired tokens."""
-    tokens = load_json(TOKENS_FILE)
-    now = datetime.now()
-    
-    expired_tokens = []
-    for token, token_data in tokens.items():
-        expiry_time = datetime.fromisoformat(token_data["expires_at"])
-        if now > expiry_time:
-            expired_tokens.append(token)
-    
-    for token in expired_tokens:
-        del tokens[token]
-    
-    if expired_tokens:
-        save_json(TOKENS_FILE, tokens)
-        logger.info(f"Cleaned up {len(expired_tokens)} expired tokens")
+@_locked(TOKENS, SPENT_TOKENS)
+def cleanup_expired_tokens() -> int:
+    """Purge expired tokens and spent ids. Runs every TOKEN_SWEEP_INTERVAL seconds."""
+    return _tokens.sweep()
+
+def get_token_stats() -> Dict:
+    """Token table sizes and purge counters."""
+    return _tokens.stats()
+
+# --- Scheduled Message Deletion ---
+# Auto-deleted messages go into a durable queue bucketed by minute instead
+# of one scheduler job each. Scheduling only touches memory; a single job
+# (see main.py) runs every DELETION_DRAIN_INTERVAL seconds, writes the new
+# entries to their bucket files and deletes the messages of the due
+# buckets, at most about DELETION_DRAIN_BATCH per run.
+DELETION_DRAIN_INTERVAL = 10
+DELETION_DRAIN_BATCH = 2000
+# Deletions that failed for a transient reason are tried again this much later
+DELETION_RETRY_DELAY = 60
+
+def schedule_message_deletion(chat_id: int, message_id: int, delay_seconds: float):
+    """Queue a message for deletion after `delay_seconds`."""
+    _deletions.schedule(chat_id, message_id, delay_seconds)
+
+def get_due_deletions(limit: int = DELETION_DRAIN_BATCH) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """
+    (bucket minutes, (chat_id, message_id) pairs) of the deletions that are
+    due. Call finish_deletions() with the minutes once they were carried out.
+    """
+    return _deletions.due(limit)
+
+def finish_deletions(minutes: List[int], retry: Iterable[Tuple[int, int]] = ()):
+    """
+    Drop drained buckets. The (chat_id, message_id) pairs in `retry` failed
+    for a transient reason; they are queued again DELETION_RETRY_DELAY
+    seconds from now, and written out before their buckets are removed.
+    """
+    retry = list(retry)
+    for chat_id, message_id in retry:
+        _deletions.schedule(chat_id, message_id, DELETION_RETRY_DELAY)
+    if retry:
+        _deletions.flush()
+    _deletions.done(minutes)
+
+def get_deletion_queue_stats() -> Dict[str, int]:
+    return {"buckets": _deletions.buckets, "buffered": _deletions.buffered}
 
 # --- Stats Functions ---
 
-# Removed duplicate function - using the correct one above
-
-def get_movies_by_uploader(admin_id: int, limit: int = 30) -> List[dict]:
-    """Get movies uploaded by specific admin/owner."""
-    movies = load_json(MOVIES_FILE)
-    
-    admin_movies = [
-        movie for movie in movies.values() 
-        if movie.get('added_by') == admin_id
-    ]
-    
-    # Sort by date added (newest first)
-    admin_movies.sort(key=lambda x: x.get('added_at', ''), reverse=True)
-    return admin_movies[:limit]
-
-def get_all_admins() -> List[dict]:
-    """Get all admins for stats selection."""
-    admins = load_json(ADMINS_FILE)
-    return list(admins.values())
+def get_movies_by_uploader(admin_id: int, limit: int = 30, cursor: Optional[str] = None) -> List[dict]:
+    """
+    Get movies uploaded by specific admin/owner, newest first.
+
+    Pass uploader_cursor() of the last movie of a page as `cursor` to get the
+    next page.
+    """
+    return _movies_by_ids(_get_uploader_index().page(admin_id, limit, cursor))
+
+def uploader_cursor(movie: Dict) -> str:
+    """Paging cursor pointing just after `movie` in get_movies_by_uploader."""
+    return make_cursor(movie.get("added_at"), movie["movie_id"])
+
+def get_uploader_stats(admin_id: int) -> Dict[str, int]:
+    """Movies uploaded by an admin/owner and the downloads of those movies."""
+    return _get_uploader_index().totals(admin_id)
+
+# --- Async Facade ---
+# Handlers run on the asyncio event loop and must not block it with file I/O
+# or JSON parsing. Every public function has an `a`-prefixed coroutine twin
+# (e.g. `await db.aget_movie_details(movie_id)`) that runs it on a small,
+# bounded thread pool.
+DB_WORKER_THREADS = 4
+_executor = ThreadPoolExecutor(max_workers=DB_WORKER_THREADS, thread_name_prefix="database")
+
+def _in_executor(func):
+    """Wrap a blocking database function into a coroutine function."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+    wrapper.__name__ = f"a{func.__name__}"
+    wrapper.__qualname__ = wrapper.__name__
+    return wrapper
+
+asave_json = _in_executor(save_json)
+aflush_storage = _in_executor(flush_storage)
+aflush_users = _in_executor(flush_users)
+auser_exists = _in_executor(user_exists)
+aget_user = _in_executor(get_user)
+aadd_user_if_not_exists = _in_executor(add_user_if_not_exists)
+arefresh_role_cache = _in_executor(refresh_role_cache)
+acount_users = _in_executor(count_users)
+aget_active_user_chunk = _in_executor(get_active_user_chunk)
+adeactivate_users = _in_executor(deactivate_users)
+
+async def aget_user_role(user_id: int) -> str:
+    # Served from the role cache, so it does not need a worker thread. Staying
+    # on the event loop also keeps it inside the update's count_role_lookups().
+    return get_user_role(user_id)
+
+aadd_admin = _in_executor(add_admin)
+aget_admin_info = _in_executor(get_admin_info)
+aremove_admin = _in_executor(remove_admin)
+aget_all_admins = _in_executor(get_all_admins)
+aadd_movie = _in_executor(add_movie)
+aget_movie_details = _in_executor(get_movie_details)
+asearch_movies = _in_executor(search_movies)
+asuggest_movies = _in_executor(suggest_movies)
+aget_movies_by_first_letter = _in_executor(get_movies_by_first_letter)
+acount_movies_by_first_letter = _in_executor(count_movies_by_first_letter)
+aget_movies_by_category = _in_executor(get_movies_by_category)
+aget_all_categories = _in_executor(get_all_categories)
+adelete_movie = _in_executor(delete_movie)
+aincrement_download_count = _in_executor(increment_download_count)
+aflush_download_counts = _in_executor(flush_download_counts)
+asave_download_analytics = _in_executor(save_download_analytics)
+aget_download_windows = _in_executor(get_download_windows)
+aget_movie_download_windows = _in_executor(get_movie_download_windows)
+aget_category_download_windows = _in_executor(get_category_download_windows)
+aget_uploader_download_windows = _in_executor(get_uploader_download_windows)
+aget_trending_movies = _in_executor(get_trending_movies)
+aadd_channel = _in_executor(add_channel)
+aremove_channel = _in_executor(remove_channel)
+aget_channel_info = _in_executor(get_channel_info)
+aget_all_channels = _in_executor(get_all_channels)
+aadd_movie_request = _in_executor(add_movie_request)
+aget_pending_requests = _in_executor(get_pending_requests)
+acount_pending_requests = _in_executor(count_pending_requests)
+aupdate_request_status = _in_executor(update_request_status)
+acreate_ad_token = _in_executor(create_ad_token)
+avalidate_ad_token = _in_executor(validate_ad_token)
+acleanup_expired_tokens = _in_executor(cleanup_expired_tokens)
+aget_due_deletions = _in_executor(get_due_deletions)
+afinish_deletions = _in_executor(finish_deletions)
+aget_token_stats = _in_executor(get_token_stats)
+aget_movies_by_uploader = _in_executor(get_movies_by_uploader)
+aget_uploader_stats = _in_executor(get_uploader_stats)
@@ -0,0 +1,146 @@
+# MovieZoneBot/deletion_queue.py
+
+import math
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 60
+
+
+class DeletionQueue:
+    """
+    Messages to delete later, bucketed by the minute they become due.
+
+    Each minute is one small append-only file of "chat_id message_id" lines
+    in `directory`. schedule() only appends to an in-memory buffer; flush()
+    writes the buffer out, so scheduling costs no I/O and the process keeps
+    nothing per message but the entries not flushed yet. A crash loses at
+    most the schedules made since the last flush, and a restart picks up
+    every bucket still on disk.
+
+    Draining is two-step: due() reads the buckets that are due and done()
+    removes them once their messages were deleted, so a crash in between
+    only means trying those deletions again.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._buffer: Dict[int, List[Tuple[int, int]]] = {}
+        self._buffered = 0
+        self._minutes: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def _bucket_file(self, minute: int) -> str:
+        return os.path.join(self.directory, f"{minute}.txt")
+
+    def load(self):
+        """Find the buckets left on disk."""
+        os.makedirs(self.directory, exist_ok=True)
+        minutes = set()
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".txt" and stem.isdigit():
+                minutes.add(int(stem))
+        with self._lock:
+            self._minutes = minutes
+        if minutes:
+            logger.info(f"Found {len(minutes)} pending deletion buckets")
+
+    @property
+    def buffered(self) -> int:
+        """Scheduled deletions not written to disk yet."""
+        return self._buffered
+
+    @property
+    def buckets(self) -> int:
+        """Minutes with deletions waiting on disk."""
+        return len(self._minutes)
+
+    def schedule(self, chat_id: int, message_id: int, delay_seconds: float, when: Optional[float] = None):
+        """Delete a message `delay_seconds` from now (rounded up to the next minute)."""
+        now = time.time() if when is None else when
+        minute = math.ceil((now + delay_seconds) / BUCKET_SECONDS)
+        with self._lock:
+            self._buffer.setdefault(minute, []).append((chat_id, message_id))
+            self._buffered += 1
+
+    def flush(self) -> int:
+        """Append the buffered deletions to their bucket files. Returns how many were written."""
+        with self._lock:
+            if not self._buffer:
+                return 0
+            buffer, self._buffer = self._buffer, {}
+            self._buffered = 0
+
+        written = 0
+        for minute, entries in buffer.items():
+            if self._append(minute, entries):
+                written += len(entries)
+                with self._lock:
+                    self._minutes.add(minute)
+            else:
+                # Try again on the next flush
+                with self._lock:
+                    self._buffer.setdefault(minute, []).extend(entries)
+                    self._buffered += len(entries)
+        return written
+
+    def _append(self, minute: int, entries: List[Tuple[int, int]]) -> bool:
+        try:
+            with open(self._bucket_file(minute), 'a', encoding='utf-8') as f:
+                f.write("".join(f"{chat_id} {message_id}\n" for chat_id, message_id in entries))
+                f.flush()
+                os.fsync(f.fileno())
+            return True
+        except OSError as e:
+            logger.error(f"Error writing deletion bucket {minute}: {e}")
+            return False
+
+    def due(self, limit: int, when: Optional[float] = None) -> Tuple[List[int], List[Tuple[int, int]]]:
+        """
+        Read the oldest due buckets, whole, until `limit` deletions are collected.
+        Returns (bucket minutes, (chat_id, message_id) pairs); pass the minutes
+        to done() when the deletions were made.
+        """
+        now = time.time() if when is None else when
+        # Deletions due by now may still sit in the buffer
+        self.flush()
+        with self._lock:
+            minutes = sorted(minute for minute in self._minutes if minute * BUCKET_SECONDS <= now)
+
+        taken, entries = [], []
+        for minute in minutes:
+            if entries and len(entries) >= limit:
+                break
+            try:
+                with open(self._bucket_file(minute), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) == 2:
+                            entries.append((int(parts[0]), int(parts[1])))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read deletion bucket {minute}: {e}")
+                continue
+            taken.append(minute)
+        return taken, entries
+
+    def done(self, minutes: List[int]):
+        """Drop buckets returned by due() once their messages were deleted."""
+        for minute in minutes:
+            try:
+                os.remove(self._bucket_file(minute))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Could not remove deletion bucket {minute}: {e}")
+                continue
+            with self._lock:
+                self._minutes.discard(minute)
@@ -0,0 +1,203 @@
+# MovieZoneBot/download_analytics.py
+
+import json
+import os
+import time
+import logging
+import tempfile
+import threading
+from array import array
+from typing import Dict, Hashable, Iterable, Optional
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+# Ring sizes: two days of hours, a month of days
+HOURLY_BUCKETS = 48
+DAILY_BUCKETS = 30
+
+# Reporting windows: name -> (use the hourly ring, number of buckets)
+WINDOWS = {
+    "24h": (True, 24),
+    "7d": (False, 7),
+    "30d": (False, 30),
+}
+
+ANALYTICS_VERSION = 1
+
+
+class _Series:
+    """
+    Download counts of one series in two fixed-size rings, one bucket per hour
+    and one per day. `hour` and `day` are the absolute numbers (since the
+    epoch) of the newest bucket; moving them forward clears the buckets that
+    fall out of the ring, which is all the retention there is.
+    """
+    __slots__ = ("hours", "days", "hour", "day")
+
+    def __init__(self, hour: int = 0, day: int = 0):
+        self.hours = array("I", bytes(4 * HOURLY_BUCKETS))
+        self.days = array("I", bytes(4 * DAILY_BUCKETS))
+        self.hour = hour
+        self.day = day
+
+    @staticmethod
+    def _advance(ring: array, newest: int, now: int) -> int:
+        if now <= newest:
+            return newest
+        if now - newest >= len(ring):
+            for i in range(len(ring)):
+                ring[i] = 0
+        else:
+            for n in range(newest + 1, now + 1):
+                ring[n % len(ring)] = 0
+        return now
+
+    def add(self, hour: int, day: int, amount: int):
+        self.hour = self._advance(self.hours, self.hour, hour)
+        self.day = self._advance(self.days, self.day, day)
+        # Every download goes into its hour and, rolled up, into its day;
+        # buckets that already left a ring are not written (they would wrap
+        # onto a newer one)
+        if hour > self.hour - HOURLY_BUCKETS:
+            self.hours[hour % HOURLY_BUCKETS] += amount
+        if day > self.day - DAILY_BUCKETS:
+            self.days[day % DAILY_BUCKETS] += amount
+
+    def total(self, hourly: bool, buckets: int, now: int) -> int:
+        """Sum of the `buckets` newest buckets up to and including `now`."""
+        ring, newest = (self.hours, self.hour) if hourly else (self.days, self.day)
+        total = 0
+        for n in range(max(now - buckets + 1, newest - len(ring) + 1), min(now, newest) + 1):
+            total += ring[n % len(ring)]
+        return total
+
+
+class DownloadAnalytics:
+    """
+    Downloads over time, pre-aggregated per movie, per movie quality, per
+    category, per uploader and overall. Recording a download bumps one hourly
+    and one daily bucket of each series it belongs to; a report sums at most
+    DAILY_BUCKETS buckets of one series, whatever the catalog size or the
+    number of downloads.
+    """
+
+    def __init__(self):
+        self._series: Dict[Hashable, _Series] = {}
+        self._qualities: Dict[int, set] = {}
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    @staticmethod
+    def _clock(when: Optional[float] = None):
+        when = time.time() if when is None else when
+        hour = int(when // 3600)
+        return hour, hour // 24
+
+    def record(self, movie_id: int, quality: Optional[str], categories: Iterable[str],
+               uploader: Optional[int], amount: int = 1, when: Optional[float] = None):
+        """Count a download of one quality of a movie."""
+        hour, day = self._clock(when)
+        keys = [("all",), ("movie", movie_id)]
+        if quality:
+            keys.append(("quality", movie_id, quality))
+        keys.extend(("category", category) for category in categories)
+        if uploader is not None:
+            keys.append(("uploader", int(uploader)))
+
+        with self._lock:
+            for key in keys:
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series(hour, day)
+                series.add(hour, day, amount)
+            if quality:
+                self._qualities.setdefault(movie_id, set()).add(quality)
+            self.dirty = True
+
+    def windows(self, key: Hashable, when: Optional[float] = None) -> Dict[str, int]:
+        """Downloads of one series in each reporting window."""
+        hour, day = self._clock(when)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return {name: 0 for name in WINDOWS}
+            return {
+                name: series.total(hourly, buckets, hour if hourly else day)
+                for name, (hourly, buckets) in WINDOWS.items()
+            }
+
+    def qualities(self, movie_id: int):
+        with self._lock:
+            return sorted(self._qualities.get(movie_id, ()))
+
+    def forget_movie(self, movie_id: int):
+        """Drop the series of a deleted movie (category and uploader totals keep its downloads)."""
+        with self._lock:
+            self._series.pop(("movie", movie_id), None)
+            for quality in self._qualities.pop(movie_id, ()):
+                self._series.pop(("quality", movie_id, quality), None)
+            self.dirty = True
+
+    # --- Persistence ---
+
+    def save(self, file_path: str, when: Optional[float] = None) -> bool:
+        """Write all series to disk, dropping the ones with nothing left in their rings."""
+        _, day = self._clock(when)
+        with self._lock:
+            for key in [key for key, series in self._series.items() if day - series.day >= DAILY_BUCKETS]:
+                del self._series[key]
+                if key[0] == "quality":
+                    qualities = self._qualities.get(key[1])
+                    if qualities is not None:
+                        qualities.discard(key[2])
+                        if not qualities:
+                            del self._qualities[key[1]]
+            data = {
+                "version": ANALYTICS_VERSION,
+                "series": [
+                    [list(key), series.hour, series.day, series.hours.tolist(), series.days.tolist()]
+                    for key, series in self._series.items()
+                ],
+            }
+            self.dirty = False
+
+        directory = os.path.dirname(file_path) or "."
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            logger.error(f"Error saving download analytics to {file_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.dirty = True
+            return False
+        return True
+
+    @classmethod
+    def load(cls, file_path: str) -> "DownloadAnalytics":
+        """Read saved series; starts empty if the file is missing or unreadable."""
+        analytics = cls()
+        if not os.path.exists(file_path):
+            return analytics
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != ANALYTICS_VERSION:
+                logger.warning(f"Ignoring download analytics with version {data.get('version')}")
+                return analytics
+            for key, hour, day, hours, days in data["series"]:
+                series = _Series(hour, day)
+                series.hours = array("I", hours)
+                series.days = array("I", days)
+                key = tuple(key)
+                analytics._series[key] = series
+                if key[0] == "quality":
+                    analytics._qualities.setdefault(key[1], set()).add(key[2])
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.error(f"Could not read download analytics from {file_path}: {e}")
+            return cls()
+        return analytics
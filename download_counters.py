@@ -0,0 +1,131 @@
+# MovieZoneBot/download_counters.py
+
+import json
+import os
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = 16
+
+
+class DownloadCounters:
+    """
+    Per-movie download counts, kept apart from the movie records.
+
+    A download is an increment in memory. flush() writes the counts to small
+    shard files (movie id modulo the number of shards), rewriting only the
+    shards that changed since the last flush, so a busy title costs one tiny
+    file write per flush instead of a rewrite of the catalog per download.
+    A crash loses at most the increments made since the last flush.
+    """
+
+    def __init__(self, directory: str, shards: int = DEFAULT_SHARDS):
+        self.directory = directory
+        self.shards = shards
+        self._counts: Dict[int, int] = {}
+        self._dirty_shards = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _shard(self, movie_id: int) -> int:
+        return movie_id % self.shards
+
+    def _shard_file(self, shard: int) -> str:
+        return os.path.join(self.directory, f"downloads_{shard:02d}.json")
+
+    def load(self, legacy: Optional[Dict[int, int]] = None):
+        """
+        Read the shard files. `legacy` holds counts still stored on movie
+        records by older versions; they are used for movies that have no
+        counter yet and written out on the next flush.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        counts = {}
+        for shard in range(self.shards):
+            path = self._shard_file(shard)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    counts.update({int(movie_id): count for movie_id, count in json.load(f).items()})
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read download counters from {path}: {e}")
+
+        dirty = set()
+        for movie_id, count in (legacy or {}).items():
+            if count and movie_id not in counts:
+                counts[movie_id] = count
+                dirty.add(self._shard(movie_id))
+
+        with self._lock:
+            self._counts = counts
+            self._dirty_shards = dirty
+        if dirty:
+            logger.info(f"Took over legacy download counts of {len(dirty)} counter shards")
+
+    @property
+    def pending(self) -> int:
+        """Increments not written to disk yet."""
+        return self._pending
+
+    def get(self, movie_id: int) -> int:
+        return self._counts.get(movie_id, 0)
+
+    def increment(self, movie_id: int, amount: int = 1) -> int:
+        """Add to a movie's count and return the new total."""
+        with self._lock:
+            total = self._counts.get(movie_id, 0) + amount
+            self._counts[movie_id] = total
+            self._dirty_shards.add(self._shard(movie_id))
+            self._pending += amount
+        return total
+
+    def remove(self, movie_id: int):
+        with self._lock:
+            if self._counts.pop(movie_id, None) is not None:
+                self._dirty_shards.add(self._shard(movie_id))
+
+    def flush(self) -> int:
+        """Write every changed shard. Returns the number of shard files written."""
+        with self._lock:
+            if not self._dirty_shards:
+                return 0
+            shards = {shard: {} for shard in self._dirty_shards}
+            for movie_id, count in self._counts.items():
+                shard = self._shard(movie_id)
+                if shard in shards:
+                    shards[shard][str(movie_id)] = count
+            self._dirty_shards = set()
+            pending, self._pending = self._pending, 0
+
+        written = 0
+        for shard, counts in shards.items():
+            if self._write(self._shard_file(shard), counts):
+                written += 1
+            else:
+                # Try again on the next flush
+                with self._lock:
+                    self._dirty_shards.add(shard)
+        logger.debug(f"Flushed {pending} downloads into {written} counter shards")
+        return written
+
+    def _write(self, file_path: str, counts: Dict[str, int]) -> bool:
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(counts, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving download counters to {file_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
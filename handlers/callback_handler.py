@@ -7,7 +7,7 @@ from telegram.constants import ParseMode
 from telegram.error import BadRequest
 
 import database as db
-from utils import generate_ad_link_button, get_quality_buttons
+from utils import generate_ad_link_button, get_quality_buttons, build_letter_page
 
 # লগিং সেটআপ
 logger = logging.getLogger(__name__)
@@ -17,7 +17,7 @@ async def handle_request_action(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     
     new_status = 'accepted' if action == 'done' else 'deleted'
-    request_info = db.update_request_status(request_id, new_status)
+    request_info = await db.aupdate_request_status(request_id, new_status)
 
     if not request_info:
         await query.answer("Could not update this request. It might have been handled already.", show_alert=True)
@@ -69,7 +69,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
     try:
         if prefix == 'quality':
             movie_id, quality = int(parts[1]), '_'.join(parts[2:]) # Handles qualities like '720p_HEVC'
-            movie_details = db.get_movie_details(movie_id)
+            movie_details = await db.aget_movie_details(movie_id)
             if not movie_details:
                 await query.edit_message_text("❌ Error: Movie not found. It might have been deleted.")
                 return
@@ -77,7 +77,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
             movie_title = movie_details.get('title', 'this movie')
             await query.edit_message_text(f"To download {movie_title} in {quality}, you need to watch a short ad.")
             
-            ad_link_markup = generate_ad_link_button(user_id=user_id, movie_id=movie_id, quality=quality)
+            ad_link_markup = await generate_ad_link_button(user_id=user_id, movie_id=movie_id, quality=quality)
             if ad_link_markup:
                 await query.message.reply_text("👇 Click the button below to proceed.", reply_markup=ad_link_markup)
             else:
@@ -85,7 +85,7 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
 
         elif prefix == 'view':
             movie_id = int(parts[1])
-            movie_details = db.get_movie_details(movie_id)
+            movie_details = await db.aget_movie_details(movie_id)
             if not movie_details:
                 await query.edit_message_text("❌ Error: Movie not found.")
                 return
@@ -138,6 +138,15 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
             action, request_id = parts[1], int(parts[2])
             await handle_request_action(update, context, request_id, action)
 
+        elif prefix == 'reqs':
+            # Paging through pending requests: reqs_<order>_<page>
+            if await db.aget_user_role(user_id) not in ['owner', 'admin']:
+                logger.warning(f"User {user_id} tried to page through requests without permission")
+                return
+            from handlers.movie_handlers import send_request_page
+            await query.edit_message_reply_markup(reply_markup=None)
+            await send_request_page(query.message, page=int(parts[2]), order=parts[1])
+
         elif callback_data in ['confirm_delete', 'cancel_delete'] or callback_data.startswith('delete_'):
             # These callbacks are handled by the remove_movie conversation handler
             # We should not process them here, let the conversation handler take care of them
@@ -145,21 +154,20 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
             
         elif callback_data == 'browse_categories':
             # Handle "Back to Categories" button - Show browse categories
-            from config import BROWSE_CATEGORIES
-            
-            # Create category buttons in 2-column layout
-            buttons = []
-            for i in range(0, len(BROWSE_CATEGORIES), 2):
-                row = []
-                for j in range(2):
-                    if i + j < len(BROWSE_CATEGORIES):
-                        category = BROWSE_CATEGORIES[i + j]
-                        row.append(InlineKeyboardButton(category, callback_data=f"cat_{category.replace(' ', '_')}"))
-                if row:
-                    buttons.append(row)
-            
-            reply_markup = InlineKeyboardMarkup(buttons)
-            await query.edit_message_text("📂 Browse Categories\n\nSelect a category to explore movies:", reply_markup=reply_markup)
+            from utils import get_category_keyboard
+            await query.edit_message_text("📂 Browse Categories\n\nSelect a category to explore movies:", reply_markup=get_category_keyboard())
+
+        elif prefix == 'trend':
+            # Ranked grid straight from the trending scores: trend or trend_<category>
+            from utils import build_trending_page
+            category = '_'.join(parts[1:]).replace('_', ' ') or None
+            page = await build_trending_page(category)
+            if page is None:
+                where = f" in {category}" if category else ""
+                await query.edit_message_text(f"🔥 Nothing is trending{where} yet. Check back after a few downloads!")
+                return
+            text, reply_markup = page
+            await query.edit_message_text(text, reply_markup=reply_markup)
 
         elif prefix == 'cat':
             # Handle category selection - Show movies in 3x10 grid format
@@ -184,21 +192,19 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
                 if category == "All 🌐":
                     await query.edit_message_text(
                         "🌐 All Movies - Alphabet Filter\n\n"
-                        "Please send any letter (A-Z) to see movies starting with that letter.\n\n"
+                        "Please send any letter (A-Z) or digit to see movies starting with it. "
+                        "Send any Bengali or Hindi letter for titles in that script.\n\n"
                         "For example, send 'A' to see all movies starting with A."
                     )
                     return
                 
                 # Get movies with pagination (30 per page)
                 offset = (page - 1) * 30
-                movies = db.get_movies_by_category(category, limit=31, offset=offset)  # Get 31 to check if there's a next page
+                movies = await db.aget_movies_by_category(category, limit=31, offset=offset)  # Get 31 to check if there's a next page
                 
                 if not movies:
                     # Debug: Show what categories are available
-                    all_movies = db.load_json(db.MOVIES_FILE)
-                    available_categories = set()
-                    for movie_data in all_movies.get("movies", {}).values():
-                        available_categories.update(movie_data.get("categories", []))
+                    available_categories = await db.aget_all_categories()
                     
                     logger.error(f"No movies found for category: '{category}'. Available categories: {list(available_categories)}")
                     await query.edit_message_text(f"❌ No movies found in category: {category}\n\nAvailable categories: {', '.join(list(available_categories))}")
@@ -237,7 +243,8 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
             if nav_buttons:
                 buttons.append(nav_buttons)
             
-            # Add back to categories button
+            # Add trending-in-category and back to categories buttons
+            buttons.append([InlineKeyboardButton(f"🔥 Trending in {category}", callback_data=f"trend_{category.replace(' ', '_')}")])
             buttons.append([InlineKeyboardButton("🔙 Back to Categories", callback_data="browse_categories")])
             
             reply_markup = InlineKeyboardMarkup(buttons)
@@ -248,6 +255,18 @@ async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TY
             else:
                 await query.edit_message_text(f"🎬 {category} Movies (Page {page}):", reply_markup=reply_markup)
 
+        elif prefix == 'letter':
+            # Alphabet filter paging: letter_<bucket>_<page>
+            letter, page = callback_data[len('letter_'):].rsplit('_', 1)
+            page = int(page)
+            letter_page = await build_letter_page(letter, page)
+            if not letter_page:
+                from catalog_index import bucket_label
+                await query.edit_message_text(f"❌ No movies found starting with '{bucket_label(letter)}'.")
+                return
+            text, reply_markup = letter_page
+            await query.edit_message_text(text, reply_markup=reply_markup)
+
         else:
             logger.warning(f"Unhandled callback prefix: {prefix}")
             await query.edit_message_text("Sorry, there was an error processing your request.")
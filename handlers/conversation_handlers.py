@@ -15,6 +15,7 @@ from typing import Optional
 
 import database as db
 from utils import restricted, format_movie_post
+from channel_publisher import publish_to_channels
 from config import CATEGORIES, LANGUAGES, CONVERSATION_TIMEOUT, OWNER_ID
 
 # লগিং সেটআপ
@@ -107,7 +108,7 @@ async def add_movie_start(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     from utils_cleanup import auto_cleanup_message
     import database as db
 
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
 
     # Set conversation keyboard with cancel button
     keyboard = await set_conversation_keyboard(update, context, user_role)
@@ -166,7 +167,7 @@ async def get_title(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         # Clean up all conversation messages before ending
         await ConversationCleanup.cleanup_completed_conversation(update, context)
         
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Movie addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -199,7 +200,7 @@ async def get_release_year(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         year_text.lower() == 'cancel' or
         year_text == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Movie addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -231,7 +232,7 @@ async def get_runtime(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         runtime_text.lower() == 'cancel' or
         runtime_text == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Movie addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -263,7 +264,7 @@ async def get_imdb_rating(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         rating_text.lower() == 'cancel' or
         rating_text == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Movie addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -458,7 +459,7 @@ async def all_files_done(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("⚠️ You haven't uploaded any files! Please upload at least one file or /cancel.")
         return UPLOAD_SINGLE_FILES if not movie_data.get('is_series') else UPLOAD_SERIES_FILES
 
-    # Clean up all conversation messages before showing final preview
+    # Clean up the conversation messages in the background; the preview does not wait for it
     await ConversationCleanup.cleanup_completed_conversation(update, context)
     
     await update.message.reply_text("Great! All data collected. Generating preview...", reply_markup=ReplyKeyboardRemove())
@@ -492,7 +493,7 @@ async def all_files_done(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_html(preview_text)
 
     # Show channels selection
-    channels = db.get_all_channels()
+    channels = await db.aget_all_channels()
     if channels:
         keyboard = []
         for channel in channels:
@@ -510,7 +511,7 @@ async def all_files_done(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Remove preview movie_id before saving
         if 'movie_id' in movie_data and movie_data['movie_id'] == 'preview':
             del movie_data['movie_id']
-        movie_id = db.add_movie(movie_data)
+        movie_id = await db.aadd_movie(movie_data)
         await update.message.reply_text(f"✅ Movie added successfully! Movie ID: {movie_id}")
         context.user_data.clear()
         return ConversationHandler.END
@@ -526,32 +527,31 @@ async def select_channels(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Remove preview movie_id before saving
         if 'movie_id' in movie_data and movie_data['movie_id'] == 'preview':
             del movie_data['movie_id']
-        movie_id = db.add_movie(movie_data)
+        movie_id = await db.aadd_movie(movie_data)
 
+        summary = f"✅ Movie added successfully! Movie ID: {movie_id}"
         selected_channels = context.user_data.get('selected_channels', [])
         if selected_channels:
-            # Post to selected channels
-            for channel_id in selected_channels:
-                try:
-                    preview_text = format_movie_post(movie_data, "moviezone969")
-                    if movie_data.get('thumbnail_file_id'):
-                        await context.bot.send_photo(
-                            chat_id=channel_id,
-                            photo=movie_data['thumbnail_file_id'],
-                            caption=preview_text,
-                            parse_mode=ParseMode.HTML
-                        )
-                    else:
-                        await context.bot.send_message(
-                            chat_id=channel_id,
-                            text=preview_text,
-                            parse_mode=ParseMode.HTML
-                        )
-                    logger.info(f"Posted movie {movie_id} to channel {channel_id}")
-                except Exception as e:
-                    logger.error(f"Failed to post to channel {channel_id}: {e}")
-
-        await query.edit_message_text(f"✅ Movie added successfully! Movie ID: {movie_id}")
+            # Render once, then post to all selected channels in parallel
+            await query.edit_message_text(f"{summary}\n\n📢 Posting to {len(selected_channels)} channels...")
+            post_text = format_movie_post(movie_data, "moviezone969")
+            results = await publish_to_channels(
+                context.bot, selected_channels, post_text, photo=movie_data.get('thumbnail_file_id')
+            )
+            names = {channel['channel_id']: channel['short_name'] for channel in await db.aget_all_channels()}
+            posted = sum(1 for result in results if result.ok)
+            logger.info(f"Posted movie {movie_id} to {posted}/{len(results)} channels")
+
+            lines = [summary, "", f"📢 Posted to {posted}/{len(results)} channels:"]
+            for result in results:
+                name = names.get(result.chat_id, result.chat_id)
+                if result.ok:
+                    lines.append(f"✅ {name}")
+                else:
+                    lines.append(f"❌ {name}: {result.error}")
+            summary = "\n".join(lines)
+
+        await query.edit_message_text(summary)
         context.user_data.clear()
         return ConversationHandler.END
 
@@ -573,7 +573,7 @@ async def select_channels(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         context.user_data['selected_channels'] = selected_channels
 
         # Update keyboard
-        channels = db.get_all_channels()
+        channels = await db.aget_all_channels()
         keyboard = []
         for channel in channels:
             text = f"✅ {channel['short_name']}" if channel['channel_id'] in selected_channels else f"📢 {channel['short_name']}"
@@ -589,7 +589,7 @@ async def cancel_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE
     from utils import restore_main_keyboard
     import database as db
 
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
 
     await update.message.reply_text("❌ Movie addition cancelled.", reply_markup=keyboard)
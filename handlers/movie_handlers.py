@@ -6,7 +6,7 @@ from telegram.ext import ContextTypes, CommandHandler, MessageHandler, filters,
 from telegram.constants import ParseMode
 
 import database as db
-from utils import get_category_keyboard, get_movie_search_results_markup, restricted, create_category_keyboard, create_movie_grid_markup
+from utils import get_category_keyboard, get_movie_search_results_markup, restricted, create_category_keyboard, create_movie_grid_markup, build_letter_page
 from config import CATEGORIES
 
 # লগিং সেটআপ
@@ -39,29 +39,32 @@ async def handle_search_query(update: Update, context: ContextTypes.DEFAULT_TYPE
     if context.user_data and ('conversation_state' in context.user_data or 'new_admin' in context.user_data or 'new_channel' in context.user_data):
         return
     
-    # Check if user is using alphabet filter (single letter after selecting "All" category)
-    if len(query) == 1 and query.isalpha():
+    # Check if user is using alphabet filter (single letter or digit after selecting "All" category)
+    if len(query) == 1 and query.isalnum():
         logger.info(f"User {update.effective_user.id} requested alphabet filter for letter: {query}")
-        movies = db.get_movies_by_first_letter(query.upper(), limit=30)
+        letter_page = await build_letter_page(query.upper())
         
-        if not movies:
+        if not letter_page:
             await update.message.reply_text(f"❌ No movies found starting with '{query.upper()}'.")
             return
         
         # Show movies in grid format like category browsing
-        from utils import create_movie_grid_markup
-        reply_markup = create_movie_grid_markup(movies, prefix="view")
-        await update.message.reply_html(
-            f"🌐 Movies starting with '{query.upper()}' ({len(movies)} found):",
-            reply_markup=reply_markup
-        )
+        text, reply_markup = letter_page
+        await update.message.reply_html(text, reply_markup=reply_markup)
         return
     
     logger.info(f"User {update.effective_user.id} searched for: {query}")
     
-    movies = db.search_movies(query, limit=10)
+    movies = await db.asearch_movies(query, limit=10)
     
     if not movies:
+        suggestions = await db.asuggest_movies(query, limit=3)
+        if suggestions:
+            await update.message.reply_text(
+                f"❌ No movies found for '{query}'.\n\n🤔 Did you mean:",
+                reply_markup=get_movie_search_results_markup(suggestions)
+            )
+            return
         await update.message.reply_text(f"❌ No movies found for '{query}'. Try using different keywords or request it using the 'Request Movie' button.")
         return
     
@@ -139,13 +142,34 @@ async def browse_categories(update: Update, context: ContextTypes.DEFAULT_TYPE)
         reply_markup=keyboard
     )
 
+async def top_movies(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show the trending movies: /top, or /top <category> (e.g. /top action)."""
+    from config import ADMIN_CATEGORIES
+    from utils import build_trending_page
+
+    category = None
+    if context.args:
+        wanted = " ".join(context.args).lower()
+        category = next((name for name in ADMIN_CATEGORIES if name.lower().startswith(wanted)), None)
+        if category is None:
+            await update.message.reply_text(f"❌ Unknown category '{' '.join(context.args)}'. Try /top or /top action.")
+            return
+
+    page = await build_trending_page(category)
+    if page is None:
+        where = f" in {category}" if category else ""
+        await update.message.reply_text(f"🔥 Nothing is trending{where} yet. Check back after a few downloads!")
+        return
+    text, reply_markup = page
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
 # --- Request Movie ---
 
 async def request_movie_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start the movie request conversation."""
     from utils import set_conversation_keyboard, set_conversation_commands
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await set_conversation_keyboard(update, context, user_role)
     
     # Set conversation commands
@@ -163,7 +187,7 @@ async def get_movie_request(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Check if user sent /cancel command (strict checking)
     if movie_name.lower() in ['/cancel', 'cancel', '❌ cancel'] or movie_name == '❌ Cancel':
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Movie request cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -173,8 +197,11 @@ async def get_movie_request(update: Update, context: ContextTypes.DEFAULT_TYPE)
     context.user_data['requested_movie'] = movie_name
     request_message = context.user_data.get('request_message')
     
-    # First check if the movie already exists
-    existing_movies = db.search_movies(movie_name, limit=3)
+    # First check if the movie already exists, also under a slightly different spelling
+    existing_movies = await db.asearch_movies(movie_name, limit=3)
+    suggested = not existing_movies
+    if suggested:
+        existing_movies = await db.asuggest_movies(movie_name, limit=3)
     if existing_movies:
         buttons = []
         for movie in existing_movies:
@@ -182,7 +209,10 @@ async def get_movie_request(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         buttons.append([InlineKeyboardButton("📝 Still Request Movie", callback_data=f"force_request")])
         
-        message_text = f"🎬 Found {len(existing_movies)} similar movies. Still want to request?"
+        if suggested:
+            message_text = "🤔 Did you mean one of these? We already have them. Still want to request?"
+        else:
+            message_text = f"🎬 Found {len(existing_movies)} similar movies. Still want to request?"
         
         if request_message:
             try:
@@ -194,7 +224,7 @@ async def get_movie_request(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return REQUEST_MOVIE_NAME
     else:
         # Movie not found, add to requests directly
-        request_id = db.add_movie_request(user_id, movie_name)
+        request_id = await db.aadd_movie_request(user_id, movie_name)
         
         # Show result in original message
         result_text = f"✅ Request submitted for '{movie_name}'\nRequest ID: {request_id}"
@@ -208,7 +238,7 @@ async def get_movie_request(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await update.message.reply_text(result_text)
         
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("Done.", reply_markup=keyboard)
         context.user_data.clear()
@@ -225,13 +255,13 @@ async def force_request_movie(update: Update, context: ContextTypes.DEFAULT_TYPE
         return ConversationHandler.END
     
     user_id = query.from_user.id
-    request_id = db.add_movie_request(user_id, movie_name)
+    request_id = await db.aadd_movie_request(user_id, movie_name)
     
     result_text = f"✅ Request submitted for '{movie_name}'\nRequest ID: {request_id}"
     await query.edit_message_text(result_text)
     
     from utils import restore_main_keyboard
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
     await query.message.reply_text("Done.", reply_markup=keyboard)
     context.user_data.clear()
@@ -239,24 +269,41 @@ async def force_request_movie(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 # --- Show Requests (Admin/Owner) ---
 
+REQUESTS_PAGE_SIZE = 10
+
 @restricted(allowed_roles=['owner', 'admin'])
 async def show_requests(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show pending movie requests to admins/owners."""
-    pending_requests = db.get_pending_requests(limit=10)
+    await send_request_page(update.message)
+
+async def send_request_page(message, page: int = 1, order: str = "age") -> None:
+    """
+    Send one page of pending requests as individual messages, followed by
+    paging/sorting buttons (reqs_<order>_<page>, handled in callback_handler).
+    """
+    total = await db.acount_pending_requests()
+    offset = (page - 1) * REQUESTS_PAGE_SIZE
+    pending_requests = await db.aget_pending_requests(limit=REQUESTS_PAGE_SIZE, offset=offset, order=order)
     
     if not pending_requests:
-        await update.message.reply_text("🎉 No pending movie requests at the moment!")
+        await message.reply_text("🎉 No pending movie requests at the moment!")
         return
     
-    await update.message.reply_text(f"📋 Found {len(pending_requests)} pending movie requests:\n")
+    order_text = "most requested first" if order == "demand" else "oldest first"
+    header = f"📋 Found {total} pending movie requests ({order_text})"
+    if page > 1:
+        header += f" - Page {page}"
+    await message.reply_text(header + ":\n")
     
     # Send each request as individual message
-    for i, req in enumerate(pending_requests, 1):
+    for i, req in enumerate(pending_requests, offset + 1):
         user_info = f"@{req['users'].get('username')}" if req['users'].get('username') else f"ID: {req['user_id']}"
         
         message_text = f"Request #{i}: {req['movie_name']}\n"
         message_text += f"👤 Requested by: {user_info}\n"
         message_text += f"🗓️ On: {req['requested_at'][:10]}"
+        if req['demand'] > 1:
+            message_text += f"\n🔥 Requested {req['demand']} times"
         
         # Individual buttons for each request
         buttons = [
@@ -266,10 +313,26 @@ async def show_requests(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             ]
         ]
         
-        await update.message.reply_text(
+        await message.reply_text(
             message_text,
             reply_markup=InlineKeyboardMarkup(buttons)
         )
+    
+    # Paging and sort order buttons
+    nav_buttons = []
+    if offset + len(pending_requests) < total:
+        nav_buttons.append([InlineKeyboardButton("Next ➡️", callback_data=f"reqs_{order}_{page+1}")])
+    if total > 1:
+        if order == "demand":
+            nav_buttons.append([InlineKeyboardButton("🕐 Oldest first", callback_data="reqs_age_1")])
+        else:
+            nav_buttons.append([InlineKeyboardButton("🔥 Most requested first", callback_data="reqs_demand_1")])
+    if nav_buttons:
+        shown_to = offset + len(pending_requests)
+        await message.reply_text(
+            f"Showing {offset + 1}-{shown_to} of {total}.",
+            reply_markup=InlineKeyboardMarkup(nav_buttons)
+        )
 
 # --- Remove Movie (Owner/Admin) ---
 
@@ -278,7 +341,7 @@ async def remove_movie_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Start the remove movie conversation."""
     from utils import set_conversation_keyboard, set_conversation_commands
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await set_conversation_keyboard(update, context, user_role)
     
     # Set conversation commands
@@ -301,13 +364,13 @@ async def get_movie_to_delete(update: Update, context: ContextTypes.DEFAULT_TYPE
         movie_name.lower() == 'cancel' or
         movie_name == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Movie deletion cancelled.", reply_markup=keyboard)
         context.user_data.clear()
         return ConversationHandler.END
     
-    movies = db.search_movies(movie_name, limit=10)
+    movies = await db.asearch_movies(movie_name, limit=10)
     if not movies:
         await update.message.reply_text(f"❌ No movies found with name '{movie_name}'. Please try again or /cancel.")
         return DELETE_MOVIE_NAME
@@ -360,7 +423,7 @@ async def confirm_movie_deletion(update: Update, context: ContextTypes.DEFAULT_T
     elif query.data == "confirm_delete":
         movie = context.user_data.get('movie_to_delete')
         if movie:
-            success = db.delete_movie(movie['movie_id'])
+            success = await db.adelete_movie(movie['movie_id'])
             if success:
                 await query.edit_message_text(f"✅ Movie '{movie.get('title', 'Unknown')}' has been deleted successfully.")
             else:
@@ -373,9 +436,9 @@ async def confirm_movie_deletion(update: Update, context: ContextTypes.DEFAULT_T
         return ConversationHandler.END
     elif query.data.startswith("delete_"):
         movie_id = int(query.data.split("_")[1])
-        movie = db.get_movie_details(movie_id)
+        movie = await db.aget_movie_details(movie_id)
         if movie:
-            success = db.delete_movie(movie_id)
+            success = await db.adelete_movie(movie_id)
             if success:
                 await query.edit_message_text(f"✅ Movie '{movie.get('title', 'Unknown')}' has been deleted successfully.")
             else:
@@ -391,7 +454,7 @@ async def show_stats_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     """Start the show stats conversation with three options."""
     from utils import set_conversation_keyboard, set_conversation_commands
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await set_conversation_keyboard(update, context, user_role)
     
     # Set conversation commands
@@ -440,7 +503,7 @@ async def handle_stats_option(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     elif query.data == "stats_admin":
         # Get all admins
-        admins = db.get_all_admins()
+        admins = await db.aget_all_admins()
         if not admins:
             await query.edit_message_text("❌ No admins found.")
             return ConversationHandler.END
@@ -467,7 +530,7 @@ async def handle_stats_category(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
     
     category = query.data.replace("cat_", "")
-    movies = db.get_movies_by_category(category, limit=30)
+    movies = await db.aget_movies_by_category(category, limit=30)
     
     if not movies:
         await query.edit_message_text(f"❌ No movies in '{category}'.")
@@ -477,22 +540,31 @@ async def handle_stats_category(update: Update, context: ContextTypes.DEFAULT_TY
     from utils import create_movie_grid_markup
     reply_markup = create_movie_grid_markup(movies, prefix="stats_view")
     
+    windows = await db.aget_category_download_windows(category)
     await query.edit_message_text(
-        f"📂 {category} ({len(movies)} movies):",
+        f"📂 {category} ({len(movies)} movies)\n"
+        f"📈 Downloads last 24h / 7d / 30d: {format_download_windows(windows)}",
         reply_markup=reply_markup
     )
     return SHOW_STATS_MOVIE_LIST
 
 async def handle_stats_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle admin selection for stats."""
+    """Handle admin selection for stats (admin_<id>, or admin_<id>_<cursor> for later pages)."""
     query = update.callback_query
     await query.answer()
     
-    admin_id = int(query.data.replace("admin_", ""))
-    movies = db.get_movies_by_uploader(admin_id, limit=30)
+    parts = query.data.split("_", 2)
+    admin_id = int(parts[1])
+    cursor = parts[2] if len(parts) > 2 else None
+    # Get one extra movie to check if there's a next page
+    movies = await db.aget_movies_by_uploader(admin_id, limit=31, cursor=cursor)
     
     from config import OWNER_ID
-    admin_name = "Owner" if str(admin_id) == str(OWNER_ID) else db.get_admin_info(admin_id).get('short_name', f"Admin-{admin_id}")
+    if str(admin_id) == str(OWNER_ID):
+        admin_name = "Owner"
+    else:
+        admin_info = await db.aget_admin_info(admin_id)
+        admin_name = admin_info.get('short_name', f"Admin-{admin_id}") if admin_info else f"Admin-{admin_id}"
     
     if not movies:
         await query.edit_message_text(f"❌ No movies by {admin_name}.")
@@ -500,11 +572,23 @@ async def handle_stats_admin(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Create movie grid markup
     from utils import create_movie_grid_markup
-    reply_markup = create_movie_grid_markup(movies, prefix="stats_view")
-    
+    movies_to_show = movies[:30]
+    buttons = [list(row) for row in create_movie_grid_markup(movies_to_show, prefix="stats_view").inline_keyboard]
+    
+    nav_buttons = []
+    if cursor:
+        nav_buttons.append(InlineKeyboardButton("⏮️ Newest", callback_data=f"admin_{admin_id}"))
+    if len(movies) > 30:
+        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"admin_{admin_id}_{db.uploader_cursor(movies_to_show[-1])}"))
+    if nav_buttons:
+        buttons.append(nav_buttons)
+    
+    totals = await db.aget_uploader_stats(admin_id)
+    windows = await db.aget_uploader_download_windows(admin_id)
     await query.edit_message_text(
-        f"👤 {admin_name} ({len(movies)} movies):",
-        reply_markup=reply_markup
+        f"👤 {admin_name} ({totals['movies']} movies, {totals['downloads']} downloads)\n"
+        f"📈 Downloads last 24h / 7d / 30d: {format_download_windows(windows)}",
+        reply_markup=InlineKeyboardMarkup(buttons)
     )
     return SHOW_STATS_MOVIE_LIST
 
@@ -514,7 +598,7 @@ async def handle_stats_movie_selection(update: Update, context: ContextTypes.DEF
     await query.answer()
     
     movie_id = int(query.data.replace("stats_view_", ""))
-    movie = db.get_movie_details(movie_id)
+    movie = await db.aget_movie_details(movie_id)
     
     if not movie:
         await query.edit_message_text("❌ Error: Movie not found.")
@@ -532,7 +616,7 @@ async def get_movie_for_stats(update: Update, context: ContextTypes.DEFAULT_TYPE
         movie_name.lower() == 'cancel' or
         movie_name == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Stats cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -541,7 +625,7 @@ async def get_movie_for_stats(update: Update, context: ContextTypes.DEFAULT_TYPE
     # Try to edit the original stats message instead of sending new one
     stats_message = context.user_data.get('stats_message')
     
-    movies = db.search_movies(movie_name, limit=10)
+    movies = await db.asearch_movies(movie_name, limit=10)
     if not movies:
         if stats_message:
             try:
@@ -577,6 +661,19 @@ async def get_movie_for_stats(update: Update, context: ContextTypes.DEFAULT_TYPE
             await update.message.reply_html(message_text, reply_markup=InlineKeyboardMarkup(buttons))
         return SHOW_STATS_MOVIE_NAME
 
+def format_download_windows(windows: dict) -> str:
+    """Format 24h/7d/30d download totals as 'a / b / c'."""
+    return f"{windows['24h']} / {windows['7d']} / {windows['30d']}"
+
+async def build_download_trend_text(movie_id: int) -> str:
+    """Recent download lines for the movie stats views, per quality when known."""
+    windows = await db.aget_movie_download_windows(movie_id)
+    text = f"📈 Last 24h / 7d / 30d: {format_download_windows(windows['total'])}\n"
+    for quality, quality_windows in windows.items():
+        if quality != "total":
+            text += f"    • {quality}: {format_download_windows(quality_windows)}\n"
+    return text
+
 async def show_movie_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, movie: dict):
     """Show statistics for a specific movie."""
     from config import OWNER_ID
@@ -592,7 +689,7 @@ async def show_movie_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, m
             uploader_name = "Owner"
         else:
             # Check if it's an admin and get their short name
-            admin_info = db.get_admin_info(added_by_id)
+            admin_info = await db.aget_admin_info(added_by_id)
             if admin_info:
                 uploader_name = admin_info.get('short_name', f"Admin-{added_by_id}")
             else:
@@ -612,6 +709,7 @@ async def show_movie_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, m
         total_downloads = download_count or 0
     
     stats_text += f"📥 Total Downloads: {total_downloads}\n"
+    stats_text += await build_download_trend_text(movie['movie_id'])
     
     # Show available qualities and episodes
     files = movie.get('files', {})
@@ -643,7 +741,7 @@ async def show_movie_stats_in_message(message, context: ContextTypes.DEFAULT_TYP
             uploader_name = "Owner"
         else:
             # Check if it's an admin and get their short name
-            admin_info = db.get_admin_info(added_by_id)
+            admin_info = await db.aget_admin_info(added_by_id)
             if admin_info:
                 uploader_name = admin_info.get('short_name', f"Admin-{added_by_id}")
             else:
@@ -663,6 +761,7 @@ async def show_movie_stats_in_message(message, context: ContextTypes.DEFAULT_TYP
         total_downloads = download_count or 0
     
     stats_text += f"📥 Total Downloads: {total_downloads}\n"
+    stats_text += await build_download_trend_text(movie['movie_id'])
     
     # Show available qualities and episodes
     files = movie.get('files', {})
@@ -698,7 +797,7 @@ async def show_movie_stats_query(query, context: ContextTypes.DEFAULT_TYPE, movi
             uploader_name = "Owner"
         else:
             # Check if it's an admin and get their short name
-            admin_info = db.get_admin_info(added_by_id)
+            admin_info = await db.aget_admin_info(added_by_id)
             if admin_info:
                 uploader_name = admin_info.get('short_name', f"Admin-{added_by_id}")
             else:
@@ -718,6 +817,7 @@ async def show_movie_stats_query(query, context: ContextTypes.DEFAULT_TYPE, movi
         total_downloads = download_count or 0
     
     stats_text += f"📥 Total Downloads: {total_downloads}\n"
+    stats_text += await build_download_trend_text(movie['movie_id'])
     
     # Show available qualities and episodes
     files = movie.get('files', {})
@@ -741,7 +841,7 @@ async def handle_stats_callback(update: Update, context: ContextTypes.DEFAULT_TY
     
     if query.data.startswith("stats_"):
         movie_id = int(query.data.split("_")[1])
-        movie = db.get_movie_details(movie_id)
+        movie = await db.aget_movie_details(movie_id)
         if movie:
             await show_movie_stats(query, context, movie)
         else:
@@ -755,7 +855,7 @@ async def cancel_movie_conversation(update: Update, context: ContextTypes.DEFAUL
     """Cancel movie-related conversation."""
     from utils import restore_main_keyboard
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
     
     await update.message.reply_text("❌ Movie action cancelled.", reply_markup=keyboard)
@@ -817,7 +917,8 @@ show_stats_conv = ConversationHandler(
             CallbackQueryHandler(handle_stats_admin, pattern="^admin_")
         ],
         SHOW_STATS_MOVIE_LIST: [
-            CallbackQueryHandler(handle_stats_movie_selection, pattern="^stats_view_")
+            CallbackQueryHandler(handle_stats_movie_selection, pattern="^stats_view_"),
+            CallbackQueryHandler(handle_stats_admin, pattern="^admin_")
         ]
     },
     fallbacks=[
@@ -835,6 +936,7 @@ movie_handlers = [
     # Regular handlers
     MessageHandler(filters.Regex("^🔍 Search Movies$"), search_movies),
     MessageHandler(filters.Regex("^📂 Browse Categories$"), browse_categories),
+    CommandHandler("top", top_movies),
     MessageHandler(filters.Regex("^📊 Show Requests$"), show_requests),
     # Text search handler (should be last to catch search queries)
     # Only respond in private chats, exclude channels and groups
@@ -13,6 +13,7 @@ from telegram.ext import (
 from telegram.constants import ParseMode
 
 import database as db
+import broadcaster
 from utils import restricted
 from config import OWNER_ID
 
@@ -35,7 +36,7 @@ async def add_admin_start(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     """Starts the conversation to add a new admin."""
     from utils import set_conversation_keyboard, set_conversation_commands
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await set_conversation_keyboard(update, context, user_role)
     
     # Set conversation commands for both message and callback query
@@ -62,7 +63,7 @@ async def get_admin_userid(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         update.message.text == '❌ Cancel'
     ):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Admin addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -113,7 +114,7 @@ async def get_admin_short_name(update: Update, context: ContextTypes.DEFAULT_TYP
         short_name.lower() == 'cancel' or
         short_name == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Admin addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -123,7 +124,7 @@ async def get_admin_short_name(update: Update, context: ContextTypes.DEFAULT_TYP
     
     # Add admin directly and show final result in original message
     admin_info = context.user_data['new_admin']
-    success = db.add_admin(admin_info['id'], admin_info['short_name'], admin_info.get('first_name', 'Unknown'), admin_info.get('username'))
+    success = await db.aadd_admin(admin_info['id'], admin_info['short_name'], admin_info.get('first_name', 'Unknown'), admin_info.get('username'))
     
     admin_message = context.user_data.get('admin_message')
     if success:
@@ -140,7 +141,7 @@ async def get_admin_short_name(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text(result_text)
     
     from utils import restore_main_keyboard
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
     await update.message.reply_text("Done.", reply_markup=keyboard)
     context.user_data.clear()
@@ -154,13 +155,13 @@ async def remove_admin_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Starts the conversation to remove an admin with button selection."""
     from utils import set_conversation_keyboard, set_conversation_commands
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await set_conversation_keyboard(update, context, user_role)
     
     # Set conversation commands for both message and callback query
     await set_conversation_commands(update, context)
     
-    admins = db.get_all_admins()
+    admins = await db.aget_all_admins()
     if not admins:
         if update.callback_query:
             await update.callback_query.edit_message_text("❌ No admins to remove.")
@@ -196,10 +197,10 @@ async def confirm_remove_admin(update: Update, context: ContextTypes.DEFAULT_TYP
     if query.data.startswith("remove_admin_"):
         admin_id_str = query.data.split("_")[2]
         admin_id = int(admin_id_str)
-        admin_info = db.get_admin_info(admin_id)
+        admin_info = await db.aget_admin_info(admin_id)
         admin_name = admin_info.get('short_name', f'Admin-{admin_id}') if admin_info else f'Admin-{admin_id}'
         
-        success = db.remove_admin(admin_id_str)
+        success = await db.aremove_admin(admin_id_str)
         
         if success:
             result_text = f"✅ {admin_name} removed as admin"
@@ -209,7 +210,7 @@ async def confirm_remove_admin(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.edit_message_text(result_text)
         
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await query.message.reply_text("Done.", reply_markup=keyboard)
     
@@ -224,7 +225,7 @@ async def add_channel_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Starts the conversation to add a new channel."""
     from utils import set_conversation_keyboard, set_conversation_commands
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await set_conversation_keyboard(update, context, user_role)
     
     # Set conversation commands for both message and callback query
@@ -250,7 +251,7 @@ async def get_channel_link(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         channel_link.lower() == 'cancel' or
         channel_link == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Channel addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -293,7 +294,7 @@ async def get_channel_short_name(update: Update, context: ContextTypes.DEFAULT_T
         short_name.lower() == 'cancel' or
         short_name == '❌ Cancel'):
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await update.message.reply_text("❌ Channel addition cancelled.", reply_markup=keyboard)
         context.user_data.clear()
@@ -322,7 +323,7 @@ async def get_channel_short_name(update: Update, context: ContextTypes.DEFAULT_T
         return GET_CHANNEL_LINK
     
     # Add channel to database  
-    success = db.add_channel(channel_id, channel_name or "Unknown", short_name or "Unknown")
+    success = await db.aadd_channel(channel_id, channel_name or "Unknown", short_name or "Unknown")
     
     channel_message = context.user_data.get('channel_message')
     if success:
@@ -339,7 +340,7 @@ async def get_channel_short_name(update: Update, context: ContextTypes.DEFAULT_T
         await update.message.reply_text(result_text)
     
     from utils import restore_main_keyboard
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
     await update.message.reply_text("Done.", reply_markup=keyboard)
     context.user_data.clear()
@@ -353,13 +354,13 @@ async def remove_channel_start(update: Update, context: ContextTypes.DEFAULT_TYP
     """Starts the conversation to remove a channel with button selection."""
     from utils import set_conversation_keyboard, set_conversation_commands
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await set_conversation_keyboard(update, context, user_role)
     
     # Set conversation commands for both message and callback query
     await set_conversation_commands(update, context)
     
-    channels = db.get_all_channels()
+    channels = await db.aget_all_channels()
     if not channels:
         if update.callback_query:
             await update.callback_query.edit_message_text("❌ No channels to remove.")
@@ -396,10 +397,10 @@ async def confirm_remove_channel(update: Update, context: ContextTypes.DEFAULT_T
     
     if query.data.startswith("remove_channel_"):
         channel_id = query.data.replace("remove_channel_", "")
-        channel_info = db.get_channel_info(channel_id)
+        channel_info = await db.aget_channel_info(channel_id)
         channel_name = channel_info.get('short_name', channel_id) if channel_info else channel_id
         
-        success = db.remove_channel(channel_id)
+        success = await db.aremove_channel(channel_id)
         
         if success:
             result_text = f"✅ {channel_name} removed as channel"
@@ -409,7 +410,7 @@ async def confirm_remove_channel(update: Update, context: ContextTypes.DEFAULT_T
         await query.edit_message_text(result_text)
         
         from utils import restore_main_keyboard
-        user_role = db.get_user_role(update.effective_user.id)
+        user_role = await db.aget_user_role(update.effective_user.id)
         keyboard = await restore_main_keyboard(update, context, user_role)
         await query.message.reply_text("Done.", reply_markup=keyboard)
     
@@ -437,6 +438,75 @@ async def manage_channels(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     ]
     await update.message.reply_text("Select an option to manage channels:", reply_markup=InlineKeyboardMarkup(keyboard))
 
+@restricted(allowed_roles=['owner'])
+async def show_download_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows recent downloads overall, per category and per uploader (/analytics)."""
+    from config import ADMIN_CATEGORIES
+    from handlers.movie_handlers import format_download_windows
+
+    total = await db.aget_download_windows()
+    text = "📈 Downloads (last 24h / 7d / 30d)\n\n"
+    text += f"🌐 All movies: {format_download_windows(total)}\n"
+
+    category_lines = []
+    for category in ADMIN_CATEGORIES:
+        windows = await db.aget_category_download_windows(category)
+        if windows['30d']:
+            category_lines.append((windows['7d'], f"• {category}: {format_download_windows(windows)}"))
+    if category_lines:
+        text += "\n📂 By category\n"
+        text += "\n".join(line for _, line in sorted(category_lines, key=lambda item: -item[0])) + "\n"
+
+    uploaders = [(OWNER_ID, "Owner")] + [
+        (admin['user_id'], admin.get('short_name', f"Admin-{admin['user_id']}"))
+        for admin in await db.aget_all_admins()
+        if str(admin['user_id']) != str(OWNER_ID)
+    ]
+    uploader_lines = []
+    for uploader_id, name in uploaders:
+        windows = await db.aget_uploader_download_windows(uploader_id)
+        uploader_lines.append(f"• {name}: {format_download_windows(windows)}")
+    text += "\n👤 By uploader\n" + "\n".join(uploader_lines)
+
+    await update.message.reply_text(text)
+
+@restricted(allowed_roles=['owner'])
+async def broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Sends a message to every active user (/broadcast <text>, or as a reply to any message)."""
+    message = update.message
+    action = context.args[0].lower() if len(context.args) == 1 else None
+
+    if action == "status":
+        state = broadcaster.get_status()
+        await message.reply_text(broadcaster.format_status(state) if state else "No broadcast has been sent yet.")
+        return
+    if action == "cancel":
+        if await broadcaster.cancel_broadcast():
+            await message.reply_text(broadcaster.format_status(broadcaster.get_status()))
+        else:
+            await message.reply_text("No broadcast is running.")
+        return
+
+    if message.reply_to_message:
+        content = {"from_chat_id": message.chat_id, "message_id": message.reply_to_message.message_id}
+    elif context.args:
+        content = {"text": message.text.split(maxsplit=1)[1]}
+    else:
+        await message.reply_text(
+            "📣 Usage:\n"
+            "• /broadcast <text> - send a text to every user\n"
+            "• Reply to any message with /broadcast - send a copy of it\n"
+            "• /broadcast status - show progress\n"
+            "• /broadcast cancel - stop the running broadcast"
+        )
+        return
+
+    if broadcaster.is_running():
+        await message.reply_text("A broadcast is already running. See /broadcast status.")
+        return
+    status_message = await message.reply_text("📣 Starting broadcast...")
+    await broadcaster.start_broadcast(context.bot, content, message.chat_id, status_message.message_id)
+
 async def handle_admin_management(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle admin management button callbacks."""
     query = update.callback_query
@@ -489,7 +559,7 @@ async def cancel_admin_conversation(update: Update, context: ContextTypes.DEFAUL
     """Cancel admin management conversation."""
     from utils import restore_main_keyboard
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
     
     await update.message.reply_text("❌ Admin management cancelled.", reply_markup=keyboard)
@@ -500,7 +570,7 @@ async def cancel_channel_conversation(update: Update, context: ContextTypes.DEFA
     """Cancel channel management conversation."""
     from utils import restore_main_keyboard
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
     
     await update.message.reply_text("❌ Channel management cancelled.", reply_markup=keyboard)
@@ -575,5 +645,7 @@ owner_handlers = [
     remove_channel_conv,
     MessageHandler(filters.Regex("^👥 Manage Admins$"), manage_admins),
     MessageHandler(filters.Regex("^📢 Manage Channels$"), manage_channels),
+    CommandHandler("analytics", show_download_analytics),
+    CommandHandler("broadcast", broadcast_message),
     CallbackQueryHandler(handle_channel_management, pattern="^channel_remove$")
 ]
@@ -26,9 +26,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     from utils import restore_default_commands
     await restore_default_commands(context, update.effective_chat.id)
 
-    # Check if user is new and add to database if they don't exist
-    is_new_user = not db.user_exists(user.id)
-    db.add_user_if_not_exists(user.id, user.first_name, user.username)
+    # Add user to database if they don't exist (in memory; flushed in the background)
+    is_new_user = await db.aadd_user_if_not_exists(user.id, user.first_name, user.username)
     
     # context.args contains the part after the /start command (for deep linking)
     # Example: /start file_5_720p or /start <secureToken>
@@ -46,7 +45,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                     quality = '_'.join(parts[2:])  # Handle qualities like '720p_HEVC'
                     
                     # Get movie details
-                    movie_details = db.get_movie_details(movie_id)
+                    movie_details = await db.aget_movie_details(movie_id)
                     if not movie_details:
                         await context.bot.send_message(
                             chat_id=user.id,
@@ -72,7 +71,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                         text=f"🍿 {movie_title}\n\nTo download in {quality}, you need to watch a short ad to support us."
                     )
                     
-                    ad_link_markup = generate_ad_link_button(user_id=user.id, movie_id=movie_id, quality=quality)
+                    ad_link_markup = await generate_ad_link_button(user_id=user.id, movie_id=movie_id, quality=quality)
                     if ad_link_markup:
                         await context.bot.send_message(
                             chat_id=user.id,
@@ -90,7 +89,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                 logger.warning(f"Invalid file payload format: {payload}")
         
         # If not a file link, try to validate as ad token from the ad page
-        file_id_to_send = db.validate_ad_token(token=payload, user_id=user.id)
+        file_id_to_send = await db.avalidate_ad_token(token=payload, user_id=user.id)
         
         if file_id_to_send:
             logger.info(f"Valid token. Sending file {file_id_to_send} to user {user.id}")
@@ -125,7 +124,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             return  # Stop execution - don't show welcome message for expired links
 
     # Only show welcome message for completely new users or normal /start command without payload  
-    user_role = db.get_user_role(user.id)
+    user_role = await db.aget_user_role(user.id)
     
     # Show welcome message only for new users or when explicitly calling /start without payload
     if not is_new_user and context.args:
@@ -204,7 +203,7 @@ Join our channel: @moviezone969"""
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Sends a help message for the /help command."""
     user = update.effective_user
-    user_role = db.get_user_role(user.id)
+    user_role = await db.aget_user_role(user.id)
     
     if user_role == 'owner':
         help_text = """❓ Owner Help & Commands
@@ -216,6 +215,9 @@ Available Features:
 • 📢 Manage Channels - Add or remove channels
 • 🗑️ Remove Movie - Delete movies from database
 • 📈 Show Stats - View movie statistics
+• /analytics - Downloads in the last 24h, 7d and 30d
+• /broadcast <text> - Message every user (or reply to a message with /broadcast)
+• /top - Trending movies (or /top <category>)
 
 You have full access to all bot features and can manage admins and channels."""
         
@@ -227,6 +229,7 @@ Available Features:
 • 📊 Show Requests - View and manage user requests
 • 🗑️ Remove Movie - Delete movies from database  
 • 📈 Show Stats - View movie statistics
+• /top - Trending movies (or /top <category>)
 
 You can manage movies and handle user requests."""
         
@@ -236,6 +239,7 @@ You can manage movies and handle user requests."""
 Main Features:
 🔍 Search - Find movies by name
 🎭 Request - Request new movies to admin
+🔥 /top - See what everyone is downloading right now
 
 Download Process:
 1. 🔍 Search or browse for a movie in our channel @moviezone969
@@ -290,7 +294,7 @@ async def cancel_button_handler(update: Update, context: ContextTypes.DEFAULT_TY
     """Handle cancel button press from reply keyboard."""
     from utils import get_main_keyboard
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = get_main_keyboard(user_role)
     
     # Clear any ongoing conversation
@@ -6,8 +6,12 @@ from telegram.ext import Application, CommandHandler, MessageHandler, filters, C
 from typing import Tuple, Optional
 
 # --- Configuration and Database Imports ---
-from config import BOT_TOKEN, OWNER_ID
+from config import BOT_TOKEN, OWNER_ID, CONCURRENT_UPDATES
 import database as db
+from update_processor import PerChatUpdateProcessor
+from send_queue import OutboundSendQueue, STATS_REPORT_INTERVAL
+from message_deleter import delete_messages
+import broadcaster
 
 # --- Handlers Imports ---
 from handlers.start_handler import start_handlers, NEW_MEMBER_WELCOME_MESSAGE
@@ -26,37 +30,34 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 # --- Auto-Delete Job Functions ---
-async def delete_message_job(context):
-    """Deletes a message after a specified time."""
+async def drain_deletions_job(context):
+    """Deletes the queued messages that are due."""
     try:
-        await context.bot.delete_message(chat_id=context.job.chat_id, message_id=context.job.data['message_id'])
-        logger.info(f"Auto-deleted message {context.job.data['message_id']} from chat {context.job.chat_id}")
+        minutes, messages = await db.aget_due_deletions()
+        if not minutes:
+            return
+        report = await delete_messages(context.bot, messages)
+        # Only the deletions that may succeed later stay queued
+        await db.afinish_deletions(minutes, report.retry)
+        logger.info(f"Auto-deleted {report.summary()} from {len(minutes)} minute buckets")
     except Exception as e:
-        logger.warning(f"Could not delete message {context.job.data['message_id']}: {e}")
+        logger.error(f"Failed to drain deletion queue: {e}")
 
 def schedule_message_deletion(context, chat_id: int, message_id: int, delay_seconds: int = 86400): # 24 hours
-    """Schedules a message to be deleted after a delay."""
-    if context.job_queue:
-        context.job_queue.run_once(
-            delete_message_job,
-            when=delay_seconds,
-            data={'message_id': message_id},
-            chat_id=chat_id,
-            name=f"delete_{chat_id}_{message_id}"
-        )
-    else:
-        logger.warning(f"JobQueue not available - message {message_id} will not be auto-deleted")
+    """Schedules a message to be deleted after a delay (kept on disk across restarts)."""
+    db.schedule_message_deletion(chat_id, message_id, delay_seconds)
 
 async def delete_conversation_messages(context, chat_id: int, message_ids: list):
-    """Delete multiple conversation messages immediately."""
-    deleted_count = 0
-    for message_id in message_ids:
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-            deleted_count += 1
-        except Exception as e:
-            logger.warning(f"Could not delete conversation message {message_id}: {e}")
-    logger.info(f"Deleted {deleted_count}/{len(message_ids)} conversation messages from chat {chat_id}")
+    """Delete multiple conversation messages immediately, in one batch."""
+    report = await delete_messages(context.bot, [(chat_id, message_id) for message_id in message_ids])
+    if report.failures:
+        logger.warning(f"Conversation cleanup in chat {chat_id}: {report.summary()}")
+    else:
+        logger.info(f"Deleted {report.deleted} conversation messages from chat {chat_id}")
+
+def delete_conversation_messages_later(context, chat_id: int, message_ids: list):
+    """Delete conversation messages in the background, so the handler does not wait for it."""
+    context.application.create_task(delete_conversation_messages(context, chat_id, message_ids))
 
 def schedule_user_message_cleanup(context, chat_id: int, message_id: int, user_role: str):
     """Schedule user message cleanup based on role."""
@@ -71,6 +72,88 @@ def schedule_user_message_cleanup(context, chat_id: int, message_id: int, user_r
         # Movie posts are preserved, other messages deleted after 24 hours
         schedule_message_deletion(context, chat_id, message_id, 86400)
 
+# --- Storage Jobs ---
+async def flush_storage_job(context):
+    """Periodically fsyncs buffered database writes."""
+    try:
+        await db.aflush_storage()
+    except Exception as e:
+        logger.error(f"Failed to flush storage: {e}")
+
+async def flush_users_job(context):
+    """Writes user registrations and profile changes collected since the last run."""
+    try:
+        await db.aflush_users()
+    except Exception as e:
+        logger.error(f"Failed to flush users: {e}")
+
+async def flush_download_counts_job(context):
+    """Writes download counts collected since the last run."""
+    try:
+        await db.aflush_download_counts()
+    except Exception as e:
+        logger.error(f"Failed to flush download counts: {e}")
+
+async def save_analytics_job(context):
+    """Saves the hourly and daily download buckets."""
+    try:
+        await db.asave_download_analytics()
+    except Exception as e:
+        logger.error(f"Failed to save download analytics: {e}")
+
+async def refresh_role_cache_job(context):
+    """Picks up admin changes made to the data outside the bot."""
+    try:
+        await db.arefresh_role_cache()
+    except Exception as e:
+        logger.error(f"Failed to refresh role cache: {e}")
+
+async def cleanup_tokens_job(context):
+    """Purges expired download tokens and spent token ids, and logs the table sizes."""
+    try:
+        purged = await db.acleanup_expired_tokens()
+        stats = await db.aget_token_stats()
+        logger.info(
+            f"Token sweep: purged {purged} in {stats['last_sweep_ms']:.1f} ms; "
+            f"{stats['live_tokens']} live tokens ({stats['reusable_tokens']} reusable), "
+            f"{stats['spent_ids']} spent ids, {stats['heap_entries']} pending expiries"
+        )
+    except Exception as e:
+        logger.error(f"Failed to clean up tokens: {e}")
+
+async def report_send_queue_job(context):
+    """Logs outbound queue depth and wait times since the last report."""
+    send_queue = context.bot.rate_limiter
+    stats = send_queue.stats()
+    priorities = stats["priorities"]
+    if not any(p["sent"] for p in priorities.values()) and not stats["flood_waits"]:
+        return
+    waits = ", ".join(
+        f"{name}: {p['sent']} sent, {p['waited']} waited (avg {p['avg_wait']:.2f}s, max {p['max_wait']:.2f}s)"
+        for name, p in priorities.items()
+    )
+    logger.info(
+        f"Send queue: depth {stats['depth']} (max {stats['max_depth']}), "
+        f"{stats['flood_waits']} flood waits, {stats['chat_buckets']} chats; {waits}"
+    )
+    send_queue.reset_stats()
+
+async def report_cache_stats_job(context):
+    """Logs how the in-memory caches are doing (counters run since startup)."""
+    roles = db.get_role_cache_stats()
+    per_update = roles["lookups"] / roles["updates"] if roles["updates"] else 0.0
+    logger.info(
+        f"Role cache: {roles['admins']} admins, {roles['lookups']} lookups over {roles['updates']} updates "
+        f"(avg {per_update:.1f}, max {roles['max_lookups_per_update']} per update), {roles['refreshes']} refreshes"
+    )
+    files = db.get_json_cache_stats()
+    reads = files["hits"] + files["misses"]
+    hit_rate = files["hits"] / reads if reads else 0.0
+    logger.info(
+        f"JSON file cache: {files['hits']} hits, {files['misses']} misses ({hit_rate:.0%} hit rate), "
+        f"{files['cached_files']} files cached"
+    )
+
 # --- New Channel Member Handler ---
 def extract_status_change(chat_member_update: ChatMemberUpdated) -> Optional[Tuple[bool, bool]]:
     """Takes a ChatMemberUpdated instance and extracts whether the 'old_chat_member' was a member
@@ -119,7 +202,7 @@ async def global_cancel_handler(update: Update, context: ContextTypes.DEFAULT_TY
     from utils import restore_main_keyboard
     import database as db
 
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     keyboard = await restore_main_keyboard(update, context, user_role)
 
     await update.message.reply_text("❌ Action cancelled.", reply_markup=keyboard)
@@ -144,7 +227,15 @@ def main() -> None:
     db.initialize_database()
 
     # --- Application Setup ---
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Updates from different chats run concurrently; each chat stays in order.
+    # All outgoing requests pass the rate-limited, prioritised send queue.
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(PerChatUpdateProcessor(CONCURRENT_UPDATES))
+        .rate_limiter(OutboundSendQueue())
+        .build()
+    )
 
     # --- Registering Handlers ---
     # Add all handlers from the different handler files.
@@ -185,9 +276,43 @@ def main() -> None:
         await application.bot.set_my_commands([], scope=BotCommandScopeDefault())
         await application.bot.set_my_commands([], scope=BotCommandScopeAllPrivateChats())
         logger.info("Hamburger menu disabled globally for all users - using reply keyboard only")
+        # Pick up a broadcast that was interrupted by the last shutdown
+        broadcaster.resume_broadcast(application.bot)
 
     application.post_init = post_init
 
+    # --- Storage Maintenance ---
+    # Regularly fsync the write journal, and compact it when the bot stops
+    application.job_queue.run_repeating(flush_storage_job, interval=db.JOURNAL_FSYNC_INTERVAL, first=db.JOURNAL_FSYNC_INTERVAL)
+    # Persist user upserts from /start in batches
+    application.job_queue.run_repeating(flush_users_job, interval=db.USER_FLUSH_INTERVAL, first=db.USER_FLUSH_INTERVAL)
+    # Persist download counters without rewriting the catalog
+    application.job_queue.run_repeating(flush_download_counts_job, interval=db.DOWNLOAD_FLUSH_INTERVAL, first=db.DOWNLOAD_FLUSH_INTERVAL)
+    application.job_queue.run_repeating(save_analytics_job, interval=db.ANALYTICS_SAVE_INTERVAL, first=db.ANALYTICS_SAVE_INTERVAL)
+    # Keep the token tables proportional to live links
+    application.job_queue.run_repeating(cleanup_tokens_job, interval=db.TOKEN_SWEEP_INTERVAL, first=db.TOKEN_SWEEP_INTERVAL)
+    # Delete auto-cleanup messages as they fall due
+    application.job_queue.run_repeating(drain_deletions_job, interval=db.DELETION_DRAIN_INTERVAL, first=db.DELETION_DRAIN_INTERVAL)
+    # Reload admin roles in case the data was edited by hand
+    application.job_queue.run_repeating(refresh_role_cache_job, interval=db.ROLE_CACHE_REFRESH_INTERVAL, first=db.ROLE_CACHE_REFRESH_INTERVAL)
+
+    # Report outbound queue depth and wait times
+    application.job_queue.run_repeating(report_send_queue_job, interval=STATS_REPORT_INTERVAL, first=STATS_REPORT_INTERVAL)
+    # Report cache effectiveness
+    application.job_queue.run_repeating(report_cache_stats_job, interval=STATS_REPORT_INTERVAL, first=STATS_REPORT_INTERVAL)
+
+    async def post_stop(application):
+        # Leave a running broadcast at its last checkpoint
+        await broadcaster.stop_broadcast()
+
+    application.post_stop = post_stop
+
+    async def post_shutdown(application):
+        db.close_database()
+        logger.info("Database flushed and closed")
+
+    application.post_shutdown = post_shutdown
+
     # --- Start the Bot ---
     logger.info("Bot is starting up...")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
@@ -0,0 +1,96 @@
+# MovieZoneBot/message_deleter.py
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+# Single deletions in flight at once
+DELETE_CONCURRENCY = 10
+# Most ids one deleteMessages call accepts
+BULK_DELETE_LIMIT = 100
+
+
+class DeleteReport(NamedTuple):
+    requested: int
+    deleted: int
+    # error message -> how many deletions failed with it
+    failures: Dict[str, int]
+    # (chat_id, message_id) pairs that failed for a transient reason (network
+    # error, timeout, flood limit) and are worth trying again
+    retry: List[Tuple[Union[int, str], int]]
+
+    def summary(self) -> str:
+        text = f"{self.deleted}/{self.requested} deleted"
+        if self.failures:
+            text += " (" + ", ".join(f"{count}x {error}" for error, count in self.failures.items()) + ")"
+        if self.retry:
+            text += f", {len(self.retry)} to retry"
+        return text
+
+
+def _by_chat(messages: Iterable[Tuple[Union[int, str], int]]) -> Dict[Union[int, str], List[int]]:
+    chats: Dict[Union[int, str], List[int]] = {}
+    for chat_id, message_id in messages:
+        chats.setdefault(chat_id, []).append(message_id)
+    return chats
+
+async def delete_messages(bot, messages: Iterable[Tuple[Union[int, str], int]]) -> DeleteReport:
+    """
+    Delete (chat_id, message_id) pairs, grouped per chat. Uses deleteMessages
+    (up to BULK_DELETE_LIMIT ids per call) when the bot library has it, and
+    otherwise single deletions, DELETE_CONCURRENCY at a time. Never raises:
+    failures are counted per error message in the report, and the ones that
+    may succeed later are listed in its `retry`.
+    """
+    chats = _by_chat(messages)
+    requested = sum(len(message_ids) for message_ids in chats.values())
+    failures: Counter = Counter()
+    retry: List[Tuple[Union[int, str], int]] = []
+    semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
+
+    async def delete_one(chat_id, message_id: int) -> int:
+        async with semaphore:
+            try:
+                await bot.delete_message(chat_id=chat_id, message_id=message_id)
+                return 1
+            except (BadRequest, Forbidden) as e:
+                # Usually already deleted, older than Telegram lets bots delete, or the bot was blocked
+                failures[e.message] += 1
+            except (NetworkError, RetryAfter) as e:
+                failures[e.message] += 1
+                retry.append((chat_id, message_id))
+            except TelegramError as e:
+                failures[e.message] += 1
+            return 0
+
+    async def delete_bulk(chat_id, message_ids: List[int]) -> int:
+        async with semaphore:
+            try:
+                # Ids that cannot be deleted are skipped by Telegram, not reported
+                await bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+                return len(message_ids)
+            except TelegramError as e:
+                logger.debug(f"Bulk deletion in chat {chat_id} failed ({e}), deleting one by one")
+        results = await asyncio.gather(*(delete_one(chat_id, message_id) for message_id in message_ids))
+        return sum(results)
+
+    if hasattr(bot, "delete_messages"):
+        jobs = [
+            delete_bulk(chat_id, message_ids[i:i + BULK_DELETE_LIMIT])
+            for chat_id, message_ids in chats.items()
+            for i in range(0, len(message_ids), BULK_DELETE_LIMIT)
+        ]
+    else:
+        jobs = [
+            delete_one(chat_id, message_id)
+            for chat_id, message_ids in chats.items()
+            for message_id in message_ids
+        ]
+    deleted = sum(await asyncio.gather(*jobs))
+    return DeleteReport(requested, deleted, dict(failures), retry)
@@ -0,0 +1,47 @@
+# MovieZoneBot/migrate_to_sqlite.py
+
+"""
+One-shot migration of the JSON data files into the SQLite database.
+
+Usage:
+    python migrate_to_sqlite.py
+
+Then set STORAGE_BACKEND = "sqlite" in config.py. The JSON files are left
+untouched, so switching back to "json" is always possible.
+"""
+
+import logging
+import sys
+
+import database as db
+from config import SQLITE_DB_FILE
+from sqlite_store import SqliteStore, migrate_from_json
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    source = db.JsonStore()
+    # Replays any journaled changes that are not in the snapshots yet
+    source.initialize()
+    target = SqliteStore(SQLITE_DB_FILE)
+    target.initialize()
+
+    if not target.is_empty():
+        logger.warning(f"{SQLITE_DB_FILE} already has data; matching records will be overwritten")
+
+    copied = migrate_from_json(source, target)
+    target.close()
+
+    for table, count in copied.items():
+        print(f"{table}: {count} records")
+    print(f"Migration finished. Set STORAGE_BACKEND = \"sqlite\" in config.py to use {SQLITE_DB_FILE}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# MovieZoneBot/request_index.py
+
+import bisect
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+
+def _discard(items: list, item) -> None:
+    """Remove `item` from a sorted list, if it is there."""
+    position = bisect.bisect_left(items, item)
+    if position < len(items) and items[position] == item:
+        del items[position]
+
+
+class PendingRequestIndex:
+    """
+    Pending movie requests in both listing orders, kept sorted as requests
+    are added and handled.
+
+    "age" is request id order (oldest first). "demand" orders by
+    (-demand, request id), where a request's demand is the number of pending
+    requests sharing its demand key (the same movie). A page is a slice of
+    one of the two lists. Adding or handling a request re-ranks only the
+    requests for that movie, a bisect each.
+    """
+
+    def __init__(self):
+        self._by_age: List[int] = []
+        # sorted [(-demand, request_id)]
+        self._by_demand: List[Tuple[int, int]] = []
+        # demand key -> its pending request ids, oldest first
+        self._groups: Dict[str, List[int]] = {}
+        # request_id -> demand key
+        self._keys: Dict[int, str] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def build(cls, requests: Iterable[Tuple[int, str]]) -> "PendingRequestIndex":
+        """Index (request_id, demand key) pairs, sorting each list once."""
+        index = cls()
+        for request_id, key in requests:
+            index._keys[request_id] = key
+            index._groups.setdefault(key, []).append(request_id)
+        index._by_age = sorted(index._keys)
+        for group in index._groups.values():
+            group.sort()
+        index._by_demand = sorted(
+            (-len(group), request_id) for group in index._groups.values() for request_id in group
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _rank(self, group: List[int]):
+        for request_id in group:
+            bisect.insort(self._by_demand, (-len(group), request_id))
+
+    def _unrank(self, group: List[int]):
+        for request_id in group:
+            _discard(self._by_demand, (-len(group), request_id))
+
+    def add(self, request_id: int, key: str):
+        """Index a pending request, replacing any previous entry for it."""
+        with self._lock:
+            self._remove(request_id)
+            group = self._groups.setdefault(key, [])
+            self._unrank(group)
+            bisect.insort(group, request_id)
+            self._rank(group)
+            bisect.insort(self._by_age, request_id)
+            self._keys[request_id] = key
+
+    def remove(self, request_id: int):
+        """Drop a request that is no longer pending."""
+        with self._lock:
+            self._remove(request_id)
+
+    def _remove(self, request_id: int):
+        key = self._keys.pop(request_id, None)
+        if key is None:
+            return
+        group = self._groups[key]
+        self._unrank(group)
+        _discard(group, request_id)
+        if group:
+            self._rank(group)
+        else:
+            del self._groups[key]
+        _discard(self._by_age, request_id)
+
+    def page(self, order: str, offset: int, limit: int) -> List[Tuple[int, int]]:
+        """(request_id, demand) pairs of one page, in "age" or "demand" order."""
+        with self._lock:
+            if order == "demand":
+                return [(request_id, -demand) for demand, request_id in self._by_demand[offset:offset + limit]]
+            return [
+                (request_id, len(self._groups[self._keys[request_id]]))
+                for request_id in self._by_age[offset:offset + limit]
+            ]
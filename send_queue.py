@@ -0,0 +1,318 @@
+# MovieZoneBot/send_queue.py
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+from telegram import Update
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import database as db
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+# Send priorities, most urgent first
+PRIORITY_HIGH = 0    # admin flows and file deliveries
+PRIORITY_NORMAL = 1  # replies to users
+PRIORITY_LOW = 2     # welcome messages and other bulk sends
+PRIORITY_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+# Token buckets as (messages per second, burst), a little under Telegram's
+# limits: about 30 messages per second overall, one per second in a private
+# chat and 20 per minute in a group or channel
+GLOBAL_LIMIT = (25.0, 25)
+PRIVATE_CHAT_LIMIT = (1.0, 4)
+GROUP_CHAT_LIMIT = (20 / 60, 5)
+
+# Endpoints that send or change messages; everything else (answering
+# callbacks, deleting, lookups) is not throttled
+THROTTLED_PREFIXES = ("send", "copy", "forward", "edit")
+UNTHROTTLED_ENDPOINTS = {"sendChatAction"}
+FILE_ENDPOINTS = {"sendVideo", "sendDocument", "sendAudio", "sendMediaGroup", "copyMessage", "forwardMessage"}
+
+# A request that still hits a flood limit pauses all sending for the time
+# Telegram asks for and is retried this many times
+FLOOD_RETRIES = 2
+# Idle chat buckets are dropped this often
+CHAT_BUCKET_SWEEP_INTERVAL = 300
+# Queue metrics are logged (and reset) this often
+STATS_REPORT_INTERVAL = 300
+
+# Priority of the sends made by the update or job currently running
+_send_priority: contextvars.ContextVar = contextvars.ContextVar("send_priority", default=PRIORITY_NORMAL)
+
+
+@contextlib.contextmanager
+def send_priority(priority: int):
+    """Send everything inside the block with the given priority (per asyncio task)."""
+    token = _send_priority.set(priority)
+    try:
+        yield
+    finally:
+        _send_priority.reset(token)
+
+def update_priority(update: object) -> int:
+    """Priority of the replies to an update: staff first, welcome messages last."""
+    if not isinstance(update, Update):
+        return PRIORITY_NORMAL
+    if update.chat_member or update.my_chat_member:
+        return PRIORITY_LOW
+    if update.effective_user and db.get_user_role(update.effective_user.id) in ('owner', 'admin'):
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+class _Bucket:
+    """A token bucket that hands out reservations: tokens may go negative, the wait grows instead."""
+    __slots__ = ("rate", "capacity", "tokens", "stamp")
+
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.stamp = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is free."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """Take a token, possibly ahead of time; returns how long to wait for it."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def idle(self, now: float) -> bool:
+        return self.tokens + (now - self.stamp) * self.rate >= self.capacity
+
+
+class OutboundSendQueue(BaseRateLimiter[int]):
+    """
+    Every Bot API request goes through here (see Application.builder().rate_limiter).
+
+    A message first waits for its chat's bucket (one per chat, stricter for
+    groups and channels), then queues for the global bucket, which a single
+    dispatcher hands out highest priority first. The priority comes from
+    rate_limit_args when given, else from send_priority() (set per update by
+    the update processor). File deliveries go first, except inside a
+    send_priority(PRIORITY_LOW) block such as a broadcast. Handlers call the
+    bot as before.
+    """
+
+    def __init__(self, global_limit: Tuple[float, int] = GLOBAL_LIMIT,
+                 private_limit: Tuple[float, int] = PRIVATE_CHAT_LIMIT,
+                 group_limit: Tuple[float, int] = GROUP_CHAT_LIMIT,
+                 flood_retries: int = FLOOD_RETRIES):
+        self._global_limit = global_limit
+        self._private_limit = private_limit
+        self._group_limit = group_limit
+        self._flood_retries = flood_retries
+
+        self._global: Optional[_Bucket] = None
+        self._chats: Dict[Union[int, str], _Bucket] = {}
+        self._last_sweep = time.monotonic()
+        self._paused_until = 0.0
+
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self._chat_waiting = 0
+        self._stats = {
+            name: {"sent": 0, "waited": 0, "wait_total": 0.0, "wait_max": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self._flood_waits = 0
+        self._max_depth = 0
+
+    async def initialize(self) -> None:
+        self._start()
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._dispatcher
+            self._dispatcher = None
+        for _, _, future in self._queue:
+            if not future.done():
+                future.cancel()
+        self._queue.clear()
+
+    def _start(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._global = _Bucket(*self._global_limit, time.monotonic())
+            self._dispatcher = asyncio.create_task(self._dispatch(), name="OutboundSendQueue:dispatcher")
+
+    # --- Scheduling ---
+
+    async def _dispatch(self):
+        """Hand out global tokens, highest priority first."""
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            wait = max(self._paused_until - now, self._global.delay(now))
+            if wait > 0:
+                # Requests arriving meanwhile are ordered before the next pick
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                # Its sender was cancelled
+                continue
+            self._global.reserve(now)
+            future.set_result(None)
+
+    def _chat_bucket(self, chat_id: Union[int, str], now: float) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if now - self._last_sweep > CHAT_BUCKET_SWEEP_INTERVAL:
+                self._chats = {key: b for key, b in self._chats.items() if not b.idle(now)}
+                self._last_sweep = now
+            limit = self._group_limit if self._is_group(chat_id) else self._private_limit
+            bucket = self._chats[chat_id] = _Bucket(*limit, now)
+        return bucket
+
+    @staticmethod
+    def _is_group(chat_id: Union[int, str]) -> bool:
+        # Groups and channels have negative ids, or are addressed as @username
+        if isinstance(chat_id, str):
+            if chat_id.startswith("@"):
+                return True
+            try:
+                chat_id = int(chat_id)
+            except ValueError:
+                return False
+        return chat_id < 0
+
+    async def _acquire(self, chat_id: Union[int, str], priority: int) -> float:
+        """Wait for the chat's bucket, then for a global token. Returns the time waited."""
+        self._start()
+        started = time.monotonic()
+
+        wait = self._chat_bucket(chat_id, started).reserve(started)
+        if wait > 0:
+            self._chat_waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._chat_waiting -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future))
+        self._max_depth = max(self._max_depth, self.depth)
+        self._wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        return time.monotonic() - started
+
+    async def _wait_for_flood_pause(self):
+        wait = self._paused_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _record(self, priority: int, waited: float):
+        stats = self._stats[PRIORITY_NAMES[priority]]
+        stats["sent"] += 1
+        if waited > 0.001:
+            stats["waited"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+
+    # --- BaseRateLimiter ---
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], None]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], None]:
+        chat_id = data.get("chat_id")
+        throttled = (
+            chat_id is not None
+            and endpoint.startswith(THROTTLED_PREFIXES)
+            and endpoint not in UNTHROTTLED_ENDPOINTS
+        )
+        if isinstance(rate_limit_args, int):
+            priority = rate_limit_args
+        elif endpoint in FILE_ENDPOINTS and _send_priority.get() != PRIORITY_LOW:
+            priority = PRIORITY_HIGH
+        else:
+            priority = _send_priority.get()
+        priority = min(max(priority, PRIORITY_HIGH), PRIORITY_LOW)
+
+        attempt = 0
+        while True:
+            if throttled:
+                self._record(priority, await self._acquire(chat_id, priority))
+            else:
+                await self._wait_for_flood_pause()
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                delay = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+                self._flood_waits += 1
+                if attempt >= self._flood_retries:
+                    raise
+                attempt += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                logger.warning(f"Flood limit on {endpoint} to {chat_id}: pausing all sends for {delay:.0f}s")
+
+    # --- Metrics ---
+
+    @property
+    def depth(self) -> int:
+        """Requests currently waiting, for their chat or for the global bucket."""
+        return self._chat_waiting + len(self._queue)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, flood waits and per-priority send and wait counters."""
+        priorities = {}
+        for name, stats in self._stats.items():
+            priorities[name] = {
+                "sent": stats["sent"],
+                "waited": stats["waited"],
+                "avg_wait": stats["wait_total"] / stats["waited"] if stats["waited"] else 0.0,
+                "max_wait": stats["wait_max"],
+            }
+        return {
+            "depth": self.depth,
+            "max_depth": self._max_depth,
+            "chat_buckets": len(self._chats),
+            "flood_waits": self._flood_waits,
+            "priorities": priorities,
+        }
+
+    def reset_stats(self):
+        """Start a new reporting period (depth and bucket counts are live and stay)."""
+        for stats in self._stats.values():
+            stats.update(sent=0, waited=0, wait_total=0.0, wait_max=0.0)
+        self._flood_waits = 0
+        self._max_depth = self.depth
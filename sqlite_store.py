@@ -0,0 +1,337 @@
+# MovieZoneBot/sqlite_store.py
+
+import json
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Iterable, Tuple
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+# Every table keeps the full record as JSON in `data`, plus a few copied-out
+# columns so the hot lookups can use an index instead of parsing every row.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS admins (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movies (
+    movie_id INTEGER PRIMARY KEY,
+    title_lower TEXT NOT NULL DEFAULT '',
+    added_by INTEGER,
+    added_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS movie_categories (
+    category TEXT NOT NULL,
+    movie_id INTEGER NOT NULL,
+    PRIMARY KEY (category, movie_id)
+) WITHOUT ROWID;
+-- For DELETE FROM movie_categories WHERE movie_id = ? (re-saving or deleting a movie)
+CREATE INDEX IF NOT EXISTS idx_movie_categories_movie ON movie_categories(movie_id);
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS requests (
+    request_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS request_archive (
+    request_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    token TEXT PRIMARY KEY,
+    expires_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spent_tokens (
+    token TEXT PRIMARY KEY,
+    expires_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+-- Searching, paging and token expiry are served from in-memory indexes, and
+-- the requests table only holds pending requests: these indexes had no query
+DROP INDEX IF EXISTS idx_movies_title;
+DROP INDEX IF EXISTS idx_movies_added_by;
+DROP INDEX IF EXISTS idx_requests_status;
+DROP INDEX IF EXISTS idx_tokens_expires;
+DROP INDEX IF EXISTS idx_spent_tokens_expires;
+"""
+
+# table -> primary key column
+KEY_COLUMNS = {
+    "users": "user_id",
+    "admins": "user_id",
+    "movies": "movie_id",
+    "channels": "channel_id",
+    "requests": "request_id",
+    "request_archive": "request_id",
+    "tokens": "token",
+    "spent_tokens": "token",
+}
+
+# table -> {column: function extracting the column value from a record}
+INDEXED_COLUMNS = {
+    "movies": {
+        "title_lower": lambda record: record.get("title", "").lower(),
+        "added_by": lambda record: record.get("added_by"),
+        "added_at": lambda record: record.get("added_at"),
+    },
+    "requests": {
+        "status": lambda record: record.get("status", "pending"),
+    },
+    "request_archive": {
+        "status": lambda record: record.get("status", ""),
+    },
+    "tokens": {
+        "expires_at": lambda record: record.get("expires_at", ""),
+    },
+    "spent_tokens": {
+        "expires_at": lambda record: record.get("expires_at", ""),
+    },
+}
+
+
+class SqliteStore:
+    """
+    SQLite implementation of the record store used by database.py.
+
+    Mutations touch one row instead of rewriting a whole JSON file. The database
+    runs in WAL mode so readers never block the writer.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._conn: Optional[sqlite3.Connection] = None
+        # One connection shared by all threads, serialized by this lock
+        self._lock = threading.RLock()
+
+    # --- Connection ---
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def initialize(self):
+        """Create the database file and schema if needed."""
+        with self._lock:
+            self._connection()
+        logger.info(f"SQLite storage ready at {self.db_file}")
+
+    def flush(self):
+        # Every transaction is already committed to the WAL
+        pass
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def is_empty(self) -> bool:
+        """True if no table holds any record yet (used to decide on migration)."""
+        with self._lock:
+            conn = self._connection()
+            for table in KEY_COLUMNS:
+                if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+            return True
+
+    # --- Generic record access ---
+
+    def _key(self, table: str, key: str):
+        # Integer primary keys are stored as integers so they sort numerically
+        if KEY_COLUMNS[table] in ("user_id", "movie_id", "request_id"):
+            return int(key)
+        return key
+
+    def get(self, table: str, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT data FROM {table} WHERE {KEY_COLUMNS[table]} = ?",
+                (self._key(table, key),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all(self, table: str) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {KEY_COLUMNS[table]}, data FROM {table} ORDER BY rowid"
+            ).fetchall()
+        return {str(key): json.loads(data) for key, data in rows}
+
+    def count(self, table: str) -> int:
+        with self._lock:
+            return self._connection().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def scan(self, table: str, after: int, limit: int) -> List[Tuple[int, Dict]]:
+        """Up to `limit` records with integer keys above `after`, in key order."""
+        key_column = KEY_COLUMNS[table]
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {key_column}, data FROM {table} WHERE {key_column} > ? ORDER BY {key_column} LIMIT ?",
+                (after, limit)
+            ).fetchall()
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def _write(self, conn: sqlite3.Connection, table: str, key: str, record: Dict):
+        columns = INDEXED_COLUMNS.get(table, {})
+        names = [KEY_COLUMNS[table], *columns.keys(), "data"]
+        values = [self._key(table, key), *(extract(record) for extract in columns.values()),
+                  json.dumps(record, ensure_ascii=False)]
+        placeholders = ", ".join("?" for _ in names)
+        conn.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) VALUES ({placeholders})", values)
+
+        if table == "movies":
+            movie_id = self._key(table, key)
+            conn.execute("DELETE FROM movie_categories WHERE movie_id = ?", (movie_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO movie_categories (category, movie_id) VALUES (?, ?)",
+                [(category, movie_id) for category in record.get("categories", [])]
+            )
+
+    def put(self, table: str, key: str, record: Dict):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                self._write(conn, table, key, record)
+
+    def put_many(self, table: str, records: Dict[str, Dict]):
+        """Write several records in a single transaction."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                for key, record in records.items():
+                    self._write(conn, table, key, record)
+
+    def delete(self, table: str, key: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                cursor = conn.execute(
+                    f"DELETE FROM {table} WHERE {KEY_COLUMNS[table]} = ?",
+                    (self._key(table, key),)
+                )
+                if table == "movies":
+                    conn.execute("DELETE FROM movie_categories WHERE movie_id = ?", (self._key(table, key),))
+            return cursor.rowcount > 0
+
+    def delete_many(self, table: str, keys: List[str]) -> int:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                cursor = conn.executemany(
+                    f"DELETE FROM {table} WHERE {KEY_COLUMNS[table]} = ?",
+                    [(self._key(table, key),) for key in keys]
+                )
+            return cursor.rowcount
+
+    def next_id(self, table: str) -> int:
+        with self._lock:
+            return self._next_id(self._connection(), table)
+
+    def _next_id(self, conn: sqlite3.Connection, table: str) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE name = ?", (f"{table}_next_id",)).fetchone()
+        if row:
+            return row[0]
+        # No counter yet: continue after the highest existing id
+        row = conn.execute(f"SELECT MAX({KEY_COLUMNS[table]}) FROM {table}").fetchone()
+        return (row[0] or 0) + 1
+
+    def set_next_id(self, table: str, next_id: int):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                (f"{table}_next_id", next_id)
+            )
+
+    def insert(self, table: str, id_field: str, record: Dict) -> int:
+        """Store a record under the next free id, which is also written to record[id_field]."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                new_id = self._next_id(conn, table)
+                record[id_field] = new_id
+                self._write(conn, table, str(new_id), record)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                    (f"{table}_next_id", new_id + 1)
+                )
+        return new_id
+
+    # --- Indexed queries ---
+
+    def _records(self, sql: str, params: Iterable = ()) -> List[Dict]:
+        with self._lock:
+            rows = self._connection().execute(sql, tuple(params)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def titles(self) -> Dict[int, str]:
+        # Only the narrow title column is read; no record JSON is parsed
+        with self._lock:
+            rows = self._connection().execute("SELECT movie_id, title_lower FROM movies ORDER BY movie_id").fetchall()
+        return dict(rows)
+
+    def movie_uploads(self) -> Dict[int, Tuple[Optional[int], Optional[str], int]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT movie_id, added_by, added_at, COALESCE(json_extract(data, '$.download_count'), 0) FROM movies"
+            ).fetchall()
+        return {movie_id: (added_by, added_at, downloads) for movie_id, added_by, added_at, downloads in rows}
+
+    def movie_categories(self) -> Dict[int, List[str]]:
+        with self._lock:
+            rows = self._connection().execute("SELECT movie_id, category FROM movie_categories").fetchall()
+        categories: Dict[int, List[str]] = {}
+        for movie_id, category in rows:
+            categories.setdefault(movie_id, []).append(category)
+        return categories
+
+
+def migrate_from_json(source, target: SqliteStore) -> Dict[str, int]:
+    """
+    Copy every table from a JSON store into a SQLite store.
+
+    Returns the number of records copied per table. Existing rows with the same
+    keys are replaced, so running it twice is harmless.
+    """
+    copied = {}
+    for table in KEY_COLUMNS:
+        records = source.all(table)
+        target.put_many(table, records)
+        copied[table] = len(records)
+        logger.info(f"Migrated {len(records)} records into '{table}'")
+
+    for table in ("movies", "requests"):
+        target.set_next_id(table, source.next_id(table))
+    return copied
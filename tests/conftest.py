@@ -0,0 +1,37 @@
+# MovieZoneBot/tests/conftest.py
+
+import os
+import sys
+from collections import OrderedDict
+
+import pytest
+
+# The bot's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """The database module, initialized on an empty data directory with fresh in-memory state."""
+    monkeypatch.chdir(tmp_path)
+    import database as db
+    from deletion_queue import DeletionQueue
+    from download_counters import DownloadCounters
+    from token_store import TokenStore
+
+    db.invalidate_json_cache()
+    store = db._create_store()
+    monkeypatch.setattr(db, "_store", store)
+    monkeypatch.setattr(db, "_tokens", TokenStore(store, db.TOKENS, db.SPENT_TOKENS))
+    monkeypatch.setattr(db, "_downloads", DownloadCounters(db.COUNTERS_DIR))
+    monkeypatch.setattr(db, "_deletions", DeletionQueue(db.DELETIONS_DIR))
+    monkeypatch.setattr(db, "_users", OrderedDict())
+    monkeypatch.setattr(db, "_dirty_users", set())
+    monkeypatch.setattr(db, "_role_stats", dict.fromkeys(db._role_stats, 0))
+    for index in ("_title_index", "_initial_index", "_category_index", "_uploader_index", "_request_index"):
+        monkeypatch.setattr(db, index, None)
+
+    db.initialize_database()
+    yield db
+    db.flush_storage()
+    db.invalidate_json_cache()
@@ -0,0 +1,37 @@
+# MovieZoneBot/tests/test_ad_tokens.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+TOKENS = 60
+VALIDATORS_PER_TOKEN = 10
+
+
+@pytest.mark.parametrize("mode", ["signed", "stored"])
+def test_concurrent_validation_delivers_each_token_once(database, monkeypatch, mode):
+    db = database
+    monkeypatch.setattr(db, "AD_TOKEN_MODE", mode)
+    movie_id = db.add_movie({"title": "Stress Test", "files": {"720p": ("file-720p", "unique-720p")}})
+    downloads_before = db.get_movie_details(movie_id)["download_count"]
+
+    # One token per user: a user asking again would get their unused token back
+    tokens = {db.create_ad_token(user_id, movie_id, "720p"): user_id for user_id in range(1, TOKENS + 1)}
+    assert len(tokens) == TOKENS and None not in tokens
+
+    # The validators of a token start together; tokens overlap each other in the pool
+    barriers = {token: threading.Barrier(VALIDATORS_PER_TOKEN) for token in tokens}
+
+    def validate(token):
+        barriers[token].wait(timeout=10)
+        return token, db.validate_ad_token(token, tokens[token])
+
+    attempts = [token for token in tokens for _ in range(VALIDATORS_PER_TOKEN)]
+    with ThreadPoolExecutor(max_workers=3 * VALIDATORS_PER_TOKEN) as pool:
+        results = list(pool.map(validate, attempts))
+
+    delivered = [token for token, file_id in results if file_id is not None]
+    assert sorted(delivered) == sorted(tokens)
+    assert all(file_id in (None, "file-720p") for _, file_id in results)
+    assert db.get_movie_details(movie_id)["download_count"] == downloads_before + TOKENS
@@ -0,0 +1,54 @@
+# MovieZoneBot/tests/test_catalog_index.py
+
+import pytest
+
+from catalog_index import TitleIndex
+
+TITLES = {
+    1: "Batman",
+    2: "Batman Begins",
+    3: "The Batman",
+    4: "Superbatman",
+    5: "Iron Man",
+    6: "Spider-Man: No Way Home",
+    7: "Man of Steel",
+    8: "Batman Returns",
+}
+
+
+@pytest.fixture
+def index():
+    return TitleIndex.build(TITLES)
+
+
+def test_search_ranks_exact_then_prefix_then_word_then_substring(index):
+    # Exact "batman", the two prefix matches (older first), "the batman"
+    # on a word boundary, and the "superbatman" substring last
+    assert index.search("Batman", 10) == [1, 2, 8, 3, 4]
+    assert index.search("batman", 2) == [1, 2]
+    assert index.search("joker", 10) == []
+
+
+def test_popularity_lifts_a_title_within_reach_of_the_next_tier(index):
+    popular = {4: 40_000}
+    # 5 * log1p(40,000) is about 53: the substring match passes the prefix
+    # matches (60) but stays below the exact match (100)
+    assert index.search("batman", 10, downloads=lambda movie_id: popular.get(movie_id, 0)) == [1, 4, 2, 8, 3]
+    # Equal downloads keep the older title first
+    assert index.search("batman", 10, downloads=lambda movie_id: 7) == [1, 2, 8, 3, 4]
+
+
+def test_similar_suggests_titles_for_typos(index):
+    assert index.search("iron mn", 10) == []
+    assert index.similar("iron mn", 3) == [(5, pytest.approx(0.64))]
+    assert [movie_id for movie_id, _ in index.similar("spiderman", 3)] == [6]
+    assert [movie_id for movie_id, _ in index.similar("btman begns", 3)] == [2]
+    assert index.similar("zzzz", 3) == []
+
+
+def test_similar_follows_added_and_removed_titles(index):
+    index.add(9, "Iron Mask")
+    assert [movie_id for movie_id, _ in index.similar("iron mn", 3)][0] == 5
+    index.remove(5)
+    assert 5 not in [movie_id for movie_id, _ in index.similar("iron mn", 3)]
+    assert index.search("iron", 10) == [9]
@@ -0,0 +1,53 @@
+# MovieZoneBot/tests/test_channel_publisher.py
+
+import asyncio
+
+import httpx
+from telegram.error import NetworkError, TimedOut
+
+import channel_publisher
+from channel_publisher import publish_to_channels
+
+
+def _raised_from(error, cause):
+    """A Telegram error chained to an httpx error, as PTB's HTTPXRequest raises them."""
+    try:
+        raise error from cause
+    except type(error) as e:
+        return e
+
+
+class FakeBot:
+    """Raises the given errors on the first sends, then posts."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.sends = 0
+
+    async def send_message(self, chat_id, text, parse_mode):
+        self.sends += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def _publish(bot):
+    return asyncio.run(publish_to_channels(bot, ["@channel"], "New movie"))[0]
+
+
+def test_read_timeout_is_not_posted_again(monkeypatch):
+    monkeypatch.setattr(channel_publisher, "PUBLISH_RETRY_DELAY", 0)
+    bot = FakeBot([_raised_from(TimedOut(), httpx.ReadTimeout("read timed out"))])
+    result = _publish(bot)
+    assert bot.sends == 1
+    assert not result.ok and result.error.startswith("unknown")
+
+
+def test_connection_errors_before_sending_are_retried(monkeypatch):
+    monkeypatch.setattr(channel_publisher, "PUBLISH_RETRY_DELAY", 0)
+    bot = FakeBot([
+        _raised_from(NetworkError("httpx.ConnectError: refused"), httpx.ConnectError("refused")),
+        _raised_from(TimedOut(), httpx.PoolTimeout("pool timeout")),
+    ])
+    result = _publish(bot)
+    assert bot.sends == 3
+    assert result.ok and result.attempts == 3
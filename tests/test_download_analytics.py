@@ -0,0 +1,67 @@
+# MovieZoneBot/tests/test_download_analytics.py
+
+from download_analytics import DownloadAnalytics
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Midnight UTC, so hour and day buckets line up with the offsets below
+START = 19676 * DAY
+
+
+def test_windows_roll_over_by_hour_and_day():
+    analytics = DownloadAnalytics()
+    movie = ("movie", 7)
+
+    analytics.record(7, "720p", ["Action"], 9, amount=2, when=START + 1 * HOUR)
+    analytics.record(7, "720p", ["Action"], 9, when=START + 20 * HOUR)
+    assert analytics.windows(movie, when=START + 21 * HOUR) == {"24h": 3, "7d": 3, "30d": 3}
+
+    # Hour 1 has left the 24h window; the day buckets still hold it
+    assert analytics.windows(movie, when=START + 26 * HOUR) == {"24h": 1, "7d": 3, "30d": 3}
+
+    analytics.record(7, "1080p", ["Action"], 9, amount=5, when=START + 3 * DAY)
+    assert analytics.windows(movie, when=START + 3 * DAY) == {"24h": 5, "7d": 8, "30d": 8}
+    # Day 0 is out of the 7d window a week later, days 0 and 1 out of the 30d one after a month
+    assert analytics.windows(movie, when=START + 8 * DAY + HOUR) == {"24h": 0, "7d": 5, "30d": 8}
+    assert analytics.windows(movie, when=START + 31 * DAY) == {"24h": 0, "7d": 0, "30d": 5}
+
+    # A download long after the last one clears the whole ring before counting
+    analytics.record(7, "720p", ["Action"], 9, when=START + 40 * DAY)
+    assert analytics.windows(movie, when=START + 40 * DAY) == {"24h": 1, "7d": 1, "30d": 1}
+    # One older than the ring is not written onto a newer bucket
+    analytics.record(7, "720p", ["Action"], 9, when=START + 1 * HOUR)
+    assert analytics.windows(movie, when=START + 40 * DAY) == {"24h": 1, "7d": 1, "30d": 1}
+
+
+def test_each_series_counts_its_own_downloads(tmp_path):
+    analytics = DownloadAnalytics()
+    now = START + 12 * HOUR
+    analytics.record(7, "720p", ["Action", "Drama"], 9, when=now)
+    analytics.record(7, "1080p", ["Action"], 9, amount=2, when=now)
+    analytics.record(8, "720p", ["Drama"], None, when=now)
+
+    def last_day(key, analytics=analytics):
+        return analytics.windows(key, when=now)["24h"]
+
+    assert last_day(("all",)) == 4
+    assert last_day(("movie", 7)) == 3
+    assert last_day(("quality", 7, "720p")) == 1
+    assert last_day(("quality", 7, "1080p")) == 2
+    assert last_day(("category", "Action")) == 3
+    assert last_day(("category", "Drama")) == 2
+    assert last_day(("uploader", 9)) == 3
+    assert last_day(("uploader", 8)) == 0
+    assert analytics.qualities(7) == ["1080p", "720p"]
+
+    path = str(tmp_path / "analytics.json")
+    assert analytics.save(path, when=now)
+    loaded = DownloadAnalytics.load(path)
+    for key in [("all",), ("movie", 7), ("quality", 7, "1080p"), ("category", "Drama"), ("uploader", 9)]:
+        assert loaded.windows(key, when=now) == analytics.windows(key, when=now)
+
+    # Series with nothing left in their rings are dropped on save
+    analytics.record(8, "720p", ["Drama"], None, when=now + 40 * DAY)
+    assert analytics.save(path, when=now + 40 * DAY)
+    loaded = DownloadAnalytics.load(path)
+    assert loaded.qualities(7) == []
+    assert loaded.windows(("movie", 8), when=now + 40 * DAY)["30d"] == 1
@@ -0,0 +1,54 @@
+# MovieZoneBot/tests/test_message_deleter.py
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
+
+from message_deleter import delete_messages
+
+ERRORS = {
+    2: BadRequest("Message to delete not found"),
+    3: Forbidden("Forbidden: bot was blocked by the user"),
+    4: TimedOut(),
+    5: RetryAfter(3),
+}
+
+
+class FakeBot:
+    """Deletes one message at a time; some message ids fail."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append((chat_id, message_id))
+        if message_id in ERRORS:
+            raise ERRORS[message_id]
+        return True
+
+
+def test_only_transient_failures_are_retried():
+    report = asyncio.run(delete_messages(FakeBot(), [(10, i) for i in range(1, 6)]))
+    assert report.requested == 5
+    assert report.deleted == 1
+    assert sum(report.failures.values()) == 4
+    assert sorted(report.retry) == [(10, 4), (10, 5)]
+
+
+def test_drain_job_keeps_transient_failures_queued(database):
+    import main
+
+    db = database
+    for message_id in range(1, 6):
+        db.schedule_message_deletion(10, message_id, -120)
+    bot = FakeBot()
+
+    asyncio.run(main.drain_deletions_job(SimpleNamespace(bot=bot)))
+    assert len(bot.calls) == 5
+    # Nothing is due right away...
+    assert db.get_due_deletions() == ([], [])
+    # ...and the deletions that may succeed later come back after the retry delay
+    _, entries = db._deletions.due(100, when=time.time() + db.DELETION_RETRY_DELAY + 60)
+    assert sorted(entries) == [(10, 4), (10, 5)]
@@ -0,0 +1,63 @@
+# MovieZoneBot/tests/test_requests.py
+
+import random
+
+
+def _reference_order(db, order):
+    """The order the pending list had when it was sorted on every page."""
+    pending = sorted(db._store.all(db.REQUESTS).values(), key=lambda r: r["request_id"])
+    demand = {}
+    for request_data in pending:
+        key = db._request_demand_key(request_data["movie_name"])
+        demand[key] = demand.get(key, 0) + 1
+    if order == "demand":
+        pending.sort(key=lambda r: demand[db._request_demand_key(r["movie_name"])], reverse=True)
+    return [(r["request_id"], demand[db._request_demand_key(r["movie_name"])]) for r in pending]
+
+
+def _pages(db, order, page_size=7):
+    listed, offset = [], 0
+    while True:
+        page = db.get_pending_requests(limit=page_size, offset=offset, order=order)
+        if not page:
+            return listed
+        listed.extend((r["request_id"], r["demand"]) for r in page)
+        offset += page_size
+
+
+def test_pending_order_is_maintained_across_adds_and_status_changes(database):
+    db = database
+    rng = random.Random(10)
+    names = ["Inception", "inception ", "Dune", "Heat", "Alien", "Up", "Jaws"]
+    request_ids = []
+
+    for step in range(300):
+        if request_ids and rng.random() < 0.3:
+            request_id = request_ids.pop(rng.randrange(len(request_ids)))
+            status = rng.choice(["accepted", "rejected", "pending"])
+            db.update_request_status(request_id, status)
+            if status == "pending":
+                request_ids.append(request_id)
+        else:
+            request_ids.append(db.add_movie_request(rng.randint(1, 50), rng.choice(names)))
+
+        if step % 25 == 0:
+            for order in ("age", "demand"):
+                assert _pages(db, order) == _reference_order(db, order)
+
+    for order in ("age", "demand"):
+        assert _pages(db, order) == _reference_order(db, order)
+    assert db.count_pending_requests() == len(_pages(db, "age"))
+
+
+def test_pending_order_survives_restart(database):
+    db = database
+    for name in ["Dune", "Heat", "dune", "Up", "Heat", "DUNE"]:
+        db.add_movie_request(1, name)
+    db.update_request_status(2, "accepted")
+    before = _pages(db, "demand")
+    db.flush_storage()
+
+    db.initialize_database()
+    assert _pages(db, "demand") == before == _reference_order(db, "demand")
+    assert [demand for _, demand in before] == [3, 3, 3, 1, 1]
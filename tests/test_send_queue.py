@@ -0,0 +1,71 @@
+# MovieZoneBot/tests/test_send_queue.py
+
+import asyncio
+
+import broadcaster
+from send_queue import OutboundSendQueue, PRIORITY_LOW, send_priority
+
+
+class FakeBot:
+    """Routes bot calls through the send queue the way PTB's Bot does."""
+
+    def __init__(self, limiter: OutboundSendQueue):
+        self.limiter = limiter
+        self.sent = []
+
+    async def _request(self, endpoint, rate_limit_args=None, **data):
+        async def callback():
+            self.sent.append((endpoint, data["chat_id"]))
+            return True
+        return await self.limiter.process_request(callback, (), {}, endpoint, data, rate_limit_args)
+
+    async def send_message(self, rate_limit_args=None, **data):
+        return await self._request("sendMessage", rate_limit_args, **data)
+
+    async def copy_message(self, rate_limit_args=None, **data):
+        return await self._request("copyMessage", rate_limit_args, **data)
+
+
+async def _reply(bot):
+    await bot.send_message(chat_id=3, text="reply")
+
+
+async def _race(send_first, send_second):
+    """Queue two sends, in this order, while the global bucket is empty; return the order they went out."""
+    limiter = OutboundSendQueue(global_limit=(20.0, 1))
+    await limiter.initialize()
+    bot = FakeBot(limiter)
+    try:
+        # Use up the only global token
+        await bot.send_message(chat_id=1, text="warm up")
+        first = asyncio.ensure_future(send_first(bot))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(send_second(bot))
+        await asyncio.gather(first, second)
+    finally:
+        await limiter.shutdown()
+    return bot.sent[1:]
+
+
+def test_broadcast_copy_does_not_overtake_reply():
+    async def broadcast_copy(bot):
+        message = {"from_chat_id": 99, "message_id": 7}
+        with send_priority(PRIORITY_LOW):
+            assert await broadcaster._deliver(bot, 2, message) == "sent"
+
+    assert asyncio.run(_race(broadcast_copy, _reply)) == [("sendMessage", 3), ("copyMessage", 2)]
+
+
+def test_low_priority_context_applies_to_file_endpoints():
+    async def bulk_copy(bot):
+        with send_priority(PRIORITY_LOW):
+            await bot.copy_message(chat_id=2, from_chat_id=99, message_id=7)
+
+    assert asyncio.run(_race(bulk_copy, _reply)) == [("sendMessage", 3), ("copyMessage", 2)]
+
+
+def test_file_delivery_still_goes_first():
+    async def file_delivery(bot):
+        await bot.copy_message(chat_id=2, from_chat_id=99, message_id=7)
+
+    assert asyncio.run(_race(_reply, file_delivery)) == [("copyMessage", 2), ("sendMessage", 3)]
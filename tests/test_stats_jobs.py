@@ -0,0 +1,43 @@
+# MovieZoneBot/tests/test_stats_jobs.py
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+
+def test_cache_stats_job_logs_role_lookups(database, caplog):
+    import main
+
+    db = database
+    with db.count_role_lookups():
+        db.get_user_role(12345)
+        db.get_user_role(12345)
+    with caplog.at_level(logging.INFO, logger="main"):
+        asyncio.run(main.report_cache_stats_job(SimpleNamespace(bot=None)))
+    assert "Role cache:" in caplog.text
+    assert "max 2 per update" in caplog.text
+
+
+def test_token_sweep_job_logs_purged_and_sizes(database, monkeypatch, caplog):
+    import main
+
+    db = database
+    movie_id = db.add_movie({"title": "Sweep", "files": {"720p": "file-720p"}})
+    monkeypatch.setattr(db, "AD_TOKEN_MODE", "stored")
+    db.create_ad_token(1, movie_id, "720p")
+    with caplog.at_level(logging.INFO, logger="main"):
+        asyncio.run(main.cleanup_tokens_job(SimpleNamespace(bot=None)))
+    assert "Token sweep: purged 0" in caplog.text
+    assert "1 live tokens (1 reusable), 0 spent ids" in caplog.text
+
+
+def test_cache_stats_job_logs_json_cache(database, caplog):
+    import main
+
+    db = database
+    db.load_json(db.USERS_FILE)
+    db.load_json(db.USERS_FILE)
+    with caplog.at_level(logging.INFO, logger="main"):
+        asyncio.run(main.report_cache_stats_job(SimpleNamespace(bot=None)))
+    assert "JSON file cache:" in caplog.text
+    assert "files cached" in caplog.text
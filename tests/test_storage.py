@@ -0,0 +1,35 @@
+# MovieZoneBot/tests/test_storage.py
+
+import random
+
+
+def test_scan_pages_through_keys_in_order_across_writes(database):
+    db = database
+    store = db._store
+    rng = random.Random(23)
+    keys = set()
+
+    def scan_all(limit):
+        seen, after = [], 0
+        while True:
+            rows = store.scan(db.USERS, after, limit)
+            if not rows:
+                return seen
+            seen.extend(key for key, _ in rows)
+            after = rows[-1][0]
+
+    for key in rng.sample(range(1, 5000), 300):
+        store.put(db.USERS, str(key), {"user_id": key})
+        keys.add(key)
+    assert scan_all(7) == sorted(keys)
+
+    # Writes after the first scan keep the order current
+    for key in rng.sample(sorted(keys), 100):
+        store.delete(db.USERS, str(key))
+        keys.discard(key)
+    for key in rng.sample(range(5000, 9000), 100):
+        store.put(db.USERS, str(key), {"user_id": key})
+        keys.add(key)
+    store.put(db.USERS, str(min(keys)), {"user_id": min(keys), "is_active": False})
+    assert scan_all(50) == sorted(keys)
+    assert store.scan(db.USERS, max(keys), 10) == []
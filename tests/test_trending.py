@@ -0,0 +1,87 @@
+# MovieZoneBot/tests/test_trending.py
+
+import math
+
+import pytest
+
+from trending import REBASE_EXPONENT, TrendingScores
+
+HOUR = 3600
+
+
+def _ids(ranking):
+    return [movie_id for movie_id, _ in ranking]
+
+
+def test_older_downloads_count_for_less_as_time_passes():
+    trending = TrendingScores(half_life=HOUR, size=10)
+    start = trending._epoch
+    for _ in range(4):
+        trending.record(1, ["Action"], when=start)
+    for _ in range(3):
+        trending.record(2, ["Action"], when=start + HOUR)
+
+    # Movie 1's four downloads are one half-life old: worth 2 against movie 2's 3
+    assert trending.score(1, when=start + HOUR) == pytest.approx(2.0)
+    assert _ids(trending.top("Action", when=start + HOUR)) == [2, 1]
+    # Both keep decaying at the same rate, so the order holds
+    top = trending.top(None, when=start + 3 * HOUR)
+    assert _ids(top) == [2, 1]
+    assert [score for _, score in top] == pytest.approx([0.75, 0.5])
+
+    # A burst of fresh downloads overtakes
+    for _ in range(2):
+        trending.record(1, ["Action"], when=start + 3 * HOUR)
+    assert _ids(trending.top("Action", when=start + 3 * HOUR)) == [1, 2]
+
+
+def test_rankings_keep_only_the_top_n_per_category():
+    trending = TrendingScores(half_life=HOUR, size=2)
+    now = trending._epoch
+    downloads = {1: 5, 2: 1, 3: 3, 4: 2}
+    for movie_id, count in downloads.items():
+        for _ in range(count):
+            trending.record(movie_id, ["Drama"] if movie_id % 2 else ["Comedy"], when=now)
+
+    assert _ids(trending.top(None, when=now)) == [1, 3]
+    assert _ids(trending.top("Drama", when=now)) == [1, 3]
+    assert _ids(trending.top("Comedy", when=now)) == [4, 2]
+    assert trending.top("Horror", when=now) == []
+
+    # Movie 2 climbs past movie 3 and evicts it from the overall top 2
+    for _ in range(5):
+        trending.record(2, ["Comedy"], when=now)
+    assert _ids(trending.top(None, when=now)) == [2, 1]
+    assert _ids(trending.top("Comedy", limit=1, when=now)) == [2]
+
+    # Deleting a ranked movie lets the next best back in
+    trending.forget(2)
+    assert _ids(trending.top(None, when=now)) == [1, 3]
+
+
+def test_rebase_keeps_scores_and_order():
+    trending = TrendingScores(half_life=HOUR, size=5)
+    start = trending._epoch
+    trending.record(1, [], when=start)
+    trending.record(1, [], when=start)
+    trending.record(2, [], when=start)
+    # Far enough ahead that the stored weights are rescaled
+    later = start + (REBASE_EXPONENT + 1) * HOUR / math.log(2)
+    trending.record(3, [], when=later)
+    assert trending._epoch == later
+    assert _ids(trending.top(None, when=later)) == [3, 1, 2]
+    assert trending.score(3, when=later) == pytest.approx(1.0)
+
+
+def test_save_drops_faded_scores_and_load_restores_rankings(tmp_path):
+    path = str(tmp_path / "trending.json")
+    trending = TrendingScores(half_life=HOUR, size=5)
+    start = trending._epoch
+    trending.record(1, ["Action"], when=start)
+    trending.record(2, ["Action"], when=start + 10 * HOUR)
+    # Movie 1 is now ten half-lives old, below MIN_SCORE
+    assert trending.save(path, when=start + 10 * HOUR)
+
+    loaded = TrendingScores.load(path, half_life=HOUR, size=5)
+    assert _ids(loaded.top("Action", when=start + 10 * HOUR)) == [2]
+    assert loaded.score(2, when=start + 11 * HOUR) == pytest.approx(0.5)
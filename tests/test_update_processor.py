@@ -0,0 +1,57 @@
+# MovieZoneBot/tests/test_update_processor.py
+
+import asyncio
+import time
+
+from telegram import Chat, Message, Update, User
+
+from update_processor import PerChatUpdateProcessor
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    user = User(id=chat_id, first_name="user", is_bot=False)
+    chat = Chat(id=chat_id, type=Chat.PRIVATE)
+    message = Message(message_id=update_id, date=None, chat=chat, from_user=user, text="/start")
+    return Update(update_id=update_id, message=message)
+
+
+def test_flooding_chat_does_not_starve_other_chats(database):
+    processor = PerChatUpdateProcessor(4)
+    handled = []
+
+    async def handle(update: Update, seconds: float):
+        await asyncio.sleep(seconds)
+        handled.append(update.effective_chat.id)
+
+    async def main():
+        started = time.monotonic()
+        flood = [
+            asyncio.create_task(processor.process_update(update, handle(update, 0.05)))
+            for update in (_update(i, 1) for i in range(20))
+        ]
+        await asyncio.sleep(0)
+        other = _update(100, 2)
+        await processor.process_update(other, handle(other, 0))
+        other_done = time.monotonic() - started
+        await asyncio.gather(*flood)
+        return other_done
+
+    other_done = asyncio.run(main())
+    # The flood takes a second in its chat's order; the other chat does not wait for it
+    assert other_done < 0.2
+    assert handled[0] == 2 and handled.count(1) == 20
+
+
+def test_updates_from_one_chat_run_in_order(database):
+    processor = PerChatUpdateProcessor(8)
+    handled = []
+
+    async def handle(update_id: int):
+        await asyncio.sleep(0.01 * (update_id % 3))
+        handled.append(update_id)
+
+    async def main():
+        await asyncio.gather(*(processor.process_update(_update(i, 1), handle(i)) for i in range(10)))
+
+    asyncio.run(main())
+    assert handled == list(range(10))
@@ -0,0 +1,56 @@
+# MovieZoneBot/tests/test_users.py
+
+import threading
+
+
+def test_threshold_flush_does_not_deadlock_with_flush_job(database, monkeypatch):
+    """Registrations that hit the flush threshold run alongside the periodic flush."""
+    db = database
+    monkeypatch.setattr(db, "USER_FLUSH_MAX_PENDING", 1)
+    stop = threading.Event()
+
+    def flush_job():
+        while not stop.is_set():
+            db.flush_users()
+
+    def register(first_id):
+        for user_id in range(first_id, first_id + 200):
+            db.add_user_if_not_exists(user_id, f"user{user_id}")
+        db.deactivate_users(list(range(first_id, first_id + 200, 2)))
+
+    flusher = threading.Thread(target=flush_job, daemon=True)
+    workers = [threading.Thread(target=register, args=(i * 1000 + 1,), daemon=True) for i in range(4)]
+    flusher.start()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+    stop.set()
+    flusher.join(timeout=30)
+
+    assert not any(thread.is_alive() for thread in workers + [flusher]), "user registry deadlocked"
+    db.flush_users()
+    assert db.count_users() == 800
+    cursor, active = db.get_active_user_chunk(0, 1000)
+    assert len(active) == 400
+
+
+def test_registry_keeps_only_recent_clean_users(database, monkeypatch):
+    db = database
+    monkeypatch.setattr(db, "USER_CACHE_SIZE", 50)
+    monkeypatch.setattr(db, "USER_FLUSH_MAX_PENDING", 10_000)
+
+    for user_id in range(1, 301):
+        db.add_user_if_not_exists(user_id, f"user{user_id}")
+    # Nothing is flushed yet, so nothing may be dropped
+    assert len(db._users) == 300
+
+    db.flush_users()
+    assert len(db._users) == 50
+    assert list(db._users)[0] == "251"
+
+    # Dropped users are read back from storage, and reading one makes it recent
+    assert db.get_user(1)["first_name"] == "user1"
+    assert len(db._users) == 50 and list(db._users)[-1] == "1"
+    assert not db.add_user_if_not_exists(2, "user2")
+    assert db.count_users() == 300
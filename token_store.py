@@ -0,0 +1,249 @@
+# MovieZoneBot/token_store.py
+
+import heapq
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+LIVE = 0
+SPENT = 1
+# Signed tokens: nothing is stored, they are only remembered for reuse
+ISSUED = 2
+
+# (user_id, movie_id, quality)
+TokenKey = Tuple[int, int, str]
+
+
+class TokenStore:
+    """
+    Download tokens with a time-to-live, on top of the record store.
+
+    Two tables are managed: live (not yet used) stored tokens, and the spent
+    set - compact {"expires_at"} records of tokens that were already used,
+    kept only until the token would have expired anyway. Used tokens move
+    from the first table to the second, so neither grows with lifetime ad
+    clicks.
+
+    Every entry is also pushed on a min-heap ordered by expiry, so sweep()
+    only touches the k entries that are due: O(k log n) instead of a scan of
+    both tables.
+
+    A secondary index maps (user_id, movie_id, quality) to the newest token
+    that is still unused, so repeated taps on the same download button can
+    hand out the same link instead of minting another one. For stored tokens
+    it is rebuilt from the live table at startup; signed tokens are only
+    remembered in memory, since issuing one writes nothing anyway.
+
+    Using a token goes through consume(), a compare-and-set on the spent set
+    under a lock of that token alone: of any number of concurrent attempts
+    exactly one succeeds, while different tokens never wait on each other.
+    """
+
+    def __init__(self, store, tokens_table: str, spent_table: str):
+        self._store = store
+        self._tables = {LIVE: tokens_table, SPENT: spent_table}
+        # (expires_at as unix time, kind, key)
+        self._heap: List[Tuple[float, int, str]] = []
+        # key -> (token, token id, expires_at as unix time), and token id -> key
+        self._live_by_key: Dict[TokenKey, Tuple[str, str, float]] = {}
+        self._key_by_id: Dict[str, TokenKey] = {}
+        self._lock = threading.Lock()
+        # token id -> [lock, number of threads holding or waiting for it]
+        self._token_locks: Dict[str, list] = {}
+        self._stats = {
+            "purged_live": 0, "purged_spent": 0, "sweeps": 0, "last_sweep_ms": 0.0,
+            "reused": 0, "consumed": 0, "consume_conflicts": 0,
+        }
+
+    # --- Loading ---
+
+    def load(self):
+        """Build the expiry heap from both tables (once, at startup)."""
+        live = self._store.all(self._tables[LIVE])
+
+        # Tokens marked used by older versions belong in the spent set
+        used = {token: record for token, record in live.items() if record.get("used")}
+        if used:
+            self._store.put_many(self._tables[SPENT], {
+                token: {"expires_at": record["expires_at"]} for token, record in used.items()
+            })
+            self._store.delete_many(self._tables[LIVE], list(used))
+            logger.info(f"Moved {len(used)} used tokens to the spent set")
+
+        heap = []
+        for kind in (LIVE, SPENT):
+            for key, record in self._store.all(self._tables[kind]).items():
+                heap.append((self._timestamp(record["expires_at"]), kind, key))
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+            self._live_by_key.clear()
+            self._key_by_id.clear()
+            for token, record in self._store.all(self._tables[LIVE]).items():
+                self._remember(self._key(record), token, token, self._timestamp(record["expires_at"]))
+        logger.info(f"Token store loaded with {len(heap)} entries")
+
+    @staticmethod
+    def _timestamp(expires_at: str) -> float:
+        return datetime.fromisoformat(expires_at).timestamp()
+
+    @staticmethod
+    def _key(record: Dict) -> TokenKey:
+        return (record["user_id"], record["movie_id"], record["quality"])
+
+    def _track(self, expires_at: str, kind: int, key: str):
+        with self._lock:
+            heapq.heappush(self._heap, (self._timestamp(expires_at), kind, key))
+
+    # --- Reuse index (callers hold self._lock) ---
+
+    def _remember(self, key: TokenKey, token: str, token_id: str, expires: float):
+        current = self._live_by_key.get(key)
+        if current is not None and current[2] >= expires:
+            return
+        if current is not None:
+            self._key_by_id.pop(current[1], None)
+        self._live_by_key[key] = (token, token_id, expires)
+        self._key_by_id[token_id] = key
+
+    def _forget(self, token_id: str):
+        key = self._key_by_id.pop(token_id, None)
+        if key is not None:
+            self._live_by_key.pop(key, None)
+
+    def find_live(self, user_id: int, movie_id: int, quality: str, min_ttl: float) -> Optional[str]:
+        """
+        The unused token already issued for this user, movie and quality, if
+        it stays valid for at least `min_ttl` more seconds.
+        """
+        key = (user_id, movie_id, quality)
+        with self._lock:
+            entry = self._live_by_key.get(key)
+            if entry is None:
+                return None
+            token, token_id, expires = entry
+            if expires - time.time() < min_ttl:
+                return None
+            self._stats["reused"] += 1
+            return token
+
+    def remember_signed(self, user_id: int, movie_id: int, quality: str, token: str, token_id: str, expires_at: str):
+        """Make a freshly issued signed token available to find_live()."""
+        expires = self._timestamp(expires_at)
+        with self._lock:
+            self._remember((user_id, movie_id, quality), token, token_id, expires)
+            heapq.heappush(self._heap, (expires, ISSUED, token_id))
+
+    # --- Live tokens ---
+
+    def get(self, token: str) -> Optional[Dict]:
+        return self._store.get(self._tables[LIVE], token)
+
+    def put(self, token: str, record: Dict):
+        """Store a live token; `record` must have an ISO "expires_at"."""
+        self._store.put(self._tables[LIVE], token, record)
+        self._track(record["expires_at"], LIVE, token)
+        with self._lock:
+            self._remember(self._key(record), token, token, self._timestamp(record["expires_at"]))
+
+    def discard(self, token: str) -> bool:
+        """Remove a live token before it expires."""
+        with self._lock:
+            self._forget(token)
+        return self._store.delete(self._tables[LIVE], token)
+
+    # --- Single use ---
+
+    @contextmanager
+    def locked(self, token_id: str):
+        """Hold the lock of one token. Reentrant; dropped once nobody needs it."""
+        with self._lock:
+            entry = self._token_locks.get(token_id)
+            if entry is None:
+                entry = self._token_locks[token_id] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._token_locks[token_id]
+
+    def consume(self, token_id: str, expires_at: str) -> bool:
+        """
+        Mark a token used, unless it already is or has expired. Returns
+        whether this call used it.
+        """
+        with self.locked(token_id):
+            # Checked under the lock: sweep() only forgets spent ids that are
+            # past their expiry, so an unexpired token's spent id is still here
+            if self._timestamp(expires_at) <= time.time() or self.is_spent(token_id):
+                with self._lock:
+                    self._stats["consume_conflicts"] += 1
+                return False
+            self.mark_spent(token_id, expires_at)
+        with self._lock:
+            self._stats["consumed"] += 1
+        return True
+
+    # --- Spent set ---
+
+    def is_spent(self, token_id: str) -> bool:
+        return self._store.get(self._tables[SPENT], token_id) is not None
+
+    def mark_spent(self, token_id: str, expires_at: str):
+        """Remember a used token until `expires_at`, dropping its live record if any."""
+        with self._lock:
+            self._forget(token_id)
+        self._store.put(self._tables[SPENT], token_id, {"expires_at": expires_at})
+        self._store.delete(self._tables[LIVE], token_id)
+        self._track(expires_at, SPENT, token_id)
+
+    # --- Expiry ---
+
+    def sweep(self, now: Optional[datetime] = None) -> int:
+        """Delete every live token and spent id whose expiry has passed. Returns the number purged."""
+        started = time.perf_counter()
+        cutoff = (now or datetime.now()).timestamp()
+
+        due = {LIVE: [], SPENT: [], ISSUED: []}
+        with self._lock:
+            while self._heap and self._heap[0][0] < cutoff:
+                _, kind, key = heapq.heappop(self._heap)
+                due[kind].append(key)
+            for token_id in due[LIVE] + due[ISSUED]:
+                self._forget(token_id)
+
+        # Entries whose record was already removed (used or discarded) are
+        # simply not found; delete_many only counts what it actually removed.
+        purged_live = self._store.delete_many(self._tables[LIVE], due[LIVE]) if due[LIVE] else 0
+        purged_spent = self._store.delete_many(self._tables[SPENT], due[SPENT]) if due[SPENT] else 0
+
+        with self._lock:
+            self._stats["purged_live"] += purged_live
+            self._stats["purged_spent"] += purged_spent
+            self._stats["sweeps"] += 1
+            self._stats["last_sweep_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+        if purged_live or purged_spent:
+            logger.debug(f"Token sweep purged {purged_live} expired tokens and {purged_spent} spent ids")
+        return purged_live + purged_spent
+
+    def stats(self) -> Dict:
+        """Sizes and purge counters, for monitoring."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["heap_entries"] = len(self._heap)
+            stats["reusable_tokens"] = len(self._live_by_key)
+            stats["locked_tokens"] = len(self._token_locks)
+        stats["live_tokens"] = self._store.count(self._tables[LIVE])
+        stats["spent_ids"] = self._store.count(self._tables[SPENT])
+        return stats
@@ -0,0 +1,195 @@
+# MovieZoneBot/trending.py
+
+import heapq
+import json
+import math
+import os
+import time
+import logging
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+TRENDING_VERSION = 1
+# Scores below this (about 1% of one fresh download) are dropped on save
+MIN_SCORE = 0.01
+# Scores are rescaled once the newest download weighs e**REBASE_EXPONENT
+REBASE_EXPONENT = 100.0
+
+
+class _TopN:
+    """The `size` highest scores seen, as a bounded min-heap with lazy deletion."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.scores: Dict[int, float] = {}
+        self._heap: List[Tuple[float, int]] = []
+
+    def _pop_stale(self):
+        while self._heap and self.scores.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def offer(self, movie_id: int, score: float):
+        if movie_id in self.scores or len(self.scores) < self.size:
+            self.scores[movie_id] = score
+            heapq.heappush(self._heap, (score, movie_id))
+            # Raised scores leave their old entries behind; keep the heap bounded
+            if len(self._heap) > 2 * self.size:
+                self._heap = [(s, m) for m, s in self.scores.items()]
+                heapq.heapify(self._heap)
+            return
+
+        self._pop_stale()
+        if score > self._heap[0][0]:
+            _, evicted = heapq.heapreplace(self._heap, (score, movie_id))
+            del self.scores[evicted]
+            self.scores[movie_id] = score
+
+    def ranked(self) -> List[Tuple[int, float]]:
+        return sorted(self.scores.items(), key=lambda item: -item[1])
+
+
+class TrendingScores:
+    """
+    Exponentially decayed download counts with a ranking per category.
+
+    A download at time t adds e**(rate * (t - epoch)) to its movie ("forward
+    decay"): that is the same as decaying every score continuously, but a
+    score only changes when its own movie is downloaded, so recording is O(1)
+    and rankings never go stale between downloads. Each category (and None,
+    for every movie) keeps its top `size` movies in a bounded heap, updated as
+    part of the same download.
+    """
+
+    def __init__(self, half_life: float, size: int):
+        self.size = size
+        self._rate = math.log(2) / half_life
+        self._epoch = time.time()
+        self._scores: Dict[int, float] = {}
+        self._categories: Dict[int, Tuple[str, ...]] = {}
+        self._top: Dict[Optional[str], _TopN] = {}
+        self._lock = threading.Lock()
+        self.dirty = False
+
+    def _decay(self, now: float) -> float:
+        """Factor that turns a stored score into its value at `now`."""
+        return math.exp(-self._rate * (now - self._epoch))
+
+    def _rebase(self, now: float):
+        factor = self._decay(now)
+        self._scores = {movie_id: score * factor for movie_id, score in self._scores.items()}
+        self._epoch = now
+        self._rebuild()
+
+    def _rebuild(self):
+        self._top = {}
+        for movie_id, score in self._scores.items():
+            for key in (None, *self._categories.get(movie_id, ())):
+                self._top_for(key).offer(movie_id, score)
+
+    def _top_for(self, key: Optional[str]) -> _TopN:
+        top = self._top.get(key)
+        if top is None:
+            top = self._top[key] = _TopN(self.size)
+        return top
+
+    def record(self, movie_id: int, categories: Iterable[str], when: Optional[float] = None):
+        """Count one download of a movie."""
+        now = time.time() if when is None else when
+        with self._lock:
+            if self._rate * (now - self._epoch) > REBASE_EXPONENT:
+                self._rebase(now)
+            score = self._scores.get(movie_id, 0.0) + 1 / self._decay(now)
+            self._scores[movie_id] = score
+            categories = self._categories[movie_id] = tuple(categories)
+            for key in (None, *categories):
+                self._top_for(key).offer(movie_id, score)
+            self.dirty = True
+
+    def top(self, category: Optional[str] = None, limit: Optional[int] = None,
+            when: Optional[float] = None) -> List[Tuple[int, float]]:
+        """(movie_id, current score) of the highest-scoring movies, best first."""
+        now = time.time() if when is None else when
+        with self._lock:
+            top = self._top.get(category)
+            if top is None:
+                return []
+            factor = self._decay(now)
+            return [(movie_id, score * factor) for movie_id, score in top.ranked()[:limit]]
+
+    def score(self, movie_id: int, when: Optional[float] = None) -> float:
+        now = time.time() if when is None else when
+        with self._lock:
+            return self._scores.get(movie_id, 0.0) * self._decay(now)
+
+    def forget(self, movie_id: int):
+        """Drop a deleted movie; the rankings it was in are rebuilt to fill its place."""
+        with self._lock:
+            if self._scores.pop(movie_id, None) is None:
+                return
+            self._categories.pop(movie_id, None)
+            self._rebuild()
+            self.dirty = True
+
+    # --- Persistence ---
+
+    def save(self, file_path: str, when: Optional[float] = None) -> bool:
+        """Write the scores to disk, dropping the ones that have decayed away."""
+        now = time.time() if when is None else when
+        with self._lock:
+            factor = self._decay(now)
+            faded = [movie_id for movie_id, score in self._scores.items() if score * factor < MIN_SCORE]
+            if faded:
+                for movie_id in faded:
+                    del self._scores[movie_id]
+                    self._categories.pop(movie_id, None)
+                self._rebuild()
+            data = {
+                "version": TRENDING_VERSION,
+                "epoch": self._epoch,
+                "scores": [
+                    [movie_id, score, list(self._categories.get(movie_id, ()))]
+                    for movie_id, score in self._scores.items()
+                ],
+            }
+            self.dirty = False
+
+        directory = os.path.dirname(file_path) or "."
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            logger.error(f"Error saving trending scores to {file_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.dirty = True
+            return False
+        return True
+
+    @classmethod
+    def load(cls, file_path: str, half_life: float, size: int) -> "TrendingScores":
+        """Read saved scores; starts empty if the file is missing or unreadable."""
+        trending = cls(half_life, size)
+        if not os.path.exists(file_path):
+            return trending
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != TRENDING_VERSION:
+                logger.warning(f"Ignoring trending scores with version {data.get('version')}")
+                return trending
+            trending._epoch = data["epoch"]
+            for movie_id, score, categories in data["scores"]:
+                trending._scores[movie_id] = score
+                trending._categories[movie_id] = tuple(categories)
+            trending._rebuild()
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.error(f"Could not read trending scores from {file_path}: {e}")
+            return cls(half_life, size)
+        return trending
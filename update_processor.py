@@ -0,0 +1,83 @@
+# MovieZoneBot/update_processor.py
+
+import asyncio
+import contextlib
+import logging
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+import database as db
+from send_queue import send_priority, update_priority
+
+# লগিং সেটআপ
+logger = logging.getLogger(__name__)
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles up to `max_concurrent_updates` updates at once, but never two
+    updates from the same chat (or user) at the same time.
+
+    The ConversationHandler keeps per-chat state, so a user's updates must be
+    processed in the order they arrive. Different users no longer wait for
+    each other's database or network calls.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chat_locks: Dict[Any, asyncio.Lock] = {}
+        self._waiting: Dict[Any, int] = {}
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Any]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return ("user", update.effective_user.id)
+        return None
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # Replaces the base class' version, which takes a slot first: an update
+        # now waits for its chat's turn before it takes one of the
+        # `max_concurrent_updates` slots, so a chat flooding the bot queues
+        # behind its own lock instead of filling every slot with waiters.
+        async with self._chat_turn(update):
+            async with self._semaphore:
+                await self.do_process_update(update, coroutine)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # Replies go out with the update's priority (see send_queue)
+        with send_priority(update_priority(update)), db.count_role_lookups() as role_lookups:
+            await coroutine
+        if isinstance(update, Update):
+            logger.debug(f"Update {update.update_id} needed {role_lookups[0]} role lookups")
+
+    @contextlib.asynccontextmanager
+    async def _chat_turn(self, update: object):
+        """Wait until no earlier update from the same chat is being processed."""
+        key = self._chat_key(update)
+        if key is None:
+            yield
+            return
+
+        lock = self._chat_locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            # Drop the lock once nobody else for this chat is queued behind it
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                self._chat_locks.pop(key, None)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
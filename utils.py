@@ -9,8 +9,9 @@ from telegram import (
 )
 from config import CATEGORIES, BOT_USERNAME, AD_PAGE_URL, SINGLE_MOVIE_POST_TEMPLATE, SERIES_POST_TEMPLATE
 import database as db
+from catalog_index import letter_bucket, bucket_label
 import logging
-from typing import List
+from typing import List, Optional, Tuple
 
 # লগিং সেটআপ
 logger = logging.getLogger(__name__)
@@ -31,7 +32,7 @@ def restricted(allowed_roles: List[str]):
                 user_id = update.effective_user.id
                 message = update.message
                 
-            user_role = db.get_user_role(user_id)
+            user_role = await db.aget_user_role(user_id)
             
             if user_role not in allowed_roles:
                 await message.reply_text("❌ দুঃখিত, এই কমান্ডটি ব্যবহার করার অনুমতি আপনার নেই।")
@@ -100,7 +101,7 @@ def get_conversation_keyboard(user_role: str) -> ReplyKeyboardMarkup:
 def get_category_keyboard() -> InlineKeyboardMarkup:
     """Creates an inline keyboard for browsing movie categories."""
     from config import BROWSE_CATEGORIES
-    buttons = []
+    buttons = [[InlineKeyboardButton("🔥 Trending", callback_data="trend")]]
     row = []
     for category in BROWSE_CATEGORIES:
         # Create button for each category
@@ -125,9 +126,9 @@ def get_quality_buttons(movie_id: int, files: dict) -> InlineKeyboardMarkup:
     
     return InlineKeyboardMarkup(buttons)
 
-def generate_ad_link_button(user_id: int, movie_id: int, quality: str) -> InlineKeyboardMarkup | None:
+async def generate_ad_link_button(user_id: int, movie_id: int, quality: str) -> InlineKeyboardMarkup | None:
     """একটি 'Watch Ad & Download' বাটন তৈরি করে।"""
-    token = db.create_ad_token(user_id=user_id, movie_id=movie_id, quality=quality)
+    token = await db.acreate_ad_token(user_id=user_id, movie_id=movie_id, quality=quality)
     if not token:
         logger.error(f"Failed to create ad token for user {user_id}, movie {movie_id}, quality {quality}")
         return None
@@ -265,6 +266,56 @@ def create_movie_grid_markup(movies: List[dict], prefix: str = "view") -> Inline
     
     return InlineKeyboardMarkup(buttons)
 
+LETTER_PAGE_SIZE = 30
+
+async def build_letter_page(letter: str, page: int = 1) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+    """
+    One page of alphabet browsing: the message text and a movie grid with
+    Previous/Next buttons. Returns None if no movie starts with `letter`.
+    """
+    # Callbacks carry the bucket id, never the raw character (which may be "_")
+    bucket = letter_bucket(letter)
+    total = await db.acount_movies_by_first_letter(bucket)
+    if not total:
+        return None
+
+    offset = (page - 1) * LETTER_PAGE_SIZE
+    movies = await db.aget_movies_by_first_letter(bucket, limit=LETTER_PAGE_SIZE, offset=offset)
+    buttons = [list(row) for row in create_movie_grid_markup(movies, prefix="view").inline_keyboard]
+
+    nav_buttons = []
+    if page > 1:
+        nav_buttons.append(InlineKeyboardButton("⬅️ Previous", callback_data=f"letter_{bucket}_{page-1}"))
+    if offset + LETTER_PAGE_SIZE < total:
+        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"letter_{bucket}_{page+1}"))
+    if nav_buttons:
+        buttons.append(nav_buttons)
+
+    text = f"🌐 Movies starting with '{bucket_label(bucket)}' ({total} found)"
+    if page > 1:
+        text += f" - Page {page}"
+    return text + ":", InlineKeyboardMarkup(buttons)
+
+async def build_trending_page(category: Optional[str] = None) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+    """
+    The trending movies (overall or in one category) as message text and a
+    movie grid, best first. Returns None if nothing was downloaded lately.
+    """
+    movies = await db.aget_trending_movies(category)
+    if not movies:
+        return None
+
+    buttons = [list(row) for row in create_movie_grid_markup(movies, prefix="view").inline_keyboard]
+    buttons.append([InlineKeyboardButton("🔙 Back to Categories", callback_data="browse_categories")])
+
+    where = f" in {category}" if category else ""
+    text = f"🔥 Trending{where} - most downloaded lately:\n\n"
+    text += "\n".join(
+        f"{rank}. {movie.get('title', 'Unknown')} ({movie['trending_score']:.1f})"
+        for rank, movie in enumerate(movies, start=1)
+    )
+    return text, InlineKeyboardMarkup(buttons)
+
 def create_category_keyboard(categories: List[str]) -> InlineKeyboardMarkup:
     """Create inline keyboard for category selection."""
     buttons = []
@@ -23,26 +23,26 @@ class ConversationCleanup:
     
     @staticmethod
     async def cleanup_previous_step(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Clean up messages from the previous conversation step."""
-        from main import delete_conversation_messages
+        """Clean up messages from the previous conversation step (in the background)."""
+        from main import delete_conversation_messages_later
         
         tracked_messages = context.user_data.get('tracked_messages', [])
         if len(tracked_messages) > 1:  # Keep current message, delete previous ones
             messages_to_delete = [msg['message_id'] for msg in tracked_messages[:-1]]
-            await delete_conversation_messages(context, update.effective_chat.id, messages_to_delete)
+            delete_conversation_messages_later(context, update.effective_chat.id, messages_to_delete)
             
             # Keep only the current message
             context.user_data['tracked_messages'] = tracked_messages[-1:]
     
     @staticmethod
     async def cleanup_completed_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Clean up all conversation messages when conversation is complete."""
-        from main import delete_conversation_messages
+        """Clean up all conversation messages when conversation is complete (in the background)."""
+        from main import delete_conversation_messages_later
         
         tracked_messages = context.user_data.get('tracked_messages', [])
         if tracked_messages:
             messages_to_delete = [msg['message_id'] for msg in tracked_messages]
-            await delete_conversation_messages(context, update.effective_chat.id, messages_to_delete)
+            delete_conversation_messages_later(context, update.effective_chat.id, messages_to_delete)
             
             # Clear tracked messages
             context.user_data.pop('tracked_messages', None)
@@ -60,7 +60,7 @@ async def auto_cleanup_message(update: Update, context: ContextTypes.DEFAULT_TYP
     from main import schedule_user_message_cleanup
     import database as db
     
-    user_role = db.get_user_role(update.effective_user.id)
+    user_role = await db.aget_user_role(update.effective_user.id)
     
     # Track conversation messages for step-by-step cleanup
     if hasattr(sent_message, 'message_id'):